@@ -43,10 +43,13 @@ INSTALLED_APPS = [
     'rest_framework.authtoken',
     'drf_spectacular',
     'user',
+    'recipe',
 ]
 
 MIDDLEWARE = [
+    'core.health.HealthCheckMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'core.db_router.ReplicaRoutingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -85,10 +88,42 @@ DATABASES = {
         'HOST': os.environ.get('DB_HOST'),
         'NAME': os.environ.get('DB_NAME'),
         'USER': os.environ.get('DB_USER'),
-        'PASSWORD': os.environ.get('DB_PASS')
+        'PASSWORD': os.environ.get('DB_PASS'),
+        'OPTIONS': {'connect_timeout': int(os.environ.get('DB_CONNECT_TIMEOUT', 5))},
     }
 }
 
+# Read replicas share the primary's credentials; reads of safe requests go to them, see core/db_router.py
+DATABASE_REPLICAS = []
+for index, host in enumerate(filter(None, os.environ.get('DB_REPLICA_HOSTS', '').split(','))):
+    alias = f'replica_{index}'
+    DATABASES[alias] = dict(DATABASES['default'], HOST=host, TEST={'MIRROR': 'default'})
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['core.db_router.ReplicaRouter']
+
+# Seconds a client reads from the primary after writing, and before a failed replica is retried
+REPLICA_PIN_SECONDS = int(os.environ.get('REPLICA_PIN_SECONDS', 5))
+REPLICA_RETRY_SECONDS = int(os.environ.get('REPLICA_RETRY_SECONDS', 30))
+
+# With CACHE_DIR (e.g. under /dev/shm) the cache is shared by every worker on the host, which the
+# replica pins above and the failed login counters rely on; without it each process has its own.
+CACHE_DIR = os.environ.get('CACHE_DIR')
+CACHES = {
+    'default': (
+        {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': CACHE_DIR}
+        if CACHE_DIR else
+        {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}
+    ),
+}
+
+
+# Background jobs, see core/jobs.py
+JOB_MAX_ATTEMPTS = int(os.environ.get('JOB_MAX_ATTEMPTS', 5))
+JOB_BACKOFF_BASE = float(os.environ.get('JOB_BACKOFF_BASE', 2))
+JOB_BACKOFF_MAX = float(os.environ.get('JOB_BACKOFF_MAX', 600))
+JOB_LOCK_TIMEOUT = int(os.environ.get('JOB_LOCK_TIMEOUT', 900))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -109,6 +144,28 @@ AUTH_PASSWORD_VALIDATORS = [
 ]
 
 
+PASSWORD_HASHERS = [
+    'core.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+
+ARGON2_TIME_COST = int(os.environ.get('ARGON2_TIME_COST', 2))
+ARGON2_MEMORY_COST = int(os.environ.get('ARGON2_MEMORY_COST', 19456))
+ARGON2_PARALLELISM = int(os.environ.get('ARGON2_PARALLELISM', 1))
+
+# Concurrent hashes per process (callers block until theirs is done), see core/hashing.py
+PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', 2))
+PASSWORD_HASH_QUEUE = int(os.environ.get('PASSWORD_HASH_QUEUE', 8))
+PASSWORD_HASH_QUEUE_TIMEOUT = float(os.environ.get('PASSWORD_HASH_QUEUE_TIMEOUT', 5))
+
+# Failed token logins allowed per email address within the window (seconds)
+LOGIN_ATTEMPTS_PER_EMAIL = int(os.environ.get('LOGIN_ATTEMPTS_PER_EMAIL', 10))
+LOGIN_ATTEMPTS_WINDOW = int(os.environ.get('LOGIN_ATTEMPTS_WINDOW', 300))
+
+
 # Internationalization
 # https://docs.djangoproject.com/en/4.2/topics/i18n/
 
@@ -130,6 +187,23 @@ MEDIA_URL = '/static/media/'
 MEDIA_ROOT = '/vol/web/media'
 STATIC_ROOT = '/vol/web/static'
 
+# Users whose tag/ingredient name -> id maps are cached per process, see recipe/vocabulary.py
+VOCABULARY_CACHE_USERS = int(os.environ.get('VOCABULARY_CACHE_USERS', 1000))
+
+# Uploaded recipe images are downscaled to this many pixels on their longest side
+RECIPE_IMAGE_MAX_SIZE = int(os.environ.get('RECIPE_IMAGE_MAX_SIZE', 1600))
+
+# Recipe stats are cached until the user's next change, or for at most this many seconds
+RECIPE_STATS_CACHE_SECONDS = int(os.environ.get('RECIPE_STATS_CACHE_SECONDS', 3600))
+
+# Seconds a write sent with an Idempotency-Key header is remembered for replay, see core/idempotency.py
+IDEMPOTENCY_KEY_TTL = int(os.environ.get('IDEMPOTENCY_KEY_TTL', 24 * 60 * 60))
+# Seconds after which a request still holding its key is presumed dead and a retry takes the key over
+IDEMPOTENCY_LOCK_TIMEOUT = int(os.environ.get('IDEMPOTENCY_LOCK_TIMEOUT', 60))
+
+# Length of the precomputed similar recipe lists, see recipe/similarity.py
+SIMILAR_RECIPES = int(os.environ.get('SIMILAR_RECIPES', 10))
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
@@ -138,9 +212,50 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 AUTH_USER_MODEL = 'core.user'
 
 REST_FRAMEWORK = {
-    'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema'
+    'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
+    # MessagePack is negotiated with `Accept`/`Content-Type: application/msgpack`, see core/renderers.py
+    'DEFAULT_RENDERER_CLASSES': [
+        'rest_framework.renderers.JSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+        'core.renderers.MessagePackRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'rest_framework.parsers.JSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+        'core.parsers.MessagePackParser',
+    ],
+    'TEST_REQUEST_RENDERER_CLASSES': [
+        'rest_framework.renderers.MultiPartRenderer',
+        'rest_framework.renderers.JSONRenderer',
+        'core.renderers.MessagePackRenderer',
+    ],
+    'DEFAULT_THROTTLE_CLASSES': ['core.throttling.TokenBucketThrottle'],
+    'DEFAULT_THROTTLE_RATES': {
+        'read': os.environ.get('THROTTLE_READ_RATE', '600/min'),
+        'write': os.environ.get('THROTTLE_WRITE_RATE', '120/min'),
+        'upload': os.environ.get('THROTTLE_UPLOAD_RATE', '20/min'),
+        'login': os.environ.get('THROTTLE_LOGIN_RATE', '20/min'),
+    },
 }
 
+# Token buckets are kept in a memory mapped table shared by all workers using the
+# same THROTTLE_SHM_PATH, or in the default cache when THROTTLE_STORE is 'cache'.
+THROTTLE_ENABLED = bool(int(os.environ.get('THROTTLE_ENABLED', 1)))
+THROTTLE_STORE = os.environ.get('THROTTLE_STORE', 'shm')
+THROTTLE_SHM_PATH = os.environ.get('THROTTLE_SHM_PATH')
+THROTTLE_SHM_SLOTS = int(os.environ.get('THROTTLE_SHM_SLOTS', 65536))
+
 SPECTACULAR_SETTINGS = {
     'COMPONENT_SPLIT_REQUEST': True
-}
\ No newline at end of file
+}
+
+# Written by `manage.py build_schema` and served by /api/schema/, see core/schema.py
+API_SCHEMA_ROOT = os.path.join(STATIC_ROOT, 'schema')
+API_SCHEMA_MAX_AGE = int(os.environ.get('API_SCHEMA_MAX_AGE', 300))
+# Swagger UI at /api/docs/
+API_DOCS_ENABLED = bool(int(os.environ.get('API_DOCS_ENABLED', 1)))
+
+# Checks behind /readyz, see core/readiness.py
+READINESS_CHECKS = ['database', 'cache', 'media']
+READINESS_CHECK_TIMEOUT = float(os.environ.get('READINESS_CHECK_TIMEOUT', 2))
\ No newline at end of file
@@ -18,16 +18,21 @@ from django.contrib import admin
 from django.urls import path, include
 from django.conf.urls.static import static
 from django.conf import settings
-from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView
+
+from core.schema import SchemaView
 
 urlpatterns = [
     path('admin/', admin.site.urls),
-    path('api/schema/', SpectacularAPIView.as_view(), name='api-schema'),
-    path('api/docs/', SpectacularSwaggerView.as_view(url_name='api-schema'), name='api-docs'),
+    path('api/schema/', SchemaView.as_view(), name='api-schema'),
     path('api/users/', include('user.urls')),
     path('api/recipe/', include('recipe.urls'))
 ]
 
+if settings.API_DOCS_ENABLED:
+    from drf_spectacular.views import SpectacularSwaggerView
+
+    urlpatterns.append(path('api/docs/', SpectacularSwaggerView.as_view(url_name='api-schema'), name='api-docs'))
+
 if settings.DEBUG:
      urlpatterns += static(
          settings.MEDIA_URL,
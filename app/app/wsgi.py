@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'app.settings')
 
 application = get_wsgi_application()
+
+# Warm up in the uWSGI master so the forked workers share it, see core/preload.py
+if int(os.environ.get('APP_PRELOAD', 1)):
+    from core.preload import warm_up
+    warm_up()
@@ -1,11 +1,59 @@
 from django.contrib import admin
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
 from .models import User, Recipe, Tag, Ingredient
 
-class UserAdmin(admin.ModelAdmin):
-    search_fields = ('email', 'name')
+# Unfiltered changelists of tables larger than this show PostgreSQL's row estimate instead of a COUNT(*)
+ESTIMATED_COUNT_ABOVE = 100000
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator that skips counting every row of a large table when nothing is filtered."""
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        connection = connections[queryset.db]
+        if connection.vendor == 'postgresql' and not queryset.query.where:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    'SELECT reltuples FROM pg_class WHERE oid = %s::regclass', [queryset.model._meta.db_table],
+                )
+                row = cursor.fetchone()
+            if row and row[0] > ESTIMATED_COUNT_ABOVE:
+                return int(row[0])
+        return super().count
+
+
+class ModelAdmin(admin.ModelAdmin):
+    """Changelists that stay fast with millions of rows; searches use the trigram indexes of migration 0015."""
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     ordering = ('id',)
 
+
+class UserAdmin(ModelAdmin):
+    list_display = ('email', 'name', 'is_staff')
+    search_fields = ('email', 'name')
+
+
+class RecipeAdmin(ModelAdmin):
+    list_display = ('title', 'user', 'price', 'time_minutes')
+    list_select_related = ('user',)
+    search_fields = ('title',)
+    autocomplete_fields = ('user', 'tags', 'ingredients')
+
+
+class VocabularyAdmin(ModelAdmin):
+    list_display = ('name', 'user')
+    list_select_related = ('user',)
+    search_fields = ('name',)
+    autocomplete_fields = ('user',)
+
+
 admin.site.register(User, UserAdmin)
-admin.site.register(Recipe)
-admin.site.register(Tag)
-admin.site.register(Ingredient)
\ No newline at end of file
+admin.site.register(Recipe, RecipeAdmin)
+admin.site.register(Tag, VocabularyAdmin)
+admin.site.register(Ingredient, VocabularyAdmin)
@@ -0,0 +1,19 @@
+"""Reproducible load/benchmark suite for the recipe API."""
+from .seed import seed_data
+from .targets import ClientTarget, HttpTarget
+from .runner import run_scenarios, run_bursts, compare_results, load_baseline, save_baseline
+from .scenarios import SCENARIOS
+from .startup import measure_startup
+
+__all__ = [
+    'seed_data',
+    'ClientTarget',
+    'HttpTarget',
+    'run_scenarios',
+    'run_bursts',
+    'compare_results',
+    'load_baseline',
+    'save_baseline',
+    'SCENARIOS',
+    'measure_startup',
+]
@@ -0,0 +1,136 @@
+import json
+import math
+import platform
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+LATENCY_KEYS = ('p50', 'p95', 'p99')
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of `values` (which need not be sorted)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def run_scenarios(target, ctx, names, scenarios, iterations=50, warmup=5):
+    """Run every scenario in `names` and return its latency/throughput/query statistics.
+
+    Latencies are reported in milliseconds. A scenario fails outright if any
+    request does not return a 2xx status, since timings of errors are meaningless.
+    """
+    results = {}
+    for name in names:
+        scenario = scenarios[name]
+        for i in range(warmup):
+            scenario(target, ctx, i)
+
+        latencies = []
+        queries = []
+        nbytes = 0
+        started = time.perf_counter()
+        for i in range(warmup, warmup + iterations):
+            t0 = time.perf_counter()
+            res = scenario(target, ctx, i)
+            latencies.append((time.perf_counter() - t0) * 1000)
+            if not 200 <= res.status < 300:
+                raise RuntimeError(f'Scenario {name!r} returned HTTP {res.status}: {res.data}')
+            if res.queries is not None:
+                queries.append(res.queries)
+            nbytes += res.nbytes
+        elapsed = time.perf_counter() - started
+
+        results[name] = {
+            'requests': iterations,
+            'p50': round(percentile(latencies, 50), 3),
+            'p95': round(percentile(latencies, 95), 3),
+            'p99': round(percentile(latencies, 99), 3),
+            'throughput': round(iterations / elapsed, 2) if elapsed else 0.0,
+            'queries': max(queries) if queries else None,
+            'bytes': nbytes // iterations if iterations else 0,
+        }
+    return results
+
+
+def run_bursts(target, ctx, names, scenarios, concurrency=16, bursts=5, burst_size=64, idle=5.0):
+    """Fire `bursts` bursts of `burst_size` requests, `concurrency` at a time, with `idle`
+    seconds of silence in between, and return per-scenario latency statistics.
+
+    The idle gaps give an adaptive server time to shrink its worker pool, so the
+    tail latencies show how fast it grows back when the next burst hits.
+    """
+    results = {}
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for name in names:
+            scenario = scenarios[name]
+
+            def timed(i):
+                t0 = time.perf_counter()
+                res = scenario(target, ctx, i)
+                return (time.perf_counter() - t0) * 1000, res
+
+            latencies = []
+            failures = 0
+            started = time.perf_counter()
+            for burst in range(bursts):
+                if burst:
+                    time.sleep(idle)
+                offset = burst * burst_size
+                for latency, res in pool.map(timed, range(offset, offset + burst_size)):
+                    latencies.append(latency)
+                    failures += not 200 <= res.status < 300
+            elapsed = time.perf_counter() - started - idle * (bursts - 1)
+
+            results[f'burst_{name}'] = {
+                'requests': len(latencies),
+                'failures': failures,
+                'p50': round(percentile(latencies, 50), 3),
+                'p95': round(percentile(latencies, 95), 3),
+                'p99': round(percentile(latencies, 99), 3),
+                'throughput': round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+                'queries': None,
+                'bytes': 0,
+            }
+    return results
+
+
+def compare_results(results, baseline, tolerance=0.2):
+    """Return a list of human readable regressions of `results` against `baseline`.
+
+    Latencies may grow and throughput may drop by at most `tolerance` (a
+    fraction). Query counts are deterministic, so any increase is a regression.
+    """
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get('scenarios', {}).get(name)
+        if not previous:
+            continue
+        for key in LATENCY_KEYS:
+            if previous.get(key) and current[key] > previous[key] * (1 + tolerance):
+                regressions.append(f'{name}: {key} {current[key]}ms > baseline {previous[key]}ms')
+        if previous.get('throughput') and current['throughput'] < previous['throughput'] * (1 - tolerance):
+            regressions.append(
+                f"{name}: throughput {current['throughput']}/s < baseline {previous['throughput']}/s"
+            )
+        if previous.get('queries') is not None and current['queries'] is not None \
+                and current['queries'] > previous['queries']:
+            regressions.append(f"{name}: {current['queries']} queries > baseline {previous['queries']}")
+    return regressions
+
+
+def load_baseline(path):
+    with open(path) as fh:
+        return json.load(fh)
+
+
+def save_baseline(path, results, meta):
+    data = {
+        'meta': dict(meta, python=platform.python_version(), machine=platform.machine()),
+        'scenarios': results,
+    }
+    with open(path, 'w') as fh:
+        json.dump(data, fh, indent=2, sort_keys=True)
+        fh.write('\n')
@@ -0,0 +1,98 @@
+import io
+
+from django.urls import reverse
+from PIL import Image
+
+from core.models import Recipe, Tag, Ingredient
+from core.benchmarks.seed import PASSWORD
+
+
+def build_context(seeded):
+    """Collect the ids each scenario needs for the seeded `(user, token)` pairs."""
+    users = []
+    for user, token in seeded:
+        users.append({
+            'email': user.email,
+            'token': token,
+            'recipes': list(Recipe.objects.filter(user=user).order_by('id').values_list('id', flat=True)),
+            'tags': list(Tag.objects.filter(user=user).order_by('id').values_list('id', flat=True)),
+            'ingredients': list(Ingredient.objects.filter(user=user).order_by('id').values_list('id', flat=True)),
+        })
+    return {'users': users}
+
+
+def _pick(ctx, i):
+    return ctx['users'][i % len(ctx['users'])]
+
+
+def recipe_list(target, ctx, i):
+    return target.request('GET', reverse('recipe:recipe-list'), _pick(ctx, i)['token'])
+
+
+def recipe_filtered_list(target, ctx, i):
+    user = _pick(ctx, i)
+    tags = ','.join(str(t) for t in user['tags'][:2])
+    ingredients = ','.join(str(t) for t in user['ingredients'][:2])
+    path = f"{reverse('recipe:recipe-list')}?tags={tags}&ingredients={ingredients}"
+    return target.request('GET', path, user['token'])
+
+
+def recipe_detail(target, ctx, i):
+    user = _pick(ctx, i)
+    recipe_id = user['recipes'][i % len(user['recipes'])]
+    return target.request('GET', reverse('recipe:recipe-detail', args=[recipe_id]), user['token'])
+
+
+def schema(target, ctx, i):
+    return target.request('GET', reverse('api-schema') + '?format=json', _pick(ctx, i)['token'])
+
+
+def recipe_create(target, ctx, i):
+    payload = {
+        'title': f'Created {i}',
+        'time_minutes': 30,
+        'price': '9.99',
+        'description': 'Created by the benchmark.',
+        'link': 'https://example.com',
+        'tags': [{'name': 'tag-0'}, {'name': f'new-tag-{i % 5}'}],
+        'ingredients': [{'name': 'ingredient-0'}, {'name': f'new-ingredient-{i % 5}'}],
+    }
+    return target.request('POST', reverse('recipe:recipe-list'), _pick(ctx, i)['token'], payload)
+
+
+def recipe_update(target, ctx, i):
+    user = _pick(ctx, i)
+    recipe_id = user['recipes'][i % len(user['recipes'])]
+    payload = {'title': f'Updated {i}', 'tags': [{'name': 'tag-1'}, {'name': 'tag-2'}]}
+    return target.request('PATCH', reverse('recipe:recipe-detail', args=[recipe_id]), user['token'], payload)
+
+
+def recipe_upload_image(target, ctx, i):
+    user = _pick(ctx, i)
+    recipe_id = user['recipes'][i % len(user['recipes'])]
+    image_file = io.BytesIO()
+    Image.new('RGB', (64, 64)).save(image_file, format='JPEG')
+    image_file.name = 'bench.jpg'
+    image_file.seek(0)
+    url = reverse('recipe:recipe-upload-image', args=[recipe_id])
+    return target.request('POST', url, user['token'], {'image': image_file}, format='multipart')
+
+
+def token_login(target, ctx, i):
+    """Obtain a token with email and password; its throughput is logins per second per core."""
+    user = _pick(ctx, i)
+    payload = {'email': user['email'], 'password': PASSWORD}
+    return target.request('POST', reverse('user:token'), user['token'], payload)
+
+
+# Read scenarios first so that writes do not skew the data the reads see.
+SCENARIOS = {
+    'list': recipe_list,
+    'filtered_list': recipe_filtered_list,
+    'detail': recipe_detail,
+    'schema': schema,
+    'create': recipe_create,
+    'update': recipe_update,
+    'upload_image': recipe_upload_image,
+    'login': token_login,
+}
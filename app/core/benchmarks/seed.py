@@ -0,0 +1,67 @@
+import random
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from rest_framework.authtoken.models import Token
+
+from core.models import Recipe, Tag, Ingredient
+
+EMAIL_TEMPLATE = 'bench-{}@example.com'
+PASSWORD = 'bench-password-123'
+
+
+def clear_data():
+    """Remove every user (and their data) created by a previous seed."""
+    get_user_model().objects.filter(email__startswith='bench-', email__endswith='@example.com').delete()
+
+
+def seed_data(users=2, recipes=50, tags=10, ingredients=10, seed=0):
+    """Create `users` users each owning `recipes` recipes and `tags`/`ingredients` attributes.
+
+    Every recipe is linked to a random sample of up to three tags and five
+    ingredients. The same `seed` always produces the same data set.
+    Returns a list of `(user, token_key)` tuples.
+    """
+    rng = random.Random(seed)
+    password = make_password(PASSWORD)
+
+    user_objs = get_user_model().objects.bulk_create([
+        get_user_model()(email=EMAIL_TEMPLATE.format(i), name=f'Bench {i}', password=password)
+        for i in range(users)
+    ])
+    # SQLite and Postgres both return ids from bulk_create, but refetch to stay backend agnostic.
+    user_objs = list(get_user_model().objects.filter(email__in=[u.email for u in user_objs]).order_by('id'))
+    Token.objects.bulk_create([Token(user=user, key=Token.generate_key()) for user in user_objs])
+
+    Tag.objects.bulk_create([Tag(user=user, name=f'tag-{i}') for user in user_objs for i in range(tags)])
+    Ingredient.objects.bulk_create([
+        Ingredient(user=user, name=f'ingredient-{i}') for user in user_objs for i in range(ingredients)
+    ])
+    Recipe.objects.bulk_create([
+        Recipe(
+            user=user,
+            title=f'Recipe {i}',
+            time_minutes=rng.randint(5, 120),
+            price=Decimal(rng.randint(100, 5000)) / 100,
+            description='Benchmark recipe description. ' * 5,
+            link=f'https://example.com/recipe/{i}',
+        )
+        for user in user_objs for i in range(recipes)
+    ])
+
+    recipe_tags = []
+    recipe_ingredients = []
+    for user in user_objs:
+        tag_ids = list(Tag.objects.filter(user=user).values_list('id', flat=True))
+        ing_ids = list(Ingredient.objects.filter(user=user).values_list('id', flat=True))
+        for recipe_id in Recipe.objects.filter(user=user).values_list('id', flat=True):
+            for tag_id in rng.sample(tag_ids, min(3, len(tag_ids))):
+                recipe_tags.append(Recipe.tags.through(recipe_id=recipe_id, tag_id=tag_id))
+            for ing_id in rng.sample(ing_ids, min(5, len(ing_ids))):
+                recipe_ingredients.append(Recipe.ingredients.through(recipe_id=recipe_id, ingredient_id=ing_id))
+    Recipe.tags.through.objects.bulk_create(recipe_tags, batch_size=1000)
+    Recipe.ingredients.through.objects.bulk_create(recipe_ingredients, batch_size=1000)
+
+    tokens = dict(Token.objects.filter(user__in=user_objs).values_list('user_id', 'key'))
+    return [(user, tokens[user.id]) for user in user_objs]
@@ -0,0 +1,76 @@
+import os
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+
+from .runner import percentile
+
+# Loads the app like the uWSGI master, then forks a worker that serves one request
+# needing no database and reports its status and the milliseconds since the fork.
+CHILD = '''
+import os
+import sys
+import time
+from wsgiref.util import setup_testing_defaults
+
+from app.wsgi import application
+from django.conf import settings
+
+settings.ALLOWED_HOSTS = [*settings.ALLOWED_HOSTS, 'testserver']
+environ = {'PATH_INFO': sys.argv[1], 'HTTP_HOST': 'testserver'}
+setup_testing_defaults(environ)
+
+forked = time.perf_counter()
+if os.fork() == 0:
+    statuses = []
+    b''.join(application(environ, lambda status, headers, exc_info=None: statuses.append(status)))
+    print(statuses[0].split()[0], (time.perf_counter() - forked) * 1000, flush=True)
+    os._exit(0)
+os.wait()
+'''
+
+
+def _stats(timings):
+    return {
+        'requests': len(timings),
+        'p50': round(percentile(timings, 50), 3),
+        'p95': round(percentile(timings, 95), 3),
+        'p99': round(percentile(timings, 99), 3),
+        'throughput': round(len(timings) / (sum(timings) / 1000), 2),
+        'queries': None,
+        'bytes': 0,
+    }
+
+
+def measure_startup(runs=5, path='/api/recipe/recipes/', preload=True):
+    """Time how long fresh workers take to serve their first response.
+
+    `startup` runs from starting the interpreter to the first response of its
+    first worker, `respawn` from forking a worker off a loaded master to that
+    worker's first response, which is what every uWSGI respawn pays. Both are in
+    milliseconds; `preload` toggles the warm-up in core/preload.py.
+    """
+    env = dict(
+        os.environ,
+        DJANGO_SETTINGS_MODULE=settings.SETTINGS_MODULE,
+        APP_PRELOAD='1' if preload else '0',
+        THROTTLE_ENABLED='0',
+    )
+    startup, respawn = [], []
+    for _ in range(runs):
+        started = time.perf_counter()
+        proc = subprocess.Popen(
+            [sys.executable, '-c', CHILD, path],
+            cwd=settings.BASE_DIR, env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True,
+        )
+        line = proc.stdout.readline().split()
+        elapsed = time.perf_counter() - started
+        _, stderr = proc.communicate()
+        if not line or int(line[0]) >= 500:
+            raise RuntimeError(f'Worker failed to serve {path}: {line or stderr[-2000:]}')
+        startup.append(elapsed * 1000)
+        respawn.append(float(line[1]))
+
+    return {'startup': _stats(startup), 'respawn': _stats(respawn)}
@@ -0,0 +1,108 @@
+import gzip
+import json
+import uuid
+from collections import namedtuple
+from urllib import request as urlrequest
+from urllib.error import HTTPError
+
+import msgpack
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from core.renderers import MEDIA_TYPE as MSGPACK, packb
+
+Response = namedtuple('Response', ['status', 'nbytes', 'queries', 'data'])
+
+
+class ClientTarget:
+    """Runs requests in-process through DRF's APIClient and counts queries.
+
+    With `wire_format='msgpack'` JSON bodies are sent and responses requested as MessagePack.
+    """
+    name = 'client'
+
+    def __init__(self, wire_format='json'):
+        self.client = APIClient()
+        self.wire_format = wire_format
+
+    def request(self, method, path, token, data=None, format='json'):
+        kwargs = {'HTTP_AUTHORIZATION': f'Token {token}'}
+        if self.wire_format == 'msgpack':
+            kwargs['HTTP_ACCEPT'] = MSGPACK
+        if data is not None:
+            kwargs['data'] = data
+            kwargs['format'] = self.wire_format if format == 'json' else format
+        with CaptureQueriesContext(connection) as ctx:
+            res = getattr(self.client, method.lower())(path, **kwargs)
+        content = _decode(res.content, res.get('Content-Type'))
+        return Response(res.status_code, len(res.content), len(ctx.captured_queries), content)
+
+
+class HttpTarget:
+    """Runs requests over HTTP against a running server, e.g. `uwsgi --http :8000`.
+
+    Queries cannot be observed from outside the server so they are reported as None.
+    With `compress` responses are requested gzipped and `nbytes` is their size on the wire.
+    With `wire_format='msgpack'` JSON bodies are sent and responses requested as MessagePack.
+    """
+    name = 'http'
+
+    def __init__(self, base_url, timeout=30, compress=False, wire_format='json'):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.compress = compress
+        self.wire_format = wire_format
+
+    def request(self, method, path, token, data=None, format='json'):
+        headers = {'Authorization': f'Token {token}'}
+        if self.compress:
+            headers['Accept-Encoding'] = 'gzip'
+        if self.wire_format == 'msgpack':
+            headers['Accept'] = MSGPACK
+        body = None
+        if data is not None:
+            if format == 'multipart':
+                body, content_type = _encode_multipart(data)
+            elif self.wire_format == 'msgpack':
+                body, content_type = packb(data), MSGPACK
+            else:
+                body, content_type = json.dumps(data, default=str).encode(), 'application/json'
+            headers['Content-Type'] = content_type
+
+        req = urlrequest.Request(self.base_url + path, data=body, headers=headers, method=method.upper())
+        try:
+            with urlrequest.urlopen(req, timeout=self.timeout) as res:
+                content, status, res_headers = res.read(), res.status, res.headers
+        except HTTPError as err:
+            content, status, res_headers = err.read(), err.code, err.headers
+        nbytes = len(content)
+        if res_headers.get('Content-Encoding') == 'gzip':
+            content = gzip.decompress(content)
+        return Response(status, nbytes, None, _decode(content, res_headers.get('Content-Type')))
+
+
+def _decode(content, content_type):
+    try:
+        if content_type and content_type.startswith(MSGPACK):
+            return msgpack.unpackb(content, raw=False)
+        return json.loads(content)
+    except ValueError:
+        return None
+
+
+def _encode_multipart(data):
+    boundary = uuid.uuid4().hex
+    parts = []
+    for name, value in data.items():
+        if hasattr(value, 'read'):
+            value.seek(0)
+            filename = getattr(value, 'name', name).rsplit('/', 1)[-1]
+            parts.append(
+                f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"; filename="{filename}"\r\n'
+                'Content-Type: application/octet-stream\r\n\r\n'.encode() + value.read() + b'\r\n'
+            )
+        else:
+            parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode())
+    parts.append(f'--{boundary}--\r\n'.encode())
+    return b''.join(parts), f'multipart/form-data; boundary={boundary}'
@@ -0,0 +1,148 @@
+"""Per-user change log behind the sync endpoint.
+
+Saves and deletes of recipes, tags and ingredients, and changes to a
+recipe's tags or ingredients, are recorded from model signals. Code that
+writes in bulk without sending signals must call `record` itself. Inside
+`batch()` the records are coalesced and written once at the end, so a write
+touching the same recipe several times logs it once.
+
+Each write takes the next numbers of the user's `ChangeCounter` with one
+upsert that keeps its row locked until the transaction commits, then upserts
+the changes with them: a user's changes commit in `seq` order, so a sync cursor
+can never pass a change that is still to commit. The counter only ever grows,
+so it also serves as a per-user cache `generation`.
+"""
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.db.models import QuerySet
+from django.db.models.signals import post_save, pre_delete, post_delete, m2m_changed
+from django.dispatch import receiver
+
+from core.models import Change, ChangeCounter, Recipe, Tag, Ingredient
+
+KINDS = {Recipe: Change.RECIPE, Tag: Change.TAG, Ingredient: Change.INGREDIENT}
+
+# Through tables linking recipes to the objects they embed: {model: (through model, its column)}
+LINKS = {Tag: (Recipe.tags.through, 'tag_id'), Ingredient: (Recipe.ingredients.through, 'ingredient_id')}
+
+_pending = ContextVar('pending_changes', default=None)
+
+
+def _reserve(user_id, count):
+    """Take the next `count` numbers of the counter of `user_id`; return the last of them."""
+    table = connection.ops.quote_name(ChangeCounter._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {table} (user_id, seq) VALUES (%s, %s) '
+            f'ON CONFLICT (user_id) DO UPDATE SET seq = {table}.seq + excluded.seq RETURNING seq',
+            [user_id, count],
+        )
+        return cursor.fetchone()[0]
+
+
+def _write(user_id, entries):
+    """Log `entries` ({(kind, object id): deleted}) for `user_id` with two queries."""
+    with transaction.atomic(savepoint=False):
+        last = _reserve(user_id, len(entries))
+        Change.objects.bulk_create(
+            [
+                Change(user_id=user_id, kind=kind, object_id=object_id, deleted=deleted, seq=seq)
+                for seq, ((kind, object_id), deleted) in enumerate(entries.items(), last - len(entries) + 1)
+            ],
+            update_conflicts=True,
+            unique_fields=['user', 'kind', 'object_id'],
+            update_fields=['deleted', 'seq'],
+        )
+
+
+def record(user_id, kind, object_ids, deleted=False):
+    """Record that `object_ids` of `kind` were upserted (or deleted) for `user_id`."""
+    entries = {(kind, object_id): deleted for object_id in object_ids}
+    if not entries:
+        return
+    pending = _pending.get()
+    if pending is None:
+        _write(user_id, entries)
+    else:
+        pending[user_id].update(entries)
+
+
+def generation(user_id):
+    """A number that grows whenever anything is recorded for `user_id`, for keying caches."""
+    return ChangeCounter.objects.filter(user_id=user_id).values_list('seq', flat=True).first() or 0
+
+
+@contextmanager
+def batch():
+    """Run the block atomically and log each object it changed once, when it succeeds."""
+    if _pending.get() is not None:
+        yield
+        return
+    pending = defaultdict(dict)
+    token = _pending.set(pending)
+    try:
+        with transaction.atomic():
+            yield
+            _pending.reset(token)
+            token = None
+            # In user order, so that batches touching several users lock their counters in the same order
+            for user_id in sorted(pending):
+                _write(user_id, pending[user_id])
+    finally:
+        if token is not None:
+            _pending.reset(token)
+
+
+def _linked_recipes(instance):
+    through, column = LINKS[type(instance)]
+    return through.objects.filter(**{column: instance.pk}).values_list('recipe_id', flat=True)
+
+
+def _deleting_user(origin):
+    # Deleting the user removes its change log as well, there is nobody left to sync.
+    origin_model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    return issubclass(origin_model, get_user_model())
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+def record_save(sender, instance, created=False, raw=False, **kwargs):
+    if raw:
+        return
+    record(instance.user_id, KINDS[sender], [instance.pk])
+    if sender in LINKS and not created:
+        # Recipes embed their tags and ingredients by name, so a rename changes every recipe using it.
+        record(instance.user_id, Change.RECIPE, _linked_recipes(instance))
+
+
+@receiver(pre_delete, sender=Tag)
+@receiver(pre_delete, sender=Ingredient)
+def record_unlinked_recipes(sender, instance, origin=None, **kwargs):
+    # The links are cascaded away without m2m_changed; read the recipes losing them while they exist.
+    if not _deleting_user(origin):
+        record(instance.user_id, Change.RECIPE, _linked_recipes(instance))
+
+
+@receiver(post_delete, sender=Recipe)
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def record_delete(sender, instance, origin=None, **kwargs):
+    if not _deleting_user(origin):
+        record(instance.user_id, KINDS[sender], [instance.pk], deleted=True)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def record_relation_change(sender, instance, action, reverse, model, pk_set, **kwargs):
+    if reverse and action == 'pre_clear':
+        # The recipes losing this tag/ingredient are unknown once the rows are gone.
+        record(instance.user_id, Change.RECIPE, _linked_recipes(instance))
+    elif action in ('post_add', 'post_remove'):
+        record(instance.user_id, Change.RECIPE, pk_set if reverse else [instance.pk])
+    elif action == 'post_clear' and not reverse:
+        record(instance.user_id, Change.RECIPE, [instance.pk])
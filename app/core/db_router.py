@@ -0,0 +1,114 @@
+"""Send reads of safe requests to read replicas.
+
+`ReplicaRoutingMiddleware` picks a healthy replica for GET/HEAD/OPTIONS
+requests and `ReplicaRouter` routes that request's reads to it. Everything else
+uses the primary. A client that has just written is pinned to the primary for
+`REPLICA_PIN_SECONDS`, so it always reads its own writes. The pin is a signed
+timestamp, sent as a cookie and as an `X-DB-Pin` response header for clients
+to send back, which any worker can check. For clients that do neither, a cache
+marker keyed by their credentials (and by the token a login hands out) pins
+them too; it is only shared across workers when the cache is (`CACHE_DIR`).
+Replicas that fail to connect are skipped for `REPLICA_RETRY_SECONDS`.
+"""
+import hashlib
+import random
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from django.db import connections, DEFAULT_DB_ALIAS, OperationalError
+
+PIN_COOKIE = 'db_pin'
+PIN_HEADER = 'X-DB-Pin'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+_read_alias = ContextVar('read_alias', default=None)
+_down_until = {}
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        return _read_alias.get()
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
+
+
+def healthy_replica():
+    """Return the alias of a replica that accepts connections, or None."""
+    now = time.monotonic()
+    candidates = [alias for alias in settings.DATABASE_REPLICAS if _down_until.get(alias, 0) <= now]
+    random.shuffle(candidates)
+    for alias in candidates:
+        try:
+            connections[alias].ensure_connection()
+        except OperationalError:
+            _down_until[alias] = now + settings.REPLICA_RETRY_SECONDS
+            continue
+        return alias
+    return None
+
+
+_signer = signing.TimestampSigner(salt='core.db_router.pin')
+
+
+def _pin_key(credentials):
+    return 'db-pin:' + hashlib.sha256(credentials.encode()).hexdigest()
+
+
+def _credentials(request):
+    return request.META.get('HTTP_AUTHORIZATION') or request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+
+
+def _is_valid_pin(value):
+    try:
+        _signer.unsign(value, max_age=settings.REPLICA_PIN_SECONDS)
+    except signing.BadSignature:
+        return False
+    return True
+
+
+def pin_credentials(credentials):
+    """Read from the primary for requests authenticated with `credentials` (an Authorization header)."""
+    if settings.DATABASE_REPLICAS:
+        cache.set(_pin_key(credentials), 1, settings.REPLICA_PIN_SECONDS)
+
+
+def is_pinned(request):
+    for value in (request.COOKIES.get(PIN_COOKIE), request.headers.get(PIN_HEADER)):
+        if value and _is_valid_pin(value):
+            return True
+    credentials = _credentials(request)
+    return credentials is not None and cache.get(_pin_key(credentials)) is not None
+
+
+class ReplicaRoutingMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        alias = None
+        if settings.DATABASE_REPLICAS and request.method in SAFE_METHODS and not is_pinned(request):
+            alias = healthy_replica()
+        token = _read_alias.set(alias)
+        try:
+            response = self.get_response(request)
+        finally:
+            _read_alias.reset(token)
+
+        if request.method not in SAFE_METHODS and response.status_code < 400 and settings.DATABASE_REPLICAS:
+            pin = _signer.sign('primary')
+            response.set_cookie(PIN_COOKIE, pin, max_age=settings.REPLICA_PIN_SECONDS, httponly=True, samesite='Lax')
+            response[PIN_HEADER] = pin
+            credentials = _credentials(request)
+            if credentials is not None:
+                pin_credentials(credentials)
+        return response
@@ -0,0 +1,23 @@
+from django.conf import settings
+from django.contrib.auth import hashers
+
+
+class Argon2PasswordHasher(hashers.Argon2PasswordHasher):
+    """Argon2id with costs taken from settings.
+
+    Django's defaults use 100 MiB and 8 lanes per hash; the settings default to
+    the OWASP recommended minimum instead, which is far cheaper per login while
+    still memory hard. Changing the costs rehashes passwords on the next login.
+    """
+
+    @property
+    def time_cost(self):
+        return settings.ARGON2_TIME_COST
+
+    @property
+    def memory_cost(self):
+        return settings.ARGON2_MEMORY_COST
+
+    @property
+    def parallelism(self):
+        return settings.ARGON2_PARALLELISM
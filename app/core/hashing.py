@@ -0,0 +1,69 @@
+"""Password hashing on a small bounded thread pool.
+
+This does not free the worker: the request thread hands the hash to the pool
+and blocks until it is done. What the pool bounds is how many hashes a process
+runs at once, `PASSWORD_HASH_WORKERS`, with up to `PASSWORD_HASH_QUEUE` more
+waiting for them; a caller finding no room waits up to
+`PASSWORD_HASH_QUEUE_TIMEOUT` seconds and then fails with HTTP 503
+(`HashingBusy`). That only matters for processes serving requests from several
+threads; a single threaded uWSGI worker never hashes more than once at a time,
+so there the per-host limit is simply the number of workers.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import hashers
+from rest_framework.exceptions import APIException
+
+_lock = threading.Lock()
+_executor = None
+_slots = None
+
+
+class HashingBusy(APIException):
+    status_code = 503
+    default_detail = 'Too many password operations in progress, try again shortly.'
+    default_code = 'hashing_busy'
+
+
+def _get_pool():
+    # Created lazily so that uWSGI workers never inherit threads from the master.
+    global _executor, _slots
+    with _lock:
+        if _executor is None:
+            workers = settings.PASSWORD_HASH_WORKERS
+            _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hash')
+            _slots = threading.BoundedSemaphore(workers + settings.PASSWORD_HASH_QUEUE)
+    return _executor, _slots
+
+
+def run(fn, *args):
+    """Run `fn(*args)` on the hashing pool, blocking until it returns; raise `HashingBusy` if there is no room."""
+    executor, slots = _get_pool()
+    if not slots.acquire(timeout=settings.PASSWORD_HASH_QUEUE_TIMEOUT):
+        raise HashingBusy()
+    try:
+        return executor.submit(fn, *args).result()
+    finally:
+        slots.release()
+
+
+def make_password(password):
+    if password is None:
+        return hashers.make_password(None)
+    return run(hashers.make_password, password)
+
+
+def verify_password(password, encoded):
+    """Return `(is_correct, must_update)` for `password` against the `encoded` hash.
+
+    `must_update` is True when the hash was made with a hasher or with
+    parameters other than the preferred ones, so the caller can rehash it.
+    """
+    if password is None or not hashers.is_password_usable(encoded):
+        return False, False
+
+    updates = []
+    is_correct = run(hashers.check_password, password, encoded, updates.append)
+    return is_correct, bool(updates)
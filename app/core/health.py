@@ -0,0 +1,48 @@
+"""Liveness and readiness probes at /healthz and /readyz.
+
+They are answered by `HealthCheckMiddleware` before anything else runs, so
+probes addressed to a worker's IP are not rejected by ALLOWED_HOSTS and never
+touch sessions or authentication. /readyz only says which checks failed; why
+they failed goes to the log, not to whoever can reach the endpoint.
+"""
+import logging
+
+from django.conf import settings
+from django.http import JsonResponse
+from django.utils.cache import add_never_cache_headers
+
+from core import readiness
+
+logger = logging.getLogger(__name__)
+
+
+def healthz(request):
+    """Liveness: the worker is up and serving requests."""
+    return JsonResponse({'status': 'ok'})
+
+
+def readyz(request):
+    """Readiness: the database, cache and media volume can be used."""
+    failures = readiness.run_checks(settings.READINESS_CHECKS, settings.READINESS_CHECK_TIMEOUT)
+    for name, error in failures.items():
+        logger.warning('Readiness check %s failed: %s', name, error)
+    checks = {name: 'fail' if name in failures else 'ok' for name in settings.READINESS_CHECKS}
+    return JsonResponse(
+        {'status': 'unavailable' if failures else 'ok', 'checks': checks},
+        status=503 if failures else 200,
+    )
+
+
+class HealthCheckMiddleware:
+    probes = {'/healthz': healthz, '/readyz': readyz}
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        probe = self.probes.get(request.path_info)
+        if probe is None:
+            return self.get_response(request)
+        response = probe(request)
+        add_never_cache_headers(response)
+        return response
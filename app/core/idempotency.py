@@ -0,0 +1,144 @@
+"""`Idempotency-Key` support for writes that clients retry.
+
+A view method wrapped with `@idempotent` remembers, per user and key, a
+fingerprint of the request (method, path and a SHA-256 of the parsed body,
+including uploaded files) and the status and data of its response. A retry
+with the same key gets that response back, with an `Idempotent-Replayed`
+header, without running the serializer, the writes or the background jobs
+again. Keys expire after `IDEMPOTENCY_KEY_TTL` seconds; a user's expired keys
+are deleted whenever they use a new one.
+
+Reusing a key for a different request is rejected with 422 and retrying
+while the first request is still running with 409, until it has held the key
+for `IDEMPOTENCY_LOCK_TIMEOUT` seconds: then it is presumed dead (its worker
+was killed, say) and the retry takes the key over and runs. Requests whose
+handler raises, which includes DRF's 4xx errors such as validation failures,
+or that answer with a 5xx forget their key so the retry runs again; 4xx
+responses returned without raising are replayed like any other. The handler
+runs in a transaction that also stores its response, so the two commit or
+roll back together.
+"""
+import hashlib
+import json
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework.exceptions import APIException, ValidationError
+from rest_framework.response import Response
+
+from core.models import IdempotencyKey
+
+HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 255
+
+
+class KeyInUse(APIException):
+    status_code = 409
+    default_detail = 'A request with this Idempotency-Key is still in progress.'
+    default_code = 'idempotency_key_in_use'
+
+
+class KeyReused(APIException):
+    status_code = 422
+    default_detail = 'This Idempotency-Key was already used for a different request.'
+    default_code = 'idempotency_key_reused'
+
+
+def _update(digest, value):
+    if isinstance(value, UploadedFile):
+        digest.update(f'file:{value.name}:{value.size}:'.encode())
+        for chunk in value.chunks():
+            digest.update(chunk)
+        value.seek(0)
+    else:
+        digest.update(json.dumps(value, sort_keys=True, default=str).encode())
+
+
+def fingerprint(request):
+    """SHA-256 of the method, path and parsed body of `request`."""
+    digest = hashlib.sha256(f'{request.method} {request.path}\n'.encode())
+    data = request.data
+    if hasattr(data, 'lists'):
+        for name, values in sorted(data.lists()):
+            digest.update(f'{name}\n'.encode())
+            for value in values:
+                _update(digest, value)
+    else:
+        _update(digest, data)
+    return digest.hexdigest()
+
+
+def _replay(stored, request_fingerprint):
+    if stored.fingerprint != request_fingerprint:
+        raise KeyReused()
+    if stored.status_code is None:
+        raise KeyInUse()
+    return Response(stored.response, status=stored.status_code, headers={'Idempotent-Replayed': 'true'})
+
+
+def _reclaim(stored, now):
+    """Take over the key of a request that has held it for longer than `IDEMPOTENCY_LOCK_TIMEOUT`."""
+    stale = now - timedelta(seconds=settings.IDEMPOTENCY_LOCK_TIMEOUT)
+    if stored.status_code is not None or (stored.locked_at is not None and stored.locked_at > stale):
+        return False
+    # Only one of several retries racing for the key gets to run.
+    return IdempotencyKey.objects.filter(pk=stored.pk, status_code=None, locked_at=stored.locked_at).update(
+        locked_at=now,
+    ) == 1
+
+
+def idempotent(handler):
+    """Let clients retry the wrapped view method safely by sending an `Idempotency-Key` header."""
+    @wraps(handler)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.headers.get(HEADER)
+        if not key:
+            return handler(self, request, *args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            raise ValidationError({HEADER: f'Ensure this value has at most {MAX_KEY_LENGTH} characters.'})
+
+        now = timezone.now()
+        request_fingerprint = fingerprint(request)
+        stored = IdempotencyKey.objects.filter(user=request.user, key=key, expires_at__gt=now).first()
+        if stored is not None:
+            if stored.fingerprint != request_fingerprint or not _reclaim(stored, now):
+                return _replay(stored, request_fingerprint)
+        else:
+            IdempotencyKey.objects.filter(user=request.user, expires_at__lte=now).delete()
+            try:
+                with transaction.atomic():
+                    stored = IdempotencyKey.objects.create(
+                        user=request.user,
+                        key=key,
+                        fingerprint=request_fingerprint,
+                        expires_at=now + timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL),
+                        locked_at=now,
+                    )
+            except IntegrityError:
+                # Another request with the key got in first, and may have failed and let go of it since.
+                stored = IdempotencyKey.objects.filter(user=request.user, key=key).first()
+                if stored is None:
+                    raise KeyInUse()
+                return _replay(stored, request_fingerprint)
+
+        try:
+            # The writes and the stored response commit together: a retry never finds the writes
+            # done but the key still open, or a replayable response whose writes were rolled back.
+            with transaction.atomic():
+                response = handler(self, request, *args, **kwargs)
+                if response.status_code < 500:
+                    IdempotencyKey.objects.filter(pk=stored.pk).update(
+                        status_code=response.status_code, response=response.data,
+                    )
+        except Exception:
+            stored.delete()
+            raise
+        if response.status_code >= 500:
+            stored.delete()
+        return response
+
+    return wrapper
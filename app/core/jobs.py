@@ -0,0 +1,118 @@
+"""Small database backed job queue.
+
+Register a task with `@task` in an app's `tasks.py` and enqueue it with
+`enqueue('app.task_name', **payload)`. Jobs are rows in `core.Job`; workers
+(`manage.py run_worker`) claim them with `SELECT ... FOR UPDATE SKIP LOCKED`,
+so any number of workers can share the table. Enqueueing inside a transaction
+only makes the job visible once that transaction commits. Successful jobs are
+deleted, failing ones are retried with exponential backoff and kept as
+`failed` once they run out of attempts.
+"""
+import logging
+import random
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.module_loading import autodiscover_modules
+
+from core.models import Job
+
+logger = logging.getLogger(__name__)
+
+_registry = {}
+
+
+def task(func=None, *, name=None):
+    """Register `func` as a task, by default under `<module>.<function name>`."""
+    def register(func):
+        _registry[name or f'{func.__module__}.{func.__name__}'] = func
+        return func
+
+    return register(func) if func is not None else register
+
+
+def autodiscover():
+    autodiscover_modules('tasks')
+
+
+def enqueue(name, run_at=None, max_attempts=None, **payload):
+    return Job.objects.create(
+        name=name,
+        payload=payload,
+        run_at=run_at or timezone.now(),
+        max_attempts=max_attempts or settings.JOB_MAX_ATTEMPTS,
+    )
+
+
+def backoff(attempts):
+    """Seconds to wait before retrying a job that failed `attempts` times."""
+    delay = min(settings.JOB_BACKOFF_MAX, settings.JOB_BACKOFF_BASE * 2 ** (attempts - 1))
+    return delay * random.uniform(0.5, 1.0)
+
+
+def claim(limit=1):
+    """Lock up to `limit` due jobs for this worker and mark them running.
+
+    Running jobs whose lock is older than `JOB_LOCK_TIMEOUT` belonged to a
+    worker that died and are claimed again.
+    """
+    now = timezone.now()
+    stale = now - timedelta(seconds=settings.JOB_LOCK_TIMEOUT)
+    with transaction.atomic():
+        jobs = list(
+            Job.objects.select_for_update(skip_locked=True)
+            .filter(Q(status=Job.QUEUED, run_at__lte=now) | Q(status=Job.RUNNING, locked_at__lt=stale))
+            .order_by('run_at', 'id')[:limit]
+        )
+        if jobs:
+            Job.objects.filter(id__in=[job.id for job in jobs]).update(
+                status=Job.RUNNING, locked_at=now, attempts=F('attempts') + 1,
+            )
+    for job in jobs:
+        job.status, job.locked_at, job.attempts = Job.RUNNING, now, job.attempts + 1
+    return jobs
+
+
+def run_job(job):
+    """Run a claimed job; return True if it succeeded."""
+    try:
+        func = _registry[job.name]
+    except KeyError:
+        job.attempts = job.max_attempts
+        _fail(job, f'Unknown task {job.name!r}')
+        return False
+
+    try:
+        func(**job.payload)
+    except Exception:
+        logger.exception('Job %s (%s) failed', job.id, job.name)
+        _fail(job, traceback.format_exc())
+        return False
+
+    Job.objects.filter(id=job.id).delete()
+    return True
+
+
+def _fail(job, error):
+    if job.attempts >= job.max_attempts:
+        Job.objects.filter(id=job.id).update(status=Job.FAILED, locked_at=None, last_error=error)
+    else:
+        run_at = timezone.now() + timedelta(seconds=backoff(job.attempts))
+        Job.objects.filter(id=job.id).update(status=Job.QUEUED, locked_at=None, run_at=run_at, last_error=error)
+
+
+def run_pending(limit=None):
+    """Run due jobs in this thread until none are left (or `limit` ran); return how many ran."""
+    autodiscover()
+    count = 0
+    while limit is None or count < limit:
+        jobs = claim()
+        if not jobs:
+            break
+        run_job(jobs[0])
+        count += 1
+    return count
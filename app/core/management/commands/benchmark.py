@@ -0,0 +1,127 @@
+import tempfile
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment, override_settings
+
+from core.benchmarks import (
+    SCENARIOS, ClientTarget, HttpTarget, seed_data, run_scenarios, run_bursts, compare_results, load_baseline,
+    save_baseline, measure_startup,
+)
+from core.benchmarks.scenarios import build_context
+from core.benchmarks.seed import clear_data
+
+
+class Command(BaseCommand):
+    help = 'Run the recipe API benchmark suite and compare it against a JSON baseline.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=2)
+        parser.add_argument('--recipes', type=int, default=50, help='Recipes per user')
+        parser.add_argument('--tags', type=int, default=10, help='Tags per user')
+        parser.add_argument('--ingredients', type=int, default=10, help='Ingredients per user')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed for the data generator')
+        parser.add_argument('--iterations', type=int, default=50)
+        parser.add_argument('--warmup', type=int, default=5)
+        parser.add_argument('--scenario', action='append', choices=list(SCENARIOS), dest='scenarios')
+        parser.add_argument(
+            '--url',
+            help='Benchmark a running server (e.g. `THROTTLE_ENABLED=0 uwsgi --http :8000 --module app.wsgi`) '
+                 'instead of the in-process test client. Needs --allow-seed.',
+        )
+        parser.add_argument(
+            '--allow-seed', action='store_true',
+            help='Let --url create bench-*@example.com users and their recipes in the configured database, '
+                 'and delete them when done',
+        )
+        parser.add_argument(
+            '--burst', action='store_true',
+            help='With --url, send the scenarios in concurrent bursts separated by idle periods',
+        )
+        parser.add_argument(
+            '--compress', action='store_true',
+            help='With --url, accept gzipped responses; bytes are then counted as sent over the wire',
+        )
+        parser.add_argument(
+            '--format', choices=['json', 'msgpack'], default='json', dest='wire_format',
+            help='Request and response body format; compare the bytes and latency of both',
+        )
+        parser.add_argument('--concurrency', type=int, default=16, help='Concurrent requests of a burst')
+        parser.add_argument('--bursts', type=int, default=5)
+        parser.add_argument('--burst-size', type=int, default=64, help='Requests per burst')
+        parser.add_argument('--idle', type=float, default=5.0, help='Seconds between bursts')
+        parser.add_argument(
+            '--startup', type=int, default=0, metavar='RUNS',
+            help='Also time RUNS cold worker starts up to their first response',
+        )
+        parser.add_argument('--baseline', help='Path of the JSON baseline to compare against')
+        parser.add_argument('--save', action='store_true', help='Write the results to --baseline')
+        parser.add_argument('--tolerance', type=float, default=0.2, help='Allowed relative regression')
+
+    def handle(self, *args, **options):
+        names = options['scenarios'] or list(SCENARIOS)
+        for flag in ('burst', 'compress'):
+            if options[flag] and not options['url']:
+                raise CommandError(f'--{flag} needs a running server, pass --url.')
+        if options['url'] and not options['allow_seed']:
+            raise CommandError(
+                '--url seeds bench-*@example.com users into the configured database and deletes them '
+                'afterwards; never point it at production data. Pass --allow-seed to go ahead.'
+            )
+        sizes = {key: options[key] for key in ('users', 'recipes', 'tags', 'ingredients', 'seed')}
+
+        if options['url']:
+            results = self._run_http(options['url'], names, sizes, options)
+        else:
+            results = self._run_in_process(names, sizes, options)
+        if options['startup']:
+            results.update(measure_startup(options['startup']))
+
+        for name, stats in results.items():
+            self.stdout.write(
+                f"{name:<14} p50={stats['p50']:>8.2f}ms p95={stats['p95']:>8.2f}ms p99={stats['p99']:>8.2f}ms "
+                f"{stats['throughput']:>8.1f} req/s queries={stats['queries']}"
+                + (f" bytes={stats['bytes']}" if stats.get('bytes') else '')
+                + (f" failures={stats['failures']}" if 'failures' in stats else '')
+            )
+
+        if not options['baseline']:
+            return
+        if options['save']:
+            save_baseline(
+                options['baseline'], results,
+                dict(sizes, target='http' if options['url'] else 'client', format=options['wire_format']),
+            )
+            self.stdout.write(self.style.SUCCESS(f"Baseline written to {options['baseline']}"))
+            return
+
+        regressions = compare_results(results, load_baseline(options['baseline']), options['tolerance'])
+        if regressions:
+            raise CommandError('Benchmark regressed:\n  ' + '\n  '.join(regressions))
+        self.stdout.write(self.style.SUCCESS('No regressions against baseline.'))
+
+    def _run_in_process(self, names, sizes, options):
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            with tempfile.TemporaryDirectory() as media_root, \
+                    override_settings(MEDIA_ROOT=media_root, THROTTLE_ENABLED=False):
+                ctx = build_context(seed_data(**sizes))
+                return run_scenarios(ClientTarget(options['wire_format']), ctx, names, SCENARIOS, options['iterations'], options['warmup'])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+    def _run_http(self, url, names, sizes, options):
+        clear_data()
+        ctx = build_context(seed_data(**sizes))
+        target = HttpTarget(url, compress=options['compress'], wire_format=options['wire_format'])
+        try:
+            if options['burst']:
+                return run_bursts(
+                    target, ctx, names, SCENARIOS,
+                    options['concurrency'], options['bursts'], options['burst_size'], options['idle'],
+                )
+            return run_scenarios(target, ctx, names, SCENARIOS, options['iterations'], options['warmup'])
+        finally:
+            clear_data()
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from core import schema
+
+
+class Command(BaseCommand):
+    help = 'Render the OpenAPI schema into API_SCHEMA_ROOT so workers never generate it.'
+
+    def handle(self, *args, **options):
+        for path in schema.build():
+            self.stdout.write(f'Wrote {path}')
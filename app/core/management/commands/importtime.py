@@ -0,0 +1,51 @@
+import os
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+def parse_importtime(output):
+    """Parse `python -X importtime` output into (self_us, cumulative_us, module) tuples."""
+    rows = []
+    for line in output.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        self_us, cumulative_us, module = line[len('import time:'):].split('|')
+        if self_us.strip().isdigit():
+            rows.append((int(self_us), int(cumulative_us), module.strip()))
+    return rows
+
+
+class Command(BaseCommand):
+    help = 'Report the slowest imports of a cold worker start.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--module', default='app.wsgi', help='Module to import, as a worker would')
+        parser.add_argument('--limit', type=int, default=20)
+        parser.add_argument(
+            '--sort', choices=['self', 'cumulative'], default='cumulative',
+            help='Rank by time spent in the module itself or including its imports',
+        )
+
+    def handle(self, *args, **options):
+        proc = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', f'import {options["module"]}'],
+            cwd=settings.BASE_DIR,
+            env=dict(os.environ, DJANGO_SETTINGS_MODULE=settings.SETTINGS_MODULE),
+            capture_output=True,
+            text=True,
+        )
+        if proc.returncode:
+            raise CommandError(f'Importing {options["module"]} failed:\n{proc.stderr[-2000:]}')
+
+        rows = parse_importtime(proc.stderr)
+        index = 0 if options['sort'] == 'self' else 1
+        rows.sort(key=lambda row: row[index], reverse=True)
+
+        total = sum(row[0] for row in rows)
+        self.stdout.write(f'{len(rows)} modules imported in {total / 1000:.1f}ms')
+        self.stdout.write(f"{'self ms':>9} {'cumul. ms':>10}  module")
+        for self_us, cumulative_us, module in rows[:options['limit']]:
+            self.stdout.write(f'{self_us / 1000:>9.1f} {cumulative_us / 1000:>10.1f}  {module}')
@@ -0,0 +1,64 @@
+import logging
+import signal
+import threading
+
+from django.core.management.base import BaseCommand
+from django.db import connection, DatabaseError
+
+from core import jobs
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Run queued background jobs.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=1, help='Number of worker threads')
+        parser.add_argument('--poll-interval', type=float, default=1.0, help='Seconds to sleep when idle')
+        parser.add_argument('--once', action='store_true', help='Exit once no job is due')
+
+    def handle(self, *args, **options):
+        jobs.autodiscover()
+        self.stop = threading.Event()
+        previous = {}
+        if threading.current_thread() is threading.main_thread():
+            for signum in (signal.SIGTERM, signal.SIGINT):
+                previous[signum] = signal.signal(signum, lambda *_: self.stop.set())
+
+        threads = [
+            threading.Thread(target=self.work, args=(options['poll_interval'], options['once']), daemon=True)
+            for _ in range(options['concurrency'])
+        ]
+        self.stdout.write(f"Worker started with {options['concurrency']} thread(s)")
+        for thread in threads:
+            thread.start()
+        try:
+            for thread in threads:
+                while thread.is_alive():
+                    thread.join(0.5)
+        finally:
+            for signum, handler in previous.items():
+                signal.signal(signum, handler)
+        self.stdout.write(self.style.SUCCESS('Worker stopped'))
+
+    def work(self, poll_interval, once):
+        try:
+            while not self.stop.is_set():
+                try:
+                    claimed = jobs.claim()
+                    if claimed:
+                        jobs.run_job(claimed[0])
+                except DatabaseError:
+                    # Keep the worker alive through database restarts and lock timeouts; a job
+                    # left running is claimed again once its lock times out.
+                    logger.exception('Job queue database error')
+                    connection.close()
+                    self.stop.wait(poll_interval)
+                    continue
+                if not claimed:
+                    if once:
+                        break
+                    self.stop.wait(poll_interval)
+        finally:
+            connection.close()
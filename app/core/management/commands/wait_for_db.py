@@ -1,21 +1,31 @@
-import time
-from django.core.management.base import BaseCommand
-from django.db.utils import OperationalError
-from psycopg2 import OperationalError as Psycopg2Error
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core import readiness
+
 
 class Command(BaseCommand):
-    def handle(self, *args, **options):
-        self.stdout.write('Waiting for database...')
-        db_up = False
+    help = 'Wait until the database (and optionally the cache and media volume) are ready.'
 
-        while db_up == False:
-            try:
-                self.check(databases=['default'])
-                db_up = True
-            except (Psycopg2Error, OperationalError):
-                self.stdout.write('Database unavailable.. Waiting for a second')
-                time.sleep(1)
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check', action='append', choices=list(readiness.CHECKS), dest='checks',
+            help='What to wait for, may be repeated (default: database)',
+        )
+        parser.add_argument('--timeout', type=float, default=60, help='Seconds to wait before giving up')
+
+    def handle(self, *args, **options):
+        names = options['checks'] or ['database']
+        self.stdout.write(f"Waiting for {', '.join(names)}...")
 
-        self.stdout.write(self.style.SUCCESS('Database available!!'))
+        def on_retry(failures, delay):
+            details = '; '.join(f'{name}: {error}' for name, error in failures.items())
+            self.stdout.write(f'Not ready ({details}), retrying in {delay:.2f}s')
 
+        failures = readiness.wait_until_ready(
+            names, options['timeout'], settings.READINESS_CHECK_TIMEOUT, on_retry=on_retry,
+        )
+        if failures:
+            raise CommandError(f"Not ready after {options['timeout']}s: {', '.join(failures)}")
 
+        self.stdout.write(self.style.SUCCESS(f"{', '.join(names).capitalize()} available!!"))
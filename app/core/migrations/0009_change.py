@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:20
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_changes(apps, schema_editor):
+    """Log every existing object so that a first sync returns the whole catalogue."""
+    Change = apps.get_model('core', 'Change')
+    for kind, model_name in (('recipe', 'Recipe'), ('tag', 'Tag'), ('ingredient', 'Ingredient')):
+        model = apps.get_model('core', model_name)
+        rows = model.objects.order_by('id').values_list('id', 'user_id').iterator()
+        Change.objects.bulk_create(
+            (Change(user_id=user_id, kind=kind, object_id=object_id) for object_id, user_id in rows),
+            batch_size=1000,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_recipe_image'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Change',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('recipe', 'Recipe'), ('tag', 'Tag'), ('ingredient', 'Ingredient')], max_length=20)),
+                ('object_id', models.BigIntegerField()),
+                ('deleted', models.BooleanField(default=False)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', 'id'], name='core_change_user_id_dfd788_idx'), models.Index(fields=['user', 'kind', 'object_id'], name='core_change_user_id_72ab0d_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_changes, migrations.RunPython.noop),
+    ]
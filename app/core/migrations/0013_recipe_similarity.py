@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-19 03:05
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_recipe_range_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeSimilarityState',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('change_id', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='RecipeSimilarity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField()),
+                ('recipe', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='similarities', to='core.recipe')),
+                ('similar', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='similar_to', to='core.recipe')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('recipe', 'similar'), name='core_recipesimilarity_unique')],
+            },
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-19 03:34
+
+from django.db import migrations
+
+# The admin searches with `icontains`, which PostgreSQL runs as
+# UPPER(column::text) LIKE UPPER('%term%'); trigram indexes of that exact
+# expression answer it without reading the whole table.
+SEARCH_COLUMNS = [
+    ('core_user', 'email'),
+    ('core_user', 'name'),
+    ('core_recipe', 'title'),
+    ('core_tag', 'name'),
+    ('core_ingredient', 'name'),
+]
+
+
+def create_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for table, column in SEARCH_COLUMNS:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {table}_{column}_trgm_idx '
+            f'ON {table} USING gin (UPPER({column}::text) gin_trgm_ops)'
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for table, column in SEARCH_COLUMNS:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {table}_{column}_trgm_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_idempotencykey'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
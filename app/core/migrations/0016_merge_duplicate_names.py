@@ -0,0 +1,62 @@
+# Generated by Django 5.2.18 on 2026-10-19 03:41
+
+from django.db import migrations
+from django.db.models import Count, Min
+
+# {model: (recipe field, column of the through table)}
+VOCABULARIES = {
+    'Tag': ('tags', 'tag_id'),
+    'Ingredient': ('ingredients', 'ingredient_id'),
+}
+
+
+def _log(Change, user_id, kind, object_ids, deleted):
+    Change.objects.filter(user_id=user_id, kind=kind, object_id__in=object_ids).delete()
+    Change.objects.bulk_create([
+        Change(user_id=user_id, kind=kind, object_id=object_id, deleted=deleted) for object_id in object_ids
+    ])
+
+
+def merge_duplicates(apps, schema_editor):
+    """Fold every tag and ingredient into the oldest one of the same user and name.
+
+    Same as `manage.py merge_duplicate_names`, which can be run ahead of this migration.
+    """
+    Recipe = apps.get_model('core', 'Recipe')
+    Change = apps.get_model('core', 'Change')
+    for model_name, (field, column) in VOCABULARIES.items():
+        model = apps.get_model('core', model_name)
+        through = getattr(Recipe, field).through
+        groups = (
+            model.objects.values('user_id', 'name')
+            .annotate(keep=Min('id'), copies=Count('id'))
+            .filter(copies__gt=1)
+        )
+        for group in groups:
+            sources = list(
+                model.objects.filter(user_id=group['user_id'], name=group['name'])
+                .exclude(id=group['keep']).values_list('id', flat=True)
+            )
+            recipe_ids = set()
+            for source in sources:
+                source_links = through.objects.filter(**{column: source})
+                recipe_ids.update(source_links.values_list('recipe_id', flat=True))
+                source_links.exclude(
+                    recipe_id__in=through.objects.filter(**{column: group['keep']}).values('recipe_id'),
+                ).update(**{column: group['keep']})
+                source_links.delete()
+            model.objects.filter(id__in=sources).delete()
+            _log(Change, group['user_id'], model_name.lower(), sources, deleted=True)
+            _log(Change, group['user_id'], 'recipe', recipe_ids, deleted=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_admin_search_trigram_indexes'),
+    ]
+
+    # A migration of its own: PostgreSQL cannot alter tables with constraint checks still pending.
+    operations = [
+        migrations.RunPython(merge_duplicates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.18 on 2026-10-19 03:47
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F, Max
+
+
+def number_changes(apps, schema_editor):
+    """Keep the newest row of each object, number the rows by id and start the counters after them."""
+    Change = apps.get_model('core', 'Change')
+    ChangeCounter = apps.get_model('core', 'ChangeCounter')
+    newest = Change.objects.values('user_id', 'kind', 'object_id').annotate(newest=Max('id')).values('newest')
+    Change.objects.exclude(id__in=newest).delete()
+    Change.objects.update(seq=F('id'))
+    ChangeCounter.objects.bulk_create(
+        ChangeCounter(user_id=row['user_id'], seq=row['last'])
+        for row in Change.objects.values('user_id').annotate(last=Max('id')).order_by()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0017_unique_tag_ingredient_names'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeCounter',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('seq', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.RemoveIndex(
+            model_name='change',
+            name='core_change_user_id_dfd788_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='change',
+            name='core_change_user_id_72ab0d_idx',
+        ),
+        migrations.AddField(
+            model_name='change',
+            name='seq',
+            field=models.BigIntegerField(default=0),
+            preserve_default=False,
+        ),
+        migrations.RunPython(number_changes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-19 03:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0018_change_seq'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='change',
+            index=models.Index(fields=['user', 'seq'], name='core_change_user_seq_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='change',
+            constraint=models.UniqueConstraint(fields=('user', 'kind', 'object_id'), name='core_change_user_object_unique'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 04:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0019_change_unique_object'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='idempotencykey',
+            name='locked_at',
+            field=models.DateTimeField(null=True),
+        ),
+    ]
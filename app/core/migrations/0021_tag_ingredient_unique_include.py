@@ -0,0 +1,59 @@
+# Generated by Django 5.2.18 on 2026-10-19 04:02
+
+from django.db import migrations, models
+
+# Databases without covering indexes (SQLite) skip a UniqueConstraint with
+# `include` altogether; give them the plain unique index under the same name
+# so names stay unique there too.
+TABLES = ['core_tag', 'core_ingredient']
+
+
+def create_plain_unique_indexes(apps, schema_editor):
+    if schema_editor.connection.features.supports_covering_indexes:
+        return
+    for table in TABLES:
+        schema_editor.execute(
+            f'CREATE UNIQUE INDEX IF NOT EXISTS {table}_user_name_unique ON {table} (user_id, name)'
+        )
+
+
+def drop_plain_unique_indexes(apps, schema_editor):
+    if schema_editor.connection.features.supports_covering_indexes:
+        return
+    for table in TABLES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {table}_user_name_unique')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0020_idempotencykey_locked_at'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='ingredient',
+            name='core_ingredient_user_name_unique',
+        ),
+        migrations.RemoveConstraint(
+            model_name='tag',
+            name='core_tag_user_name_unique',
+        ),
+        migrations.RemoveIndex(
+            model_name='ingredient',
+            name='core_ingredient_user_name_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='tag',
+            name='core_tag_user_name_idx',
+        ),
+        migrations.AddConstraint(
+            model_name='ingredient',
+            constraint=models.UniqueConstraint(fields=('user', 'name'), include=('id',), name='core_ingredient_user_name_unique'),
+        ),
+        migrations.AddConstraint(
+            model_name='tag',
+            constraint=models.UniqueConstraint(fields=('user', 'name'), include=('id',), name='core_tag_user_name_unique'),
+        ),
+        migrations.RunPython(create_plain_unique_indexes, drop_plain_unique_indexes),
+    ]
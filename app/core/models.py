@@ -1,10 +1,14 @@
 from django.db import models
 from django.conf import settings
+from django.utils import timezone
+from django.core.serializers.json import DjangoJSONEncoder
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, PermissionsMixin
 
 import uuid
 import os
 
+from core import hashing
+
 def recipe_file_path(instance, filename):
     ext = os.path.splitext(filename)[1]
     filename = f'{uuid.uuid4()}{ext}'
@@ -41,8 +45,21 @@ class User(AbstractBaseUser, PermissionsMixin):
 
     USERNAME_FIELD = 'email'
 
+    def set_password(self, raw_password):
+        self.password = hashing.make_password(raw_password)
+        self._password = raw_password
+
+    def check_password(self, raw_password):
+        """Check the password on the hashing pool and rehash it if the preferred hasher changed."""
+        is_correct, must_update = hashing.verify_password(raw_password, self.password)
+        if is_correct and must_update:
+            self.set_password(raw_password)
+            self._password = None
+            self.save(update_fields=['password'])
+        return is_correct
+
 class Recipe(models.Model):
-    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, db_index=False)
     title = models.CharField(max_length=100)
     time_minutes = models.IntegerField(null=True)
     price = models.DecimalField(max_digits=5, decimal_places=2)
@@ -52,19 +69,144 @@ class Recipe(models.Model):
     ingredients = models.ManyToManyField('Ingredient')
     image = models.ImageField(null=True, upload_to=recipe_file_path)
 
+    class Meta:
+        # Leads with user, so it also replaces the foreign key's own index
+        indexes = [
+            # Lets a page of the recipe list be read from the index alone
+            models.Index(
+                fields=['user', 'id'],
+                include=['title', 'time_minutes', 'price', 'link'],
+                name='core_recipe_user_list_idx',
+            ),
+            # Range filters and keyset pages ordered by price or time, id breaks ties
+            models.Index(fields=['user', 'price', 'id'], name='core_recipe_user_price_idx'),
+            models.Index(fields=['user', 'time_minutes', 'id'], name='core_recipe_user_time_idx'),
+        ]
+
     def __str__(self):
         return self.title
     
 class Tag(models.Model):
     name = models.CharField(max_length=100)
-    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, db_index=False)
+
+    class Meta:
+        # Concurrent recipe writes creating the same name meet here, see recipe/vocabulary.py.
+        # Also covers the name ordered lists; the id is included for index only scans.
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'name'], include=['id'], name='core_tag_user_name_unique'),
+        ]
 
     def __str__(self):
         return self.name
 
 class Ingredient(models.Model):
     name = models.CharField(max_length=100)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, db_index=False)
+
+    class Meta:
+        # Concurrent recipe writes creating the same name meet here, see recipe/vocabulary.py.
+        # Also covers the name ordered lists; the id is included for index only scans.
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'name'], include=['id'], name='core_ingredient_user_name_unique'),
+        ]
+
+    def __str__(self):
+        return self.name
+
+class RecipeSimilarity(models.Model):
+    """One of the recipes most similar to `recipe`, see recipe/similarity.py."""
+    recipe = models.ForeignKey(Recipe, on_delete=models.CASCADE, related_name='similarities', db_index=False)
+    # Rows outlive a deleted `similar` recipe so the lists that held it can be found and rebuilt.
+    similar = models.ForeignKey(
+        Recipe, on_delete=models.DO_NOTHING, db_constraint=False, related_name='similar_to',
+    )
+    score = models.FloatField()
+
+    class Meta:
+        # Leads with recipe, so it also replaces the foreign key's own index
+        constraints = [
+            models.UniqueConstraint(fields=['recipe', 'similar'], name='core_recipesimilarity_unique'),
+        ]
+
+
+class RecipeSimilarityState(models.Model):
+    """The newest change of a user already reflected in their similar recipe lists."""
+    user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, primary_key=True)
+    change_id = models.BigIntegerField(default=0)
+
+
+class Change(models.Model):
+    """Latest change of one of a user's recipes, tags or ingredients.
+
+    Only the most recent change of each object is kept. `seq` is handed out
+    by the user's `ChangeCounter` while its row is locked until commit, so a
+    user's changes become visible in `seq` order and everything after a sync
+    cursor is exactly what the client is missing.
+    """
+    RECIPE = 'recipe'
+    TAG = 'tag'
+    INGREDIENT = 'ingredient'
+    KIND_CHOICES = [(RECIPE, 'Recipe'), (TAG, 'Tag'), (INGREDIENT, 'Ingredient')]
+
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    object_id = models.BigIntegerField()
+    deleted = models.BooleanField(default=False)
+    seq = models.BigIntegerField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'seq'], name='core_change_user_seq_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'kind', 'object_id'], name='core_change_user_object_unique'),
+        ]
+
+
+class ChangeCounter(models.Model):
+    """The last `Change.seq` handed out for a user, see core/changes.py."""
+    user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, primary_key=True)
+    seq = models.BigIntegerField(default=0)
+
+
+class Job(models.Model):
+    """A queued call of a registered task, see core/jobs.py."""
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    FAILED = 'failed'
+    STATUS_CHOICES = [(QUEUED, 'Queued'), (RUNNING, 'Running'), (FAILED, 'Failed')]
+
+    name = models.CharField(max_length=200)
+    payload = models.JSONField(default=dict)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=QUEUED)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    run_at = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(null=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['status', 'run_at'])]
 
     def __str__(self):
-        return self.name
\ No newline at end of file
+        return f'{self.name} ({self.status})'
+
+
+class IdempotencyKey(models.Model):
+    """A write sent with an `Idempotency-Key` header and the response to replay, see core/idempotency.py."""
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, db_index=False)
+    key = models.CharField(max_length=255)
+    fingerprint = models.CharField(max_length=64)
+    # Empty while the first request with the key is still running
+    status_code = models.PositiveSmallIntegerField(null=True)
+    response = models.JSONField(null=True, encoder=DjangoJSONEncoder)
+    expires_at = models.DateTimeField()
+    # When the request running with the key started
+    locked_at = models.DateTimeField(null=True)
+
+    class Meta:
+        # Both lead with user, so they also replace the foreign key's own index
+        constraints = [models.UniqueConstraint(fields=['user', 'key'], name='core_idempotencykey_unique')]
+        indexes = [models.Index(fields=['user', 'expires_at'])]
@@ -0,0 +1,33 @@
+"""Load everything a worker needs before uWSGI forks it.
+
+uWSGI imports app.wsgi once in the master and forks the workers from it, so what
+is imported and cached here is shared copy-on-write instead of being rebuilt by
+every worker on its first requests. Nothing that owns threads, sockets or file
+locks may be created here: the password hashing pool, the throttle store and the
+database connections are all opened lazily by each worker.
+"""
+import gc
+
+from django.apps import apps
+from django.contrib.auth.hashers import get_hashers
+from django.db import connections
+from django.urls import get_resolver
+from django.utils import translation
+from PIL import Image
+
+
+def warm_up():
+    for model in apps.get_models():
+        model._meta.get_fields()
+
+    # Imports every view and serializer module and builds the reverse lookup tables. Serializer
+    # fields are built per instance, so there is nothing further to warm for them.
+    get_resolver().reverse_dict
+
+    get_hashers()
+    Image.init()
+    translation.gettext('Not found.')
+
+    connections.close_all()
+    # Keep the garbage collector from writing to (and so copying) the shared pages
+    gc.freeze()
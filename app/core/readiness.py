@@ -0,0 +1,93 @@
+"""Checks that the services a worker depends on are reachable.
+
+Used by `wait_for_db` before the app starts and by the /readyz endpoint. The
+checks run in parallel, each in its own thread with its own connections, and
+a check that hangs counts as failed once the timeout passes.
+"""
+import random
+import tempfile
+import time
+import uuid
+from concurrent import futures
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections, DEFAULT_DB_ALIAS
+
+
+def check_database():
+    with connections[DEFAULT_DB_ALIAS].cursor() as cursor:
+        cursor.execute('SELECT 1')
+
+
+def check_cache():
+    key = f'readiness:{uuid.uuid4().hex}'
+    cache.set(key, 1, 10)
+    if cache.get(key) != 1:
+        raise RuntimeError('cache did not return the value just stored')
+    cache.delete(key)
+
+
+def check_media():
+    with tempfile.TemporaryFile(dir=settings.MEDIA_ROOT):
+        pass
+
+
+CHECKS = {
+    'database': check_database,
+    'cache': check_cache,
+    'media': check_media,
+}
+
+
+def _run(check):
+    try:
+        check()
+    finally:
+        connections.close_all()
+
+
+def run_checks(names, timeout):
+    """Run the named checks and return `{name: error}` for the ones that failed."""
+    executor = futures.ThreadPoolExecutor(max_workers=len(names), thread_name_prefix='readiness')
+    pending = {name: executor.submit(_run, CHECKS[name]) for name in names}
+    # A hung check must not block the caller; its thread ends once the check gives up.
+    executor.shutdown(wait=False)
+
+    deadline = time.monotonic() + timeout
+    failures = {}
+    for name, future in pending.items():
+        try:
+            future.result(timeout=max(0, deadline - time.monotonic()))
+        except futures.TimeoutError:
+            failures[name] = f'timed out after {timeout}s'
+        except Exception as exc:
+            failures[name] = str(exc).strip() or exc.__class__.__name__
+    return failures
+
+
+def backoff(attempt, base=0.1, cap=5.0):
+    """Seconds to wait before retry number `attempt` (starting at 1), with jitter."""
+    delay = min(cap, base * 2 ** (attempt - 1))
+    return delay * random.uniform(0.5, 1.0)
+
+
+def wait_until_ready(names, timeout, check_timeout, on_retry=None):
+    """Retry the checks until they all pass and return the failures of the last attempt.
+
+    Gives up, returning the remaining failures, after `timeout` seconds.
+    `on_retry(failures, delay)` is called before every wait.
+    """
+    deadline = time.monotonic() + timeout
+    attempt = 0
+    while True:
+        attempt += 1
+        remaining = deadline - time.monotonic()
+        failures = run_checks(names, min(check_timeout, max(remaining, 0.1)))
+        remaining = deadline - time.monotonic()
+        if not failures or remaining <= 0:
+            return failures
+        delay = min(backoff(attempt), remaining)
+        if on_retry:
+            on_retry(failures, delay)
+        time.sleep(delay)
@@ -0,0 +1,38 @@
+"""MessagePack responses, for clients sending `Accept: application/msgpack`.
+
+Encoding and decoding a recipe list is several times cheaper than JSON and the
+payload smaller. Values are the same as in JSON responses; `Decimal`s that
+reach the renderer unformatted are sent as strings so prices stay exact.
+"""
+import decimal
+
+import msgpack
+from rest_framework.renderers import BaseRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+MEDIA_TYPE = 'application/msgpack'
+
+_encoder = JSONEncoder()
+
+
+def _default(obj):
+    if isinstance(obj, decimal.Decimal):
+        return str(obj)
+    # Dates, UUIDs, lazy strings and the like are sent as in JSON
+    return _encoder.default(obj)
+
+
+def packb(data):
+    return msgpack.packb(data, default=_default, use_bin_type=True)
+
+
+class MessagePackRenderer(BaseRenderer):
+    media_type = MEDIA_TYPE
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return packb(data)
@@ -0,0 +1,69 @@
+"""Serve the OpenAPI document from a file built once per deploy.
+
+`python manage.py build_schema` renders the schema into `API_SCHEMA_ROOT`. Each
+worker reads those files on the first request for the schema and then serves
+them from memory with an ETag. If a file is missing, the schema is generated
+once per process instead.
+"""
+import functools
+import hashlib
+import os
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.http import parse_etags
+from drf_spectacular.renderers import OpenApiJsonRenderer, OpenApiYamlRenderer
+from drf_spectacular.settings import spectacular_settings
+from drf_spectacular.utils import extend_schema
+from drf_spectacular.views import SCHEMA_KWARGS, SpectacularAPIView
+
+RENDERERS = {'yaml': OpenApiYamlRenderer, 'json': OpenApiJsonRenderer}
+
+
+def schema_path(fmt):
+    return os.path.join(settings.API_SCHEMA_ROOT, f'openapi.{fmt}')
+
+
+def generate(fmt):
+    """Render the schema of every public endpoint."""
+    generator = spectacular_settings.DEFAULT_GENERATOR_CLASS()
+    schema = generator.get_schema(request=None, public=True)
+    return RENDERERS[fmt]().render(schema, renderer_context={})
+
+
+def build():
+    """Write the schema in every format and return the paths written."""
+    os.makedirs(settings.API_SCHEMA_ROOT, exist_ok=True)
+    paths = []
+    for fmt in RENDERERS:
+        path = schema_path(fmt)
+        with open(path, 'wb') as f:
+            f.write(generate(fmt))
+        paths.append(path)
+    return paths
+
+
+@functools.lru_cache(maxsize=None)
+def load(fmt):
+    """Return the schema document in `fmt` and its ETag."""
+    try:
+        with open(schema_path(fmt), 'rb') as f:
+            content = f.read()
+    except FileNotFoundError:
+        content = generate(fmt)
+    return content, '"%s"' % hashlib.sha256(content).hexdigest()[:32]
+
+
+class SchemaView(SpectacularAPIView):
+    @extend_schema(**SCHEMA_KWARGS)
+    def get(self, request, *args, **kwargs):
+        renderer = request.accepted_renderer
+        content, etag = load('json' if 'json' in renderer.format else 'yaml')
+
+        if etag in parse_etags(request.headers.get('If-None-Match', '')):
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(content, content_type=renderer.media_type)
+        response['ETag'] = etag
+        response['Cache-Control'] = f'public, max-age={settings.API_SCHEMA_MAX_AGE}'
+        return response
@@ -0,0 +1,116 @@
+"""Query budgets for API tests.
+
+Every request made through `APIClient` inside a test class using
+`QueryBudgetMixin` has its queries recorded and compared against the
+per-endpoint budget in `query_budgets.json`::
+
+    {"recipe:recipe-list GET": {"constant": 2, "per_row": 2}}
+
+The allowed number of queries is `constant + per_row * rows`, where `rows` is
+the number of objects in the response: the length of a list response, or the
+number of nested objects of a single object response. A `per_row` of 0 means the
+endpoint must issue a constant number of queries regardless of data size.
+Savepoint statements are not counted: tests run inside a transaction, so every
+`atomic()` block costs a SAVEPOINT/RELEASE pair that it does not in production.
+
+Set `QUERY_BUDGET_VERBOSE=1` to print the duplicate query fingerprints of every
+request, and `QUERY_BUDGET_RECORD=<path>` to append each observation as a JSON
+line when updating the budgets.
+"""
+import json
+import os
+import re
+from collections import Counter
+from pathlib import Path
+from unittest import mock
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+BUDGET_FILE = Path(__file__).with_name('query_budgets.json')
+
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+_IN_RE = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+_SAVEPOINT_RE = re.compile(r'^(SAVEPOINT|RELEASE SAVEPOINT|ROLLBACK TO SAVEPOINT)\b', re.IGNORECASE)
+_budgets = None
+
+
+def load_budgets():
+    global _budgets
+    if _budgets is None:
+        with open(BUDGET_FILE) as fh:
+            _budgets = json.load(fh)
+    return _budgets
+
+
+def fingerprint(sql):
+    """Reduce `sql` to its shape by stripping literals, so repeated N+1 queries collapse together."""
+    sql = _STRING_RE.sub('?', sql)
+    sql = _NUMBER_RE.sub('?', sql)
+    return _IN_RE.sub('(...)', sql)
+
+
+def duplicate_fingerprints(queries):
+    counts = Counter(fingerprint(q['sql']) for q in queries)
+    return [(count, sql) for sql, count in counts.most_common() if count > 1]
+
+
+def count_rows(data):
+    if isinstance(data, dict) and isinstance(data.get('results'), list):
+        data = data['results']
+    if isinstance(data, list):
+        return len(data)
+    if isinstance(data, dict):
+        return sum(len(value) for value in data.values() if isinstance(value, list))
+    return 0
+
+
+def format_duplicates(duplicates):
+    return '\n'.join(f'  {count}x {sql}' for count, sql in duplicates) or '  (none)'
+
+
+def check_budget(response, queries):
+    queries = [q for q in queries if not _SAVEPOINT_RE.match(q['sql'])]
+    endpoint = f"{response.resolver_match.view_name} {response.request['REQUEST_METHOD']}"
+    rows = count_rows(getattr(response, 'data', None))
+    duplicates = duplicate_fingerprints(queries)
+
+    if os.environ.get('QUERY_BUDGET_VERBOSE'):
+        print(f'\n{endpoint} rows={rows} queries={len(queries)}\n{format_duplicates(duplicates)}')
+    if os.environ.get('QUERY_BUDGET_RECORD'):
+        with open(os.environ['QUERY_BUDGET_RECORD'], 'a') as fh:
+            fh.write(json.dumps({'endpoint': endpoint, 'rows': rows, 'queries': len(queries)}) + '\n')
+
+    budget = load_budgets().get(endpoint)
+    if budget is None:
+        if os.environ.get('QUERY_BUDGET_RECORD'):
+            return
+        raise AssertionError(f'No query budget for {endpoint!r}; add one to {BUDGET_FILE.name}.')
+    allowed = budget['constant'] + budget.get('per_row', 0) * rows
+    if len(queries) > allowed:
+        raise AssertionError(
+            f'{endpoint} issued {len(queries)} queries for {rows} rows, budget is {allowed} '
+            f"({budget['constant']} + {budget.get('per_row', 0)}/row). Duplicate queries:\n"
+            f'{format_duplicates(duplicates)}'
+        )
+
+
+class QueryBudgetMixin:
+    """Checks every `APIClient` request of the test case against its query budget."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        original = APIClient.request
+
+        def request(client, **kwargs):
+            with CaptureQueriesContext(connection) as ctx:
+                response = original(client, **kwargs)
+            check_budget(response, ctx.captured_queries)
+            return response
+
+        patcher = mock.patch.object(APIClient, 'request', request)
+        patcher.start()
+        cls.addClassCleanup(patcher.stop)
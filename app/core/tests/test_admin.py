@@ -1,7 +1,13 @@
+from decimal import Decimal
+
+from django.db import connection
 from django.test import TestCase, Client
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.contrib.auth import get_user_model
 
+from core.models import Recipe, Tag, Ingredient
+
 class AdminTests(TestCase):  # Fixed 'def' to 'class'
     def setUp(self):
         self.client = Client()
@@ -27,3 +33,61 @@ class AdminTests(TestCase):  # Fixed 'def' to 'class'
 
         self.assertEqual(res.status_code, 302)
         self.assertEqual(last_user.email, 'abc@gmail.com')
+
+
+class ModelAdminTests(TestCase):
+    """The changelists and autocompletes issue the same queries however many rows there are."""
+
+    def setUp(self):
+        self.client = Client()
+        self.admin_user = get_user_model().objects.create_superuser(email='admin@example.com', password='password')
+        self.client.force_login(self.admin_user)
+
+    def _create(self, count):
+        start = Recipe.objects.count()
+        for i in range(start, start + count):
+            user = get_user_model().objects.create_user(email=f'cook{i}@example.com', password='password111')
+            recipe = Recipe.objects.create(user=user, title=f'Recipe {i}', price=Decimal('5.00'))
+            recipe.tags.add(Tag.objects.create(user=user, name=f'Tag {i}'))
+            recipe.ingredients.add(Ingredient.objects.create(user=user, name=f'Ingredient {i}'))
+
+    def _count_queries(self, url, data=None):
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(url, data)
+        self.assertEqual(res.status_code, 200)
+        return len(queries)
+
+    def test_changelist_queries_do_not_grow_with_rows(self):
+        urls = [reverse(f'admin:core_{model}_changelist') for model in ('user', 'recipe', 'tag', 'ingredient')]
+        self._create(1)
+        few = [self._count_queries(url) for url in urls]
+        self._create(5)
+        many = [self._count_queries(url) for url in urls]
+
+        self.assertEqual(few, many)
+
+    def test_change_form_renders_autocomplete_widgets(self):
+        self._create(3)
+        recipe = Recipe.objects.first()
+        res = self.client.get(reverse('admin:core_recipe_change', args=[recipe.id]))
+
+        self.assertContains(res, 'class="admin-autocomplete"', count=3)
+        self.assertNotContains(res, 'Tag 2')
+
+    def test_autocomplete_is_paginated(self):
+        self._create(25)
+        res = self.client.get(reverse('admin:autocomplete'), {
+            'app_label': 'core', 'model_name': 'recipe', 'field_name': 'tags', 'term': 'Tag',
+        })
+
+        self.assertEqual(res.status_code, 200)
+        body = res.json()
+        self.assertEqual(len(body['results']), 20)
+        self.assertTrue(body['pagination']['more'])
+
+    def test_search(self):
+        self._create(3)
+        res = self.client.get(reverse('admin:core_recipe_changelist'), {'q': 'ipe 1'})
+
+        self.assertContains(res, 'Recipe 1')
+        self.assertNotContains(res, 'Recipe 2')
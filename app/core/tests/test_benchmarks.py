@@ -0,0 +1,116 @@
+import gzip
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase, SimpleTestCase
+
+from core.models import Recipe, Tag, Ingredient
+from core.benchmarks import (
+    SCENARIOS, ClientTarget, HttpTarget, seed_data, run_scenarios, run_bursts, compare_results, measure_startup,
+)
+from core.benchmarks.runner import percentile
+from core.benchmarks.targets import Response
+from core.benchmarks.scenarios import build_context
+
+
+class BenchmarkRunnerTests(SimpleTestCase):
+    def test_percentile_nearest_rank(self):
+        values = list(range(1, 101))
+
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertEqual(percentile([], 95), 0.0)
+
+    def test_compare_detects_regressions(self):
+        baseline = {'scenarios': {'list': {'p50': 10, 'p95': 20, 'p99': 30, 'throughput': 100, 'queries': 3}}}
+        results = {'list': {'p50': 11, 'p95': 40, 'p99': 30, 'throughput': 50, 'queries': 4}}
+
+        regressions = compare_results(results, baseline, tolerance=0.2)
+
+        self.assertEqual(len(regressions), 3)
+        self.assertTrue(any('p95' in r for r in regressions))
+        self.assertTrue(any('throughput' in r for r in regressions))
+        self.assertTrue(any('queries' in r for r in regressions))
+
+    def test_bursts_count_requests_and_failures(self):
+        scenarios = {'flaky': lambda target, ctx, i: Response(503 if i % 4 == 0 else 200, 0, None, None)}
+
+        results = run_bursts(None, {}, ['flaky'], scenarios, concurrency=4, bursts=2, burst_size=8, idle=0)
+
+        self.assertEqual(results['burst_flaky']['requests'], 16)
+        self.assertEqual(results['burst_flaky']['failures'], 4)
+
+    def test_compare_ignores_unknown_scenarios(self):
+        results = {'detail': {'p50': 1, 'p95': 1, 'p99': 1, 'throughput': 1, 'queries': 1}}
+
+        self.assertEqual(compare_results(results, {'scenarios': {}}), [])
+
+
+class GzipHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = json.dumps([{'title': 'Soup'}] * 100).encode()
+        self.send_response(200)
+        if 'gzip' in self.headers.get('Accept-Encoding', ''):
+            body = gzip.compress(body)
+            self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class HttpTargetTests(SimpleTestCase):
+    def setUp(self):
+        self.server = HTTPServer(('127.0.0.1', 0), GzipHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.url = f'http://127.0.0.1:{self.server.server_port}'
+
+    def test_compressed_responses_count_wire_bytes(self):
+        plain = HttpTarget(self.url).request('GET', '/', 'token')
+        compressed = HttpTarget(self.url, compress=True).request('GET', '/', 'token')
+
+        self.assertEqual(compressed.data, plain.data)
+        self.assertLess(compressed.nbytes, plain.nbytes / 10)
+
+
+class BenchmarkSuiteTests(TestCase):
+    def test_seed_data(self):
+        seeded = seed_data(users=2, recipes=3, tags=4, ingredients=5)
+
+        self.assertEqual(len(seeded), 2)
+        self.assertEqual(Recipe.objects.count(), 6)
+        self.assertEqual(Tag.objects.count(), 8)
+        self.assertEqual(Ingredient.objects.count(), 10)
+        self.assertEqual(Recipe.tags.through.objects.count(), 6 * 3)
+
+    def test_read_scenarios_run_against_client(self):
+        ctx = build_context(seed_data(users=1, recipes=3, tags=2, ingredients=2))
+
+        results = run_scenarios(ClientTarget(), ctx, ['list', 'detail'], SCENARIOS, iterations=3, warmup=1)
+
+        self.assertEqual(set(results), {'list', 'detail'})
+        self.assertEqual(results['detail']['requests'], 3)
+        self.assertGreater(results['list']['queries'], 0)
+
+    def test_url_needs_allow_seed(self):
+        with self.assertRaisesMessage(CommandError, '--allow-seed'):
+            call_command('benchmark', url='http://127.0.0.1:9')
+
+        self.assertFalse(get_user_model().objects.exists())
+
+
+class StartupBenchmarkTests(SimpleTestCase):
+    def test_measures_time_to_first_response(self):
+        results = measure_startup(runs=1)
+
+        self.assertEqual(set(results), {'startup', 'respawn'})
+        self.assertEqual(results['startup']['requests'], 1)
+        self.assertGreater(results['startup']['p50'], results['respawn']['p50'])
@@ -1,26 +1,103 @@
-from unittest.mock import patch
+import tempfile
+import time
+from io import StringIO
+from unittest.mock import Mock, patch
 
 from psycopg2 import OperationalError as Psycopg2Error
 
 from django.core.management import call_command
+from django.core.management.base import CommandError
 from django.db.utils import OperationalError
 from django.test import SimpleTestCase
 
+from core import readiness
+from core.management.commands.importtime import parse_importtime
 
-@patch('core.management.commands.wait_for_db.Command.check')
+
+@patch('time.sleep')
 class CommadeTests(SimpleTestCase):
-    def test_wait_for_db_ready(self, patched_check):
-        patched_check.return_value = True
+    def setUp(self):
+        self.check_database = Mock()
+        patcher = patch.dict(readiness.CHECKS, {'database': self.check_database})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_wait_for_db_ready(self, patched_sleep):
+        call_command('wait_for_db', stdout=StringIO())
+
+        self.check_database.assert_called_once_with()
+        patched_sleep.assert_not_called()
+
+    def test_wait_for_db_delay(self, patched_sleep):
+        self.check_database.side_effect = [Psycopg2Error]*2 + [OperationalError]*3 + [None]
+
+        call_command('wait_for_db', stdout=StringIO())
+
+        self.assertEqual(self.check_database.call_count, 6)
+        delays = [c.args[0] for c in patched_sleep.call_args_list]
+        self.assertEqual(len(delays), 5)
+        self.assertLess(delays[0], delays[-1])
+
+    def test_wait_for_db_gives_up_after_timeout(self, patched_sleep):
+        self.check_database.side_effect = OperationalError('connection refused')
+
+        with self.assertRaisesMessage(CommandError, 'database'):
+            call_command('wait_for_db', '--timeout', '0', stdout=StringIO())
+
+    def test_wait_for_other_checks(self, patched_sleep):
+        check_cache = Mock()
+        with patch.dict(readiness.CHECKS, {'cache': check_cache}):
+            call_command('wait_for_db', '--check', 'database', '--check', 'cache', stdout=StringIO())
+
+        self.check_database.assert_called_once_with()
+        check_cache.assert_called_once_with()
+
+
+class ReadinessTests(SimpleTestCase):
+    def test_backoff_grows_exponentially_up_to_cap(self):
+        self.assertLessEqual(readiness.backoff(1, base=1, cap=8), 1)
+        self.assertGreaterEqual(readiness.backoff(4, base=1, cap=8), 4)
+        self.assertLessEqual(readiness.backoff(10, base=1, cap=8), 8)
+
+    def test_checks_run_in_parallel(self):
+        def slow():
+            time.sleep(0.2)
+
+        with patch.dict(readiness.CHECKS, {'database': slow, 'cache': slow, 'media': slow}):
+            started = time.monotonic()
+            failures = readiness.run_checks(['database', 'cache', 'media'], timeout=2)
+
+        self.assertEqual(failures, {})
+        self.assertLess(time.monotonic() - started, 0.5)
+
+    def test_hung_check_times_out(self):
+        with patch.dict(readiness.CHECKS, {'database': lambda: time.sleep(1)}):
+            failures = readiness.run_checks(['database'], timeout=0.05)
+
+        self.assertIn('timed out', failures['database'])
+
+    def test_media_check(self):
+        with tempfile.TemporaryDirectory() as media_root, self.settings(MEDIA_ROOT=media_root):
+            self.assertEqual(readiness.run_checks(['media', 'cache'], timeout=2), {})
+
+        with self.settings(MEDIA_ROOT='/nonexistent/media'):
+            self.assertIn('media', readiness.run_checks(['media'], timeout=2))
+
 
-        call_command('wait_for_db')
+class ImportTimeTests(SimpleTestCase):
+    def test_parse_importtime(self):
+        output = (
+            'import time: self [us] | cumulative | imported package\n'
+            'import time:       120 |        120 |   yaml.reader\n'
+            'import time:      3000 |      45000 | app.wsgi\n'
+        )
 
-        patched_check.assert_called_once_with(databases=['default'])
+        self.assertEqual(parse_importtime(output), [(120, 120, 'yaml.reader'), (3000, 45000, 'app.wsgi')])
 
-    @patch('time.sleep')
-    def test_wait_for_db_delay(self, patched_sleep, patched_check):
-        patched_check.side_effect = [Psycopg2Error]*2 + [OperationalError]*3 + [True]
+    def test_importtime_reports_slowest_imports(self):
+        out = StringIO()
 
-        call_command('wait_for_db')
+        call_command('importtime', '--limit', '3', stdout=out)
 
-        self.assertEqual(patched_check.call_count, 6)
-        patched_check.assert_called_with(databases=['default'])
\ No newline at end of file
+        self.assertIn('app.wsgi', out.getvalue())
+        self.assertEqual(len(out.getvalue().splitlines()), 5)
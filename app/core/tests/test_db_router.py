@@ -0,0 +1,154 @@
+import multiprocessing
+import tempfile
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import OperationalError
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from core import db_router
+from core.db_router import ReplicaRouter, ReplicaRoutingMiddleware, PIN_COOKIE, PIN_HEADER
+from core.models import Recipe
+
+
+class FakeConnections(dict):
+    def __missing__(self, alias):
+        self[alias] = mock.Mock()
+        return self[alias]
+
+
+@override_settings(DATABASE_REPLICAS=['replica_0', 'replica_1'], REPLICA_PIN_SECONDS=5, REPLICA_RETRY_SECONDS=30)
+class ReplicaRoutingTests(SimpleTestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.connections = FakeConnections()
+        patcher = mock.patch.object(db_router, 'connections', self.connections)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        db_router._down_until.clear()
+        self.addCleanup(db_router._down_until.clear)
+        cache.clear()
+        self.router = ReplicaRouter()
+
+    def _run(self, request, status=200):
+        """Run the middleware and return (read alias seen by the view, response)."""
+        seen = []
+
+        def view(request):
+            seen.append(self.router.db_for_read(Recipe))
+            return HttpResponse(status=status)
+
+        response = ReplicaRoutingMiddleware(view)(request)
+        return seen[0], response
+
+    def test_safe_request_reads_from_replica(self):
+        alias, _ = self._run(self.factory.get('/api/recipe/recipes/'))
+
+        self.assertIn(alias, ['replica_0', 'replica_1'])
+        self.assertIsNone(self.router.db_for_read(Recipe))
+        self.assertEqual(self.router.db_for_write(Recipe), 'default')
+
+    def test_unsafe_request_uses_primary_and_pins(self):
+        request = self.factory.post('/api/recipe/recipes/', HTTP_AUTHORIZATION='Token abc')
+        alias, response = self._run(request, status=201)
+
+        self.assertIsNone(alias)
+        self.assertEqual(response.cookies[PIN_COOKIE]['max-age'], 5)
+
+        alias, _ = self._run(self.factory.get('/api/recipe/recipes/', HTTP_AUTHORIZATION='Token abc'))
+        self.assertIsNone(alias)
+
+        alias, _ = self._run(self.factory.get('/api/recipe/recipes/', HTTP_AUTHORIZATION='Token other'))
+        self.assertIsNotNone(alias)
+
+    def test_pin_cookie_reads_from_primary(self):
+        _, response = self._run(self.factory.post('/api/recipe/recipes/'), status=201)
+        request = self.factory.get('/api/recipe/recipes/')
+        request.COOKIES[PIN_COOKIE] = response.cookies[PIN_COOKIE].value
+
+        alias, _ = self._run(request)
+        self.assertIsNone(alias)
+
+    def test_pin_header_reads_from_primary(self):
+        _, response = self._run(self.factory.post('/api/recipe/recipes/'), status=201)
+
+        alias, _ = self._run(self.factory.get('/api/recipe/recipes/', HTTP_X_DB_PIN=response[PIN_HEADER]))
+        self.assertIsNone(alias)
+
+    def test_forged_or_expired_pin_is_ignored(self):
+        _, response = self._run(self.factory.post('/api/recipe/recipes/'), status=201)
+
+        alias, _ = self._run(self.factory.get('/api/recipe/recipes/', HTTP_X_DB_PIN='1'))
+        self.assertIsNotNone(alias)
+        with mock.patch('django.core.signing.time.time', return_value=10 ** 10):
+            alias, _ = self._run(self.factory.get('/api/recipe/recipes/', HTTP_X_DB_PIN=response[PIN_HEADER]))
+        self.assertIsNotNone(alias)
+
+    def test_pins_are_seen_by_other_processes(self):
+        """Each uWSGI worker is a process: a pin set by one must hold in the others."""
+        with tempfile.TemporaryDirectory() as cache_dir, override_settings(CACHES={
+            'default': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': cache_dir},
+        }), multiprocessing.get_context('fork').Pool(1) as other_worker:
+            # The other worker is forked here, before the pin exists, so it cannot have inherited it.
+            _, response = self._run(
+                self.factory.post('/api/recipe/recipes/', HTTP_AUTHORIZATION='Token abc'), status=201,
+            )
+            requests = {
+                'header': self.factory.get('/api/recipe/recipes/', HTTP_X_DB_PIN=response[PIN_HEADER]),
+                'credentials': self.factory.get('/api/recipe/recipes/', HTTP_AUTHORIZATION='Token abc'),
+                'other': self.factory.get('/api/recipe/recipes/', HTTP_AUTHORIZATION='Token other'),
+            }
+            pinned = dict(zip(requests, other_worker.map(db_router.is_pinned, requests.values())))
+
+        self.assertEqual(pinned, {'header': True, 'credentials': True, 'other': False})
+
+    def test_failed_write_does_not_pin(self):
+        request = self.factory.post('/api/recipe/recipes/', HTTP_AUTHORIZATION='Token abc')
+        _, response = self._run(request, status=400)
+
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+
+    def test_unreachable_replica_falls_back_and_is_skipped(self):
+        self.connections['replica_0'].ensure_connection.side_effect = OperationalError
+        self.connections['replica_1'].ensure_connection.side_effect = OperationalError
+
+        alias, _ = self._run(self.factory.get('/api/recipe/recipes/'))
+        self.assertIsNone(alias)
+        self.assertEqual(set(db_router._down_until), {'replica_0', 'replica_1'})
+
+        self.connections['replica_1'].ensure_connection.side_effect = None
+        alias, _ = self._run(self.factory.get('/api/recipe/recipes/'))
+        self.assertIsNone(alias)
+        self.assertEqual(self.connections['replica_1'].ensure_connection.call_count, 1)
+
+        with mock.patch('core.db_router.time.monotonic', return_value=db_router._down_until['replica_1'] + 1):
+            alias, _ = self._run(self.factory.get('/api/recipe/recipes/'))
+        self.assertEqual(alias, 'replica_1')
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_without_replicas_everything_uses_primary(self):
+        alias, _ = self._run(self.factory.get('/api/recipe/recipes/'))
+        self.assertIsNone(alias)
+
+    def test_only_primary_is_migrated(self):
+        self.assertTrue(self.router.allow_migrate('default', 'core'))
+        self.assertFalse(self.router.allow_migrate('replica_0', 'core'))
+
+
+@override_settings(DATABASE_REPLICAS=['replica_0'], REPLICA_PIN_SECONDS=5)
+class LoginPinTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_new_token_reads_from_primary(self):
+        get_user_model().objects.create_user(email='pin@example.com', password='pass12345')
+
+        res = APIClient().post(reverse('user:token'), {'email': 'pin@example.com', 'password': 'pass12345'})
+
+        self.assertIn(PIN_HEADER, res)
+        request = RequestFactory().get('/api/recipe/recipes/', HTTP_AUTHORIZATION=f'Token {res.data["token"]}')
+        self.assertTrue(db_router.is_pinned(request))
@@ -0,0 +1,64 @@
+import threading
+from unittest.mock import patch
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.test import TestCase, SimpleTestCase
+
+from core import hashing
+
+
+class HashingPoolTests(SimpleTestCase):
+    def test_verify_password(self):
+        encoded = hashing.make_password('secret123')
+
+        self.assertTrue(encoded.startswith('argon2'))
+        self.assertEqual(hashing.verify_password('secret123', encoded), (True, False))
+        self.assertEqual(hashing.verify_password('wrong', encoded), (False, False))
+
+    def test_verify_password_flags_legacy_hashes(self):
+        encoded = make_password('secret123', hasher='pbkdf2_sha256')
+
+        self.assertEqual(hashing.verify_password('secret123', encoded), (True, True))
+
+    def test_unusable_password_is_not_hashed(self):
+        with patch('core.hashing.run') as patched_run:
+            encoded = hashing.make_password(None)
+            result = hashing.verify_password('secret123', encoded)
+
+        self.assertEqual(result, (False, False))
+        patched_run.assert_not_called()
+
+    @patch('core.hashing._get_pool')
+    def test_busy_pool_fails_fast(self, patched_pool):
+        slots = threading.BoundedSemaphore(1)
+        slots.acquire()
+        patched_pool.return_value = (ThreadPoolExecutor(max_workers=1), slots)
+
+        with self.settings(PASSWORD_HASH_QUEUE_TIMEOUT=0.01):
+            with self.assertRaises(hashing.HashingBusy):
+                hashing.make_password('secret123')
+
+
+class RehashOnLoginTests(TestCase):
+    def test_legacy_hash_is_upgraded_on_login(self):
+        user = get_user_model().objects.create_user(email='legacy@example.com')
+        user.password = make_password('secret123', hasher='pbkdf2_sha256')
+        user.save()
+
+        self.assertTrue(user.check_password('secret123'))
+
+        user.refresh_from_db()
+        self.assertTrue(user.password.startswith('argon2'))
+        self.assertTrue(user.check_password('secret123'))
+
+    def test_failed_login_does_not_rehash(self):
+        user = get_user_model().objects.create_user(email='legacy@example.com')
+        user.password = legacy = make_password('secret123', hasher='pbkdf2_sha256')
+        user.save()
+
+        self.assertFalse(user.check_password('wrong'))
+
+        user.refresh_from_db()
+        self.assertEqual(user.password, legacy)
@@ -0,0 +1,53 @@
+import tempfile
+from unittest.mock import patch
+
+from django.db import OperationalError
+from django.test import TestCase, override_settings
+from rest_framework import status
+
+from core import readiness
+
+HEALTHZ_URL = '/healthz'
+READYZ_URL = '/readyz'
+
+
+class HealthTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        settings_override = self.settings(MEDIA_ROOT=media_root.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def test_healthz(self):
+        res = self.client.get(HEALTHZ_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.json(), {'status': 'ok'})
+
+    @override_settings(ALLOWED_HOSTS=['api.example.com'])
+    def test_probes_skip_host_validation(self):
+        res = self.client.get(HEALTHZ_URL, HTTP_HOST='10.0.0.7:9000')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_readyz(self):
+        res = self.client.get(READYZ_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.json()['checks'], {'database': 'ok', 'cache': 'ok', 'media': 'ok'})
+        self.assertIn('no-cache', res['Cache-Control'])
+
+    def test_readyz_reports_failed_checks(self):
+        def unreachable():
+            raise OperationalError('could not connect to server')
+
+        with patch.dict(readiness.CHECKS, {'database': unreachable}), self.assertLogs('core.health') as logs:
+            res = self.client.get(READYZ_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(res.json()['status'], 'unavailable')
+        self.assertEqual(res.json()['checks']['database'], 'fail')
+        self.assertEqual(res.json()['checks']['cache'], 'ok')
+        self.assertNotIn('could not connect', res.content.decode())
+        self.assertIn('Readiness check database failed: could not connect to server', logs.output[0])
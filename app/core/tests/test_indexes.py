@@ -0,0 +1,86 @@
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+
+from core.models import Recipe, Tag, Ingredient
+
+
+class UserScopedIndexTests(TestCase):
+    """The recipe endpoints' queries are answered from the user scoped indexes."""
+
+    def setUp(self):
+        if connection.vendor not in ('postgresql', 'sqlite'):
+            self.skipTest('Query plans are only checked on PostgreSQL and SQLite')
+        self.user = get_user_model().objects.create_user('plan@example.com', 'testpass123')
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        for i in range(3):
+            recipe = Recipe.objects.create(user=self.user, title=f'Recipe {i}', price=Decimal('5.00'))
+            recipe.tags.add(tag)
+
+    def _plan(self, queryset):
+        if connection.vendor == 'postgresql':
+            # The test tables are tiny, so the planner would otherwise prefer a sequential scan
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+                cursor.execute('SET LOCAL enable_bitmapscan = off')
+        return queryset.explain()
+
+    def assertUsesIndex(self, queryset, index, index_only=True):
+        plan = self._plan(queryset)
+        if connection.vendor == 'postgresql':
+            scan = 'Index Only Scan' if index_only else 'Index Scan'
+            self.assertRegex(plan, rf'{scan}( Backward)? using {index}')
+        else:
+            self.assertIn(index, plan)
+
+    def test_recipe_list_page(self):
+        queryset = (
+            Recipe.objects.filter(user=self.user).order_by('-id')
+            .only('id', 'title', 'time_minutes', 'price', 'link')[:100]
+        )
+        self.assertUsesIndex(queryset, 'core_recipe_user_list_idx')
+
+    def test_tag_and_ingredient_lists(self):
+        self.assertUsesIndex(Tag.objects.filter(user=self.user).order_by('-name'), 'core_tag_user_name_unique')
+        self.assertUsesIndex(
+            Ingredient.objects.filter(user=self.user).order_by('-name'),
+            'core_ingredient_user_name_unique',
+        )
+
+    def test_recipes_filtered_by_tag(self):
+        tag_ids = Recipe.tags.through.objects.filter(tag_id__in=[1, 2]).values('recipe_id')
+        self.assertUsesIndex(tag_ids, 'core_recipe_tags_tag_recipe_idx')
+
+    def test_recipes_in_a_price_or_time_range(self):
+        recipes = Recipe.objects.filter(user=self.user)
+        self.assertUsesIndex(
+            recipes.filter(price__lte=Decimal('10.00')).order_by('price', 'id').values('id')[:100],
+            'core_recipe_user_price_idx',
+        )
+        self.assertUsesIndex(
+            recipes.filter(time_minutes__lte=30).order_by('-time_minutes', '-id').values('id')[:100],
+            'core_recipe_user_time_idx',
+        )
+
+
+class AdminSearchIndexTests(TestCase):
+    """The admin's `icontains` searches are answered from the trigram indexes."""
+
+    def setUp(self):
+        if connection.vendor != 'postgresql':
+            self.skipTest('Trigram indexes only exist on PostgreSQL')
+
+    def test_search_uses_trigram_indexes(self):
+        searches = [
+            (get_user_model().objects.filter(email__icontains='cook'), 'core_user_email_trgm_idx'),
+            (Recipe.objects.filter(title__icontains='pasta'), 'core_recipe_title_trgm_idx'),
+            (Tag.objects.filter(name__icontains='vegan'), 'core_tag_name_trgm_idx'),
+            (Ingredient.objects.filter(name__icontains='salt'), 'core_ingredient_name_trgm_idx'),
+        ]
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+        for queryset, index in searches:
+            with self.subTest(index=index):
+                self.assertIn(index, queryset.explain())
@@ -0,0 +1,101 @@
+import os
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+
+from core import jobs
+from core.models import Job
+
+calls = []
+
+
+@jobs.task(name='tests.record')
+def record(value):
+    calls.append(value)
+
+
+@jobs.task(name='tests.explode')
+def explode():
+    raise RuntimeError('boom')
+
+
+class JobQueueTests(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_enqueued_job_runs_and_is_deleted(self):
+        jobs.enqueue('tests.record', value=42)
+
+        self.assertEqual(jobs.run_pending(), 1)
+        self.assertEqual(calls, [42])
+        self.assertFalse(Job.objects.exists())
+
+    def test_future_jobs_are_not_claimed(self):
+        jobs.enqueue('tests.record', run_at=timezone.now() + timedelta(minutes=5), value=1)
+
+        self.assertEqual(jobs.run_pending(), 0)
+        self.assertEqual(calls, [])
+
+    @patch('core.jobs.backoff', return_value=30)
+    def test_failed_job_is_retried_with_backoff(self, patched_backoff):
+        job = jobs.enqueue('tests.explode', max_attempts=3)
+
+        with self.assertLogs('core.jobs', 'ERROR'):
+            jobs.run_pending()
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.QUEUED)
+        self.assertEqual(job.attempts, 1)
+        self.assertIn('boom', job.last_error)
+        self.assertGreater(job.run_at, timezone.now() + timedelta(seconds=20))
+        patched_backoff.assert_called_once_with(1)
+
+    def test_job_fails_after_max_attempts(self):
+        job = jobs.enqueue('tests.explode', max_attempts=1)
+
+        with self.assertLogs('core.jobs', 'ERROR'):
+            jobs.run_pending()
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+
+    def test_unknown_task_fails_immediately(self):
+        job = jobs.enqueue('tests.missing', max_attempts=5)
+
+        jobs.run_pending()
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+
+    def test_stale_running_job_is_reclaimed(self):
+        Job.objects.create(
+            name='tests.record', payload={'value': 7}, status=Job.RUNNING,
+            locked_at=timezone.now() - timedelta(days=1),
+        )
+
+        self.assertEqual(jobs.run_pending(), 1)
+        self.assertEqual(calls, [7])
+
+    def test_backoff_grows_exponentially(self):
+        with self.settings(JOB_BACKOFF_BASE=2, JOB_BACKOFF_MAX=600):
+            self.assertLessEqual(jobs.backoff(1), 2)
+            self.assertGreaterEqual(jobs.backoff(5), 16)
+            self.assertLessEqual(jobs.backoff(20), 600)
+
+
+class RunWorkerCommandTests(TransactionTestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_run_worker_once_drains_queue(self):
+        for i in range(5):
+            jobs.enqueue('tests.record', value=i)
+
+        with open(os.devnull, 'w') as devnull:
+            call_command('run_worker', '--once', '--poll-interval', '0.01', stdout=devnull)
+
+        self.assertEqual(sorted(calls), list(range(5)))
+        self.assertFalse(Job.objects.exists())
@@ -0,0 +1,98 @@
+from decimal import Decimal
+
+import msgpack
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag
+from core.renderers import MessagePackRenderer
+
+MSGPACK = 'application/msgpack'
+RECIPE_URL = reverse('recipe:recipe-list')
+BULK_TAGS_URL = reverse('recipe:recipe-bulk-tags')
+
+
+def unpack(res):
+    return msgpack.unpackb(res.content, raw=False)
+
+
+class MessagePackRendererTests(TestCase):
+    def test_decimals_are_exact(self):
+        data = {'price': Decimal('0.10'), 'ids': [1, 2]}
+
+        self.assertEqual(msgpack.unpackb(MessagePackRenderer().render(data)), {'price': '0.10', 'ids': [1, 2]})
+
+    def test_empty_response(self):
+        self.assertEqual(MessagePackRenderer().render(None), b'')
+
+
+class MessagePackApiTests(TestCase):
+    """Every endpoint answers and accepts `application/msgpack` as well as JSON."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(email='batch@example.com', password='pass12345')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_list_matches_json(self):
+        Recipe.objects.create(user=self.user, title='Soup', price=Decimal('4.50'), description='Hot.')
+
+        res = self.client.get(RECIPE_URL, HTTP_ACCEPT=MSGPACK)
+        as_json = self.client.get(RECIPE_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res['Content-Type'], MSGPACK)
+        self.assertEqual(unpack(res), as_json.json())
+        self.assertEqual(unpack(res)[0]['price'], '4.50')
+        self.assertLess(len(res.content), len(as_json.content))
+
+    def test_format_suffix(self):
+        res = self.client.get(RECIPE_URL, {'format': 'msgpack'})
+
+        self.assertEqual(res['Content-Type'], MSGPACK)
+        self.assertEqual(unpack(res), [])
+
+    def test_create_from_msgpack(self):
+        payload = {
+            'title': 'Soup', 'time_minutes': 20, 'price': '4.50', 'description': 'Hot.',
+            'link': 'https://example.com/soup', 'tags': [{'name': 'Vegan'}],
+        }
+        res = self.client.post(RECIPE_URL, payload, format='msgpack', HTTP_ACCEPT=MSGPACK)
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        recipe = Recipe.objects.get(id=unpack(res)['id'])
+        self.assertEqual(recipe.price, Decimal('4.50'))
+        self.assertEqual([tag.name for tag in recipe.tags.all()], ['Vegan'])
+
+    def test_bulk_payload(self):
+        recipes = [Recipe.objects.create(user=self.user, title=f'R{i}', price=Decimal('1.00')) for i in range(3)]
+        tag = Tag.objects.create(user=self.user, name='Quick')
+
+        res = self.client.post(
+            BULK_TAGS_URL, {'ids': [recipe.id for recipe in recipes], 'add': [tag.id]}, format='msgpack',
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(Recipe.tags.through.objects.filter(tag=tag).count(), 3)
+
+    def test_invalid_body(self):
+        res = self.client.post(RECIPE_URL, b'\xc1', content_type=MSGPACK)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_user_endpoints(self):
+        client = APIClient()
+        payload = {'email': 'packed@example.com', 'password': 'pass12345', 'name': 'Packed'}
+        created = client.post(reverse('user:create'), payload, format='msgpack', HTTP_ACCEPT=MSGPACK)
+        token = client.post(
+            reverse('user:token'), {'email': payload['email'], 'password': payload['password']},
+            format='msgpack', HTTP_ACCEPT=MSGPACK,
+        )
+
+        self.assertEqual(created.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(unpack(created)['email'], payload['email'])
+        self.assertEqual(token.status_code, status.HTTP_200_OK)
+        self.assertIn('token', unpack(token))
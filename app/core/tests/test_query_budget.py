@@ -0,0 +1,97 @@
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, SimpleTestCase
+from django.urls import reverse
+from decimal import Decimal
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag
+from core.tests.query_budget import (
+    QueryBudgetMixin, check_budget, fingerprint, duplicate_fingerprints, count_rows,
+)
+
+RECIPE_URL = reverse('recipe:recipe-list')
+
+
+class FingerprintTests(SimpleTestCase):
+    def test_fingerprint_strips_literals(self):
+        a = fingerprint("SELECT * FROM core_tag WHERE id = 1 AND name = 'Thai'")
+        b = fingerprint("SELECT * FROM core_tag WHERE id = 22 AND name = 'Vegan'")
+
+        self.assertEqual(a, b)
+
+    def test_fingerprint_collapses_in_lists(self):
+        self.assertEqual(
+            fingerprint('SELECT 1 WHERE id IN (1, 2, 3)'),
+            fingerprint('SELECT 1 WHERE id IN (4)'),
+        )
+
+    def test_duplicate_fingerprints(self):
+        queries = [{'sql': 'SELECT 1 WHERE id = 1'}, {'sql': 'SELECT 1 WHERE id = 2'}, {'sql': 'SELECT 2'}]
+
+        self.assertEqual(duplicate_fingerprints(queries), [(2, 'SELECT ? WHERE id = ?')])
+
+    def test_count_rows(self):
+        self.assertEqual(count_rows([{}, {}, {}]), 3)
+        self.assertEqual(count_rows({'results': [{}]}), 1)
+        self.assertEqual(count_rows({'id': 1, 'tags': [{}, {}], 'ingredients': [{}]}), 3)
+
+
+class QueryBudgetTests(QueryBudgetMixin, TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(email='budget@example.com', password='pass12345')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        for i in range(3):
+            recipe = Recipe.objects.create(user=self.user, title=f'r{i}', price=Decimal('1.00'))
+            recipe.tags.add(Tag.objects.create(user=self.user, name=f't{i}'))
+
+    def test_request_within_budget_passes(self):
+        res = self.client.get(RECIPE_URL)
+
+        self.assertEqual(len(res.data), 3)
+
+    @patch('core.tests.query_budget.load_budgets')
+    def test_request_over_budget_fails(self, patched_budgets):
+        patched_budgets.return_value = {'recipe:recipe-list GET': {'constant': 1, 'per_row': 0}}
+
+        with self.assertRaises(AssertionError) as cm:
+            self.client.get(RECIPE_URL)
+
+        self.assertIn('budget is 1', str(cm.exception))
+
+    @patch('core.tests.query_budget.load_budgets')
+    def test_failure_lists_duplicate_queries(self, patched_budgets):
+        patched_budgets.return_value = {'recipe:recipe-list GET': {'constant': 1, 'per_row': 0}}
+        response = SimpleNamespace(
+            resolver_match=SimpleNamespace(view_name='recipe:recipe-list'),
+            request={'REQUEST_METHOD': 'GET'},
+            data=[],
+        )
+        queries = [{'sql': f'SELECT * FROM core_tag WHERE id = {i}'} for i in range(3)]
+
+        with self.assertRaises(AssertionError) as cm:
+            check_budget(response, queries)
+
+        self.assertIn('3x SELECT * FROM core_tag WHERE id = ?', str(cm.exception))
+
+    @patch('core.tests.query_budget.load_budgets')
+    def test_savepoints_are_not_counted(self, patched_budgets):
+        patched_budgets.return_value = {'recipe:recipe-list GET': {'constant': 1, 'per_row': 0}}
+        response = SimpleNamespace(
+            resolver_match=SimpleNamespace(view_name='recipe:recipe-list'),
+            request={'REQUEST_METHOD': 'GET'},
+            data=[],
+        )
+        queries = [{'sql': 'SAVEPOINT "s1_x1"'}, {'sql': 'SELECT 1'}, {'sql': 'RELEASE SAVEPOINT "s1_x1"'}]
+
+        check_budget(response, queries)
+
+    @patch('core.tests.query_budget.load_budgets')
+    def test_request_without_budget_fails(self, patched_budgets):
+        patched_budgets.return_value = {}
+
+        with self.assertRaises(AssertionError):
+            self.client.get(RECIPE_URL)
@@ -0,0 +1,78 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+from drf_spectacular.generators import SchemaGenerator
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import schema
+
+SCHEMA_URL = reverse('api-schema')
+
+
+class SchemaTests(SimpleTestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        settings_override = override_settings(API_SCHEMA_ROOT=os.path.join(self.tmp.name, 'schema'))
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        schema.load.cache_clear()
+        self.addCleanup(schema.load.cache_clear)
+        self.client = APIClient()
+
+    def test_build_schema_writes_yaml_and_json(self):
+        call_command('build_schema', stdout=StringIO())
+
+        with open(schema.schema_path('json')) as f:
+            document = json.load(f)
+        self.assertIn('/api/recipe/recipes/', document['paths'])
+        self.assertTrue(os.path.exists(schema.schema_path('yaml')))
+
+    def test_schema_is_served_from_the_built_file(self):
+        os.makedirs(os.path.dirname(schema.schema_path('yaml')))
+        with open(schema.schema_path('yaml'), 'wb') as f:
+            f.write(b'openapi: 3.0.3\n')
+
+        res = self.client.get(SCHEMA_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.content, b'openapi: 3.0.3\n')
+        self.assertTrue(res['Content-Type'].startswith('application/vnd.oai.openapi'))
+        self.assertIn('max-age', res['Cache-Control'])
+
+    def test_schema_is_generated_without_a_built_file(self):
+        res = self.client.get(SCHEMA_URL, {'format': 'json'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn('/api/recipe/recipes/', json.loads(res.content)['paths'])
+
+    def test_matching_etag_returns_not_modified(self):
+        etag = self.client.get(SCHEMA_URL)['ETag']
+
+        res = self.client.get(SCHEMA_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res.content, b'')
+
+        res = self.client.get(SCHEMA_URL, HTTP_IF_NONE_MATCH='"stale"')
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_keyset_pagination_is_described(self):
+        document = SchemaGenerator().get_schema(request=None, public=True)
+
+        recipes = document['paths']['/api/recipe/recipes/']['get']
+        self.assertLessEqual({'limit', 'cursor'}, {param['name'] for param in recipes['parameters']})
+        page = document['components']['schemas']['PaginatedRecipeList']
+        unpaged, paged = page['oneOf']
+        self.assertEqual(unpaged['type'], 'array')
+        self.assertEqual(paged['properties']['results'], unpaged)
+        self.assertEqual(paged['required'], ['next', 'results'])
+
+        cookable = document['paths']['/api/recipe/recipes/cookable/']['get']
+        self.assertEqual([param['name'] for param in cookable['parameters']].count('limit'), 1)
+        self.assertNotIn('cursor', {param['name'] for param in cookable['parameters']})
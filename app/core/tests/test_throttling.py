@@ -0,0 +1,110 @@
+import os
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, SimpleTestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import throttling
+from core.throttling import SharedMemoryBucketStore, CacheBucketStore, parse_rate
+from core.tests.query_budget import QueryBudgetMixin
+
+RECIPE_URL = reverse('recipe:recipe-list')
+TOKEN_URL = reverse('user:token')
+
+
+class TokenBucketStoreTests(SimpleTestCase):
+    def test_parse_rate(self):
+        self.assertEqual(parse_rate('120/min'), (2.0, 120))
+        self.assertEqual(parse_rate('5/s'), (5.0, 5))
+
+    def test_bucket_allows_burst_then_refills(self):
+        store = SharedMemoryBucketStore(slots=64)
+
+        results = [store.consume('k', rate=1.0, capacity=3, now=100.0)[0] for _ in range(4)]
+        self.assertEqual(results, [True, True, True, False])
+
+        allowed, wait = store.consume('k', rate=1.0, capacity=3, now=100.5)
+        self.assertFalse(allowed)
+        self.assertAlmostEqual(wait, 0.5)
+
+        self.assertTrue(store.consume('k', rate=1.0, capacity=3, now=101.0)[0])
+
+    def test_keys_are_independent(self):
+        store = SharedMemoryBucketStore(slots=64)
+
+        self.assertTrue(store.consume('a', rate=1.0, capacity=1, now=1.0)[0])
+        self.assertTrue(store.consume('b', rate=1.0, capacity=1, now=1.0)[0])
+        self.assertFalse(store.consume('a', rate=1.0, capacity=1, now=1.0)[0])
+
+    def test_full_table_evicts_oldest_bucket(self):
+        store = SharedMemoryBucketStore(slots=4)
+
+        for i in range(20):
+            store.consume(f'key-{i}', rate=1.0, capacity=1, now=float(i))
+
+        self.assertTrue(store.consume('new', rate=1.0, capacity=1, now=30.0)[0])
+
+    def test_file_backed_store_is_shared(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'throttle')
+            first = SharedMemoryBucketStore(path, slots=64)
+            second = SharedMemoryBucketStore(path, slots=64)
+
+            self.assertTrue(first.consume('k', rate=1.0, capacity=1, now=1.0)[0])
+            self.assertFalse(second.consume('k', rate=1.0, capacity=1, now=1.0)[0])
+
+    def test_cache_store(self):
+        store = CacheBucketStore()
+        store.clear()
+
+        self.assertTrue(store.consume('k', rate=1.0, capacity=1, now=1.0)[0])
+        self.assertFalse(store.consume('k', rate=1.0, capacity=1, now=1.0)[0])
+
+
+@override_settings(REST_FRAMEWORK={
+    'DEFAULT_THROTTLE_CLASSES': ['core.throttling.TokenBucketThrottle'],
+    'DEFAULT_THROTTLE_RATES': {'read': '2/min', 'write': '2/min', 'upload': '2/min', 'login': '1/min'},
+})
+class ThrottleApiTests(QueryBudgetMixin, TestCase):
+    def setUp(self):
+        throttling.get_store().clear()
+        self.addCleanup(throttling.get_store().clear)
+        self.user = get_user_model().objects.create_user(email='throttle@example.com', password='pass12345')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_read_scope_is_throttled_per_user(self):
+        self.client.get(RECIPE_URL)
+        self.client.get(RECIPE_URL)
+        res = self.client.get(RECIPE_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertIn('Retry-After', res.headers)
+
+        other = get_user_model().objects.create_user(email='other@example.com', password='pass12345')
+        self.client.force_authenticate(other)
+        self.assertEqual(self.client.get(RECIPE_URL).status_code, status.HTTP_200_OK)
+
+    def test_write_scope_is_separate_from_read(self):
+        self.client.get(RECIPE_URL)
+        self.client.get(RECIPE_URL)
+        res = self.client.post(RECIPE_URL, {'title': 'T', 'price': '1.00', 'description': 'D', 'link': 'L'})
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+    def test_login_scope(self):
+        self.client.force_authenticate(None)
+        payload = {'email': 'throttle@example.com', 'password': 'pass12345'}
+
+        self.assertEqual(self.client.post(TOKEN_URL, payload).status_code, status.HTTP_200_OK)
+        self.assertEqual(self.client.post(TOKEN_URL, payload).status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    @override_settings(THROTTLE_ENABLED=False)
+    def test_throttling_can_be_disabled(self):
+        for _ in range(3):
+            res = self.client.get(RECIPE_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
@@ -0,0 +1,185 @@
+"""Token bucket throttling shared across uWSGI workers.
+
+Buckets live in a fixed-size open addressing table inside a memory mapped
+file (by default under /dev/shm), so every worker on the host sees the same
+buckets without an external service. A decision is a hash, a short flock and
+a couple of struct reads/writes. Without `THROTTLE_SHM_PATH` the table is
+private to the process, which is what tests and `runserver` use.
+"""
+import fcntl
+import hashlib
+import mmap
+import os
+import struct
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+# key hash, tokens left, last update timestamp
+SLOT = struct.Struct('<Qdd')
+PROBES = 8
+DURATIONS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def key_hash(key):
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), 'little') or 1
+
+
+def parse_rate(rate):
+    """Turn '100/min' into `(refill per second, bucket capacity)`."""
+    num, period = rate.split('/')
+    num = int(num)
+    return num / DURATIONS[period[0]], num
+
+
+def refill(tokens, updated, rate, capacity, now):
+    if tokens is None:
+        return float(capacity)
+    return min(float(capacity), tokens + max(0.0, now - updated) * rate)
+
+
+class SharedMemoryBucketStore:
+    def __init__(self, path=None, slots=65536):
+        self.path = path
+        self.slots = slots
+        self._lock = threading.Lock()
+        self._pid = None
+        self._fd = None
+        self._map = None
+
+    def _open(self):
+        # Reopen after a fork: an inherited flock would not exclude the parent.
+        if self._pid == os.getpid():
+            return
+        size = self.slots * SLOT.size
+        if self.path:
+            self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+            if os.fstat(self._fd).st_size < size:
+                os.ftruncate(self._fd, size)
+            self._map = mmap.mmap(self._fd, size)
+        else:
+            self._fd = None
+            self._map = mmap.mmap(-1, size)
+        self._pid = os.getpid()
+
+    def _find(self, khash):
+        """Return the offset of the slot for `khash`, and its state if it is already there."""
+        start = khash % self.slots
+        free = None
+        oldest = None
+        for i in range(PROBES):
+            offset = ((start + i) % self.slots) * SLOT.size
+            slot_hash, tokens, updated = SLOT.unpack_from(self._map, offset)
+            if slot_hash == khash:
+                return offset, tokens, updated
+            if slot_hash == 0:
+                if free is None:
+                    free = offset
+            elif oldest is None or updated < oldest[1]:
+                oldest = (offset, updated)
+        # Evicting the least recently used bucket only ever refills it, so it errs on the side of allowing.
+        return (free if free is not None else oldest[0]), None, None
+
+    def consume(self, key, rate, capacity, now=None):
+        """Take a token for `key`; return `(allowed, seconds until a token is available)`."""
+        now = time.time() if now is None else now
+        khash = key_hash(key)
+        with self._lock:
+            self._open()
+            if self._fd is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                offset, tokens, updated = self._find(khash)
+                tokens = refill(tokens, updated, rate, capacity, now)
+                allowed = tokens >= 1
+                if allowed:
+                    tokens -= 1
+                SLOT.pack_into(self._map, offset, khash, tokens, now)
+            finally:
+                if self._fd is not None:
+                    fcntl.flock(self._fd, fcntl.LOCK_UN)
+        return allowed, 0.0 if allowed else (1 - tokens) / rate
+
+    def clear(self):
+        with self._lock:
+            self._open()
+            self._map[:] = bytes(len(self._map))
+
+
+class CacheBucketStore:
+    """Buckets kept in a Django cache; only shared across workers if the cache is."""
+
+    def __init__(self, alias='default'):
+        self.alias = alias
+
+    def consume(self, key, rate, capacity, now=None):
+        now = time.time() if now is None else now
+        cache = caches[self.alias]
+        cache_key = f'throttle:{key}'
+        tokens, updated = cache.get(cache_key, (None, None))
+        tokens = refill(tokens, updated, rate, capacity, now)
+        allowed = tokens >= 1
+        if allowed:
+            tokens -= 1
+        cache.set(cache_key, (tokens, now), timeout=int(capacity / rate) + 1)
+        return allowed, 0.0 if allowed else (1 - tokens) / rate
+
+    def clear(self):
+        caches[self.alias].clear()
+
+
+_store = None
+
+
+def get_store():
+    global _store
+    if _store is None:
+        if settings.THROTTLE_STORE == 'cache':
+            _store = CacheBucketStore()
+        else:
+            _store = SharedMemoryBucketStore(settings.THROTTLE_SHM_PATH, settings.THROTTLE_SHM_SLOTS)
+    return _store
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """Throttle each user (or client IP when anonymous) per scope.
+
+    The scope is the view's `throttle_scope` (e.g. 'upload', 'login') or
+    otherwise 'read' for safe methods and 'write' for the rest. Rates come from
+    `DEFAULT_THROTTLE_RATES`; a rate of '100/min' allows bursts of 100 requests
+    refilled at 100 per minute.
+    """
+
+    def __init__(self):
+        self._wait = None
+
+    def get_scope(self, request, view):
+        scope = getattr(view, 'throttle_scope', None)
+        if scope:
+            return scope
+        return 'read' if request.method in SAFE_METHODS else 'write'
+
+    def get_ident(self, request):
+        if request.user and request.user.is_authenticated:
+            return f'user:{request.user.pk}'
+        return f'ip:{super().get_ident(request)}'
+
+    def allow_request(self, request, view):
+        if not settings.THROTTLE_ENABLED:
+            return True
+        scope = self.get_scope(request, view)
+        rate = api_settings.DEFAULT_THROTTLE_RATES.get(scope)
+        if rate is None:
+            return True
+
+        refill_rate, capacity = parse_rate(rate)
+        allowed, self._wait = get_store().consume(f'{scope}:{self.get_ident(request)}', refill_rate, capacity)
+        return allowed
+
+    def wait(self):
+        return self._wait
@@ -0,0 +1,138 @@
+"""Set-based writes over many recipes at once.
+
+These write with bulk queries that send no model signals, so each records its
+changes for the sync log itself.
+"""
+from django.db import connection
+
+from core import changes, jobs
+from core.models import Recipe, Tag, Ingredient, Change
+
+THROUGH_TABLES = {
+    Tag: (Recipe.tags.through, 'tag_id'),
+    Ingredient: (Recipe.ingredients.through, 'ingredient_id'),
+}
+
+# Recipes per INSERT ... SELECT, which takes two parameters per recipe
+CHUNK_SIZE = 1000
+
+
+def _copy_links(clones):
+    """Give every new recipe in `clones` ({source id: new id}) its source's tags and ingredients."""
+    qn = connection.ops.quote_name
+    items = list(clones.items())
+    with connection.cursor() as cursor:
+        for start in range(0, len(items), CHUNK_SIZE):
+            chunk = items[start:start + CHUNK_SIZE]
+            values = ', '.join(['(%s, %s)'] * len(chunk))
+            params = [pk for pair in chunk for pk in pair]
+            for through, column in THROUGH_TABLES.values():
+                table = qn(through._meta.db_table)
+                cursor.execute(
+                    f'WITH clones (source_id, clone_id) AS (VALUES {values}) '
+                    f'INSERT INTO {table} ({qn("recipe_id")}, {qn(column)}) '
+                    f'SELECT clones.clone_id, links.{qn(column)} FROM {table} links '
+                    f'JOIN clones ON clones.source_id = links.{qn("recipe_id")}',
+                    params,
+                )
+
+
+def clone(user_id, recipe_ids):
+    """Copy the user's recipes `recipe_ids` with their tags and ingredients.
+
+    Returns `{source id: new id}`; ids the user does not own are left out.
+    Clones share their source's image file until the `copy_recipe_images` job,
+    which only runs once the clones are committed, gives them their own.
+    Must run inside `changes.batch()` (or another transaction).
+    """
+    # Locked so that none of them is deleted before it is copied
+    sources = list(
+        Recipe.objects.select_for_update().filter(user_id=user_id, id__in=recipe_ids)
+        .order_by('id').values_list('id', flat=True)
+    )
+    if not sources:
+        return {}
+
+    qn = connection.ops.quote_name
+    table = qn(Recipe._meta.db_table)
+    columns = ', '.join(qn(f.column) for f in Recipe._meta.concrete_fields if not f.primary_key)
+    placeholders = ', '.join(['%s'] * len(sources))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {table} ({columns}) SELECT {columns} FROM {table} '
+            f'WHERE {qn("id")} IN ({placeholders}) ORDER BY {qn("id")} RETURNING {qn("id")}, {qn("image")}',
+            sources,
+        )
+        rows = sorted(cursor.fetchall())
+    # Rows are inserted in source id order and new ids only grow, so the
+    # clone of the nth smallest source has the nth smallest new id.
+    clones = {source: pk for source, (pk, _) in zip(sources, rows)}
+    _copy_links(clones)
+    changes.record(user_id, Change.RECIPE, clones.values())
+
+    with_image = [pk for pk, image in rows if image]
+    if with_image:
+        jobs.enqueue('recipe.tasks.copy_recipe_images', user_id=user_id, recipe_ids=with_image)
+    return clones
+
+
+def unknown_ids(model, user_id, ids):
+    """Return the ids in `ids` that are not rows of `model` owned by `user_id`."""
+    owned = set(model.objects.filter(user_id=user_id, id__in=ids).values_list('id', flat=True))
+    return [pk for pk in dict.fromkeys(ids) if pk not in owned]
+
+
+def relink(user_id, recipe_ids, model, add=(), remove=()):
+    """Add and remove links between the recipes and the tag or ingredient ids; return (added, removed).
+
+    All ids must belong to `user_id`. Must run inside `changes.batch()`.
+    """
+    through, column = THROUGH_TABLES[model]
+    changed = set()
+
+    removed = 0
+    if remove:
+        links = through.objects.filter(recipe_id__in=recipe_ids, **{f'{column}__in': remove})
+        changed.update(links.values_list('recipe_id', flat=True))
+        removed, _ = links.delete()
+
+    added = 0
+    if add:
+        qn = connection.ops.quote_name
+        recipes = ', '.join(['%s'] * len(recipe_ids))
+        related = ', '.join(['%s'] * len(add))
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {qn(through._meta.db_table)} ({qn("recipe_id")}, {qn(column)}) '
+                f'SELECT recipe.{qn("id")}, related.{qn("id")} '
+                f'FROM {qn(Recipe._meta.db_table)} recipe, {qn(model._meta.db_table)} related '
+                f'WHERE recipe.{qn("id")} IN ({recipes}) AND recipe.{qn("user_id")} = %s '
+                f'AND related.{qn("id")} IN ({related}) AND related.{qn("user_id")} = %s '
+                f'ON CONFLICT DO NOTHING RETURNING {qn("recipe_id")}',
+                [*recipe_ids, user_id, *add, user_id],
+            )
+            inserted = [row[0] for row in cursor.fetchall()]
+        added = len(inserted)
+        changed.update(inserted)
+
+    changes.record(user_id, Change.RECIPE, changed)
+    return added, removed
+
+
+def merge(user_id, model, source_id, target_id):
+    """Move every recipe from the tag or ingredient `source_id` to `target_id` and delete the source.
+
+    Returns how many recipes were moved. Must run inside `changes.batch()`.
+    """
+    through, column = THROUGH_TABLES[model]
+    source_links = through.objects.filter(**{column: source_id})
+    recipe_ids = list(source_links.values_list('recipe_id', flat=True))
+
+    # Recipes that already have the target only lose the source link.
+    source_links.exclude(
+        recipe_id__in=through.objects.filter(**{column: target_id}).values('recipe_id'),
+    ).update(**{column: target_id})
+    model.objects.filter(user_id=user_id, id=source_id).delete()
+
+    changes.record(user_id, Change.RECIPE, recipe_ids)
+    return len(recipe_ids)
@@ -0,0 +1,20 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from recipe import similarity
+
+
+class Command(BaseCommand):
+    help = 'Bring the precomputed similar recipe lists up to date with the change log.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, action='append', dest='users', help='Only this user id (repeatable)')
+        parser.add_argument('--full', action='store_true', help='Rebuild every list instead of the changed ones')
+
+    def handle(self, *args, **options):
+        users = options['users'] or get_user_model().objects.filter(recipe__isnull=False).distinct().values_list(
+            'id', flat=True,
+        )
+        for user_id in users:
+            rebuilt = similarity.refresh(user_id, full=options['full'])
+            self.stdout.write(f'User {user_id}: rebuilt {rebuilt} lists')
@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, F
+from django.db.models.functions import Lower
+
+from core import changes
+from core.models import Tag, Ingredient
+from recipe import bulk
+
+
+class Command(BaseCommand):
+    help = (
+        "Merge each user's tags and ingredients sharing a name into the oldest of them. "
+        'Migration core.0016 does the same for exact duplicates before the names are made unique.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, action='append', dest='users', help='Only this user id (repeatable)')
+        parser.add_argument('--ignore-case', action='store_true', help='Also merge names differing only in case')
+        parser.add_argument('--dry-run', action='store_true', help='Only list what would be merged')
+
+    def handle(self, *args, **options):
+        for model in (Tag, Ingredient):
+            rows = model.objects.annotate(key=Lower('name') if options['ignore_case'] else F('name'))
+            if options['users']:
+                rows = rows.filter(user_id__in=options['users'])
+            duplicated = rows.values('user_id', 'key').annotate(copies=Count('id')).filter(copies__gt=1)
+
+            for group in list(duplicated):
+                user_id, name = group['user_id'], group['key']
+                target, *sources = rows.filter(user_id=user_id, key=name).order_by('id').values_list('id', flat=True)
+                moved = 0
+                if not options['dry_run']:
+                    with changes.batch():
+                        for source in sources:
+                            moved += bulk.merge(user_id, model, source, target)
+                self.stdout.write(
+                    f'User {user_id}: merged {len(sources)} {model._meta.verbose_name_plural} '
+                    f'named {name!r} into {target} ({moved} recipes moved)'
+                )
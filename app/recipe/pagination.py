@@ -0,0 +1,136 @@
+"""Keyset pagination for the recipe list.
+
+Pages continue after the last row of the previous page instead of skipping an
+offset, so with the `(user, <ordering>, id)` indexes every page is a range
+scan no matter how deep it is. The cursor holds that row's ordering value and
+id; id breaks ties and sorts in the same direction as the ordering field.
+NULLs (recipes without a time) sort after every value, as in the indexes.
+
+Paging is opt-in: the list is only paginated when `limit` or `cursor` is given.
+"""
+import base64
+import binascii
+import json
+
+from django.core import exceptions
+from django.db.models import F, Q
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+def keyset_order(ordering):
+    """The `order_by()` arguments for `ordering`, a field name optionally prefixed with '-'."""
+    field = ordering.lstrip('-')
+    if field == 'id':
+        return [ordering]
+    if ordering.startswith('-'):
+        return [F(field).desc(nulls_first=True), '-id']
+    return [F(field).asc(nulls_last=True), 'id']
+
+
+class KeysetPagination(BasePagination):
+    """Pages of a queryset ordered by `keyset_order(view.get_ordering())`."""
+    default_limit = 100
+    max_limit = 1000
+
+    def _decode_cursor(self, cursor, field):
+        """Return the ordering value (as a value of `field`) and id held by `cursor`."""
+        try:
+            value, pk = json.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
+            if value is not None:
+                value = field.to_python(value)
+            return value, int(pk)
+        except (ValueError, TypeError, binascii.Error, UnicodeDecodeError, exceptions.ValidationError):
+            raise ValidationError({'cursor': 'Invalid cursor.'})
+
+    def _encode_cursor(self, value, pk):
+        value = None if value is None else str(value)
+        return base64.urlsafe_b64encode(json.dumps([value, pk]).encode()).decode()
+
+    def _after(self, field, descending, value, pk):
+        """Rows after (`value`, `pk`) in the order, treating NULL as greater than any value."""
+        if field == 'id':
+            return Q(id__lt=pk) if descending else Q(id__gt=pk)
+        if descending:
+            if value is None:
+                return Q(**{f'{field}__isnull': True, 'id__lt': pk}) | Q(**{f'{field}__isnull': False})
+            return Q(**{f'{field}__lt': value}) | Q(**{field: value, 'id__lt': pk})
+        if value is None:
+            return Q(**{f'{field}__isnull': True, 'id__gt': pk})
+        return Q(**{f'{field}__gt': value}) | Q(**{field: value, 'id__gt': pk}) | Q(**{f'{field}__isnull': True})
+
+    def paginate_queryset(self, queryset, request, view=None):
+        params = request.query_params
+        if 'limit' not in params and 'cursor' not in params:
+            return None
+        try:
+            self.limit = max(min(int(params.get('limit', self.default_limit)), self.max_limit), 1)
+        except ValueError:
+            raise ValidationError({'limit': 'A valid integer is required.'})
+
+        ordering = view.get_ordering()
+        field, descending = ordering.lstrip('-'), ordering.startswith('-')
+        if params.get('cursor'):
+            value, pk = self._decode_cursor(params['cursor'], queryset.model._meta.get_field(field))
+            queryset = queryset.filter(self._after(field, descending, value, pk))
+
+        rows = list(queryset[:self.limit + 1])
+        self.request = request
+        self.next_cursor = None
+        if len(rows) > self.limit:
+            rows = rows[:self.limit]
+            last = rows[-1]
+            self.next_cursor = self._encode_cursor(getattr(last, field), last.pk)
+        return rows
+
+    def get_next_link(self):
+        if self.next_cursor is None:
+            return None
+        return replace_query_param(self.request.build_absolute_uri(), 'cursor', self.next_cursor)
+
+    def get_paginated_response(self, data):
+        return Response({'next': self.get_next_link(), 'results': data})
+
+    def get_paginated_response_schema(self, schema):
+        # Without `limit` or `cursor` the list is not paged at all.
+        return {
+            'oneOf': [
+                schema,
+                {
+                    'type': 'object',
+                    'required': ['next', 'results'],
+                    'properties': {
+                        'next': {
+                            'type': 'string',
+                            'nullable': True,
+                            'format': 'uri',
+                            'example': 'http://api.example.org/api/recipe/recipes/?cursor=WyI0LjUwIiwgMTJd&limit=100',
+                        },
+                        'results': schema,
+                    },
+                },
+            ],
+        }
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                'name': 'limit',
+                'required': False,
+                'in': 'query',
+                'description': (
+                    f'Page size, up to {self.max_limit}. When given the list is returned as '
+                    '`{"next": <url or null>, "results": [...]}`'
+                ),
+                'schema': {'type': 'integer'},
+            },
+            {
+                'name': 'cursor',
+                'required': False,
+                'in': 'query',
+                'description': 'The cursor of the next page, from the previous page',
+                'schema': {'type': 'string'},
+            },
+        ]
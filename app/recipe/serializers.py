@@ -1,19 +1,55 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
 from core.models import Recipe, Tag, Ingredient
+from . import vocabulary
+
+
+# Only reads are trimmed; writes validate and answer with every field
+READ_METHODS = ('GET', 'HEAD')
+
+
+def requested_fields(request, field_names):
+    """Return the names in `field_names` kept by the `?fields=` and `?exclude=` query parameters."""
+    keep = list(field_names)
+    if request is None or request.method not in READ_METHODS:
+        return keep
+    fields = request.query_params.get('fields')
+    exclude = request.query_params.get('exclude')
+    if fields:
+        wanted = set(fields.split(','))
+        keep = [name for name in keep if name in wanted]
+    if exclude:
+        unwanted = set(exclude.split(','))
+        keep = [name for name in keep if name not in unwanted]
+    return keep
+
+
+class DynamicFieldsMixin:
+    """Drop the fields not selected by `?fields=`/`?exclude=` when reading."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        keep = set(requested_fields(self.context.get('request'), self.fields))
+        for name in list(self.fields):
+            if name not in keep:
+                self.fields.pop(name)
 
 class TagSerializer(serializers.ModelSerializer):
     class Meta:
         model = Tag
         fields = ['name']
 
+class SyncTagSerializer(TagSerializer):
+    class Meta(TagSerializer.Meta):
+        fields = ['id', 'name']
+
 class IngredientSerializer(serializers.ModelSerializer):
     class Meta:
         model = Ingredient
         fields = ['id', 'name']
         read_only_fields = ['id']
 
-class RecipeSerializer(serializers.ModelSerializer):
+class RecipeSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     tags = TagSerializer(many=True, required=False)
     ingredients = IngredientSerializer(many=True, required=False)
 
@@ -23,14 +59,10 @@ class RecipeSerializer(serializers.ModelSerializer):
         read_only_fields = ['id']
 
     def _get_or_create_tags(self, tags, instance):
-        for tag in tags:
-            tag_obj, created = Tag.objects.get_or_create(user = self.context['request'].user, **tag)
-            instance.tags.add(tag_obj)
+        vocabulary.link(instance, Tag, [tag['name'] for tag in tags])
 
     def _get_or_create_ingredients(self, ingredients, instance):
-        for ing in ingredients:
-            ing_obj, created = Ingredient.objects.get_or_create(user = self.context['request'].user, **ing)
-            instance.ingredients.add(ing_obj)
+        vocabulary.link(instance, Ingredient, [ing['name'] for ing in ingredients])
 
     def create(self, validated_data):
         tags = validated_data.pop('tags', [])
@@ -66,6 +98,42 @@ class RecipeDetailSerializer(RecipeSerializer):
     class Meta(RecipeSerializer.Meta):
         fields = RecipeSerializer.Meta.fields + ['description']
 
+class CookableRecipeSerializer(RecipeSerializer):
+    coverage = serializers.FloatField(read_only=True, help_text='Share of its ingredients in the pantry')
+    missing = serializers.IntegerField(read_only=True, help_text='Number of its ingredients not in the pantry')
+
+    class Meta(RecipeSerializer.Meta):
+        fields = RecipeSerializer.Meta.fields + ['coverage', 'missing']
+
+
+class SimilarRecipeSerializer(RecipeSerializer):
+    score = serializers.FloatField(read_only=True, help_text='Jaccard index of their tags and ingredients')
+
+    class Meta(RecipeSerializer.Meta):
+        fields = RecipeSerializer.Meta.fields + ['score']
+
+
+def comma_separated_ids(value, name):
+    """Parse a query parameter like `1,2,3` into a list of ids."""
+    try:
+        return [int(pk) for pk in value.split(',')]
+    except ValueError:
+        raise serializers.ValidationError(f'Expected a comma separated list of {name} IDs.')
+
+
+class CookableQuerySerializer(serializers.Serializer):
+    pantry = serializers.CharField(help_text='Comma separated list of the ingredient IDs at hand')
+    missing = serializers.IntegerField(min_value=0, default=0)
+    limit = serializers.IntegerField(min_value=1, max_value=500, default=50)
+
+    def validate_pantry(self, value):
+        return comma_separated_ids(value, 'ingredient')
+
+
+class SyncQuerySerializer(serializers.Serializer):
+    limit = serializers.IntegerField(min_value=1, max_value=5000, default=500, help_text='Maximum number of changes to return')
+
+
 class RecipeImageSerializer(serializers.ModelSerializer):
     class Meta:
         model = Recipe
@@ -74,3 +142,84 @@ class RecipeImageSerializer(serializers.ModelSerializer):
         extra_kwargs = {
             'image': { 'required': True }
         }
+
+
+class RecipeFilterSerializer(serializers.Serializer):
+    """Tag, ingredient and range filters and ordering of the recipe list."""
+    ORDERINGS = ['-id', 'id', 'price', '-price', 'time_minutes', '-time_minutes']
+
+    tags = serializers.CharField(required=False, allow_blank=True)
+    ingredients = serializers.CharField(required=False, allow_blank=True)
+    price_min = serializers.DecimalField(max_digits=5, decimal_places=2, required=False)
+    price_max = serializers.DecimalField(max_digits=5, decimal_places=2, required=False)
+    time_max = serializers.IntegerField(min_value=0, required=False)
+    ordering = serializers.ChoiceField(choices=ORDERINGS, default='-id')
+
+    def validate_tags(self, value):
+        return comma_separated_ids(value, 'tag') if value else []
+
+    def validate_ingredients(self, value):
+        return comma_separated_ids(value, 'ingredient') if value else []
+
+
+class RecipeIdsSerializer(serializers.Serializer):
+    """Recipes a bulk action applies to."""
+    ids = serializers.ListField(child=serializers.IntegerField(min_value=1), allow_empty=False, max_length=1000)
+
+
+class RecipeBulkDeleteSerializer(serializers.Serializer):
+    """Recipes to delete: those in `ids` and/or having any of the `tags` or `ingredients`."""
+    ids = serializers.ListField(child=serializers.IntegerField(min_value=1), required=False, max_length=1000)
+    tags = serializers.ListField(child=serializers.IntegerField(min_value=1), required=False)
+    ingredients = serializers.ListField(child=serializers.IntegerField(min_value=1), required=False)
+
+    def validate(self, attrs):
+        if not any(attrs.values()):
+            raise serializers.ValidationError('Select the recipes to delete with ids, tags or ingredients.')
+        return attrs
+
+
+class RecipeRelinkSerializer(RecipeIdsSerializer):
+    add = serializers.ListField(child=serializers.IntegerField(min_value=1), required=False, default=list)
+    remove = serializers.ListField(child=serializers.IntegerField(min_value=1), required=False, default=list)
+
+
+class MergeSerializer(serializers.Serializer):
+    source = serializers.IntegerField(min_value=1)
+    target = serializers.IntegerField(min_value=1)
+
+    def validate(self, attrs):
+        if attrs['source'] == attrs['target']:
+            raise serializers.ValidationError('Cannot merge an ingredient into itself.')
+        return attrs
+
+
+class PriceStatsSerializer(serializers.Serializer):
+    avg = serializers.DecimalField(max_digits=5, decimal_places=2, allow_null=True)
+    min = serializers.DecimalField(max_digits=5, decimal_places=2, allow_null=True)
+    max = serializers.DecimalField(max_digits=5, decimal_places=2, allow_null=True)
+    p50 = serializers.DecimalField(max_digits=5, decimal_places=2, allow_null=True)
+    p90 = serializers.DecimalField(max_digits=5, decimal_places=2, allow_null=True)
+
+
+class TimeStatsSerializer(serializers.Serializer):
+    avg = serializers.FloatField(allow_null=True)
+    min = serializers.IntegerField(allow_null=True)
+    max = serializers.IntegerField(allow_null=True)
+    p50 = serializers.FloatField(allow_null=True)
+    p90 = serializers.FloatField(allow_null=True)
+
+
+class TopItemSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    name = serializers.CharField()
+    recipes = serializers.IntegerField(help_text='Number of the recipes it is used in')
+
+
+class RecipeStatsSerializer(serializers.Serializer):
+    """Summary of the recipes matching the list filters, see recipe/stats.py."""
+    count = serializers.IntegerField()
+    price = PriceStatsSerializer()
+    time_minutes = TimeStatsSerializer()
+    tags = TopItemSerializer(many=True)
+    ingredients = TopItemSerializer(many=True)
@@ -0,0 +1,120 @@
+"""Precomputed lists of each recipe's most similar recipes.
+
+A recipe's vector is the set of its tags and ingredients, and two recipes are
+as similar as the Jaccard index of their sets. Vectors are sparse and small,
+so they are plain Python sets, with an inverted index from each tag and
+ingredient to the recipes using it: a recipe is only scored against the
+recipes sharing at least one of its features.
+
+Lists are kept per user in `RecipeSimilarity`, up to `SIMILAR_RECIPES` long.
+`refresh()` brings them up to date with the user's change log: it only rebuilds
+the lists of the recipes that changed, of the recipes sharing a tag or an
+ingredient with them (which they may have joined) and of the recipes listing
+them (which they may have left). `RecipeSimilarityState` remembers the newest
+change already reflected.
+"""
+import heapq
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import transaction
+
+from core import changes, jobs
+from core.models import Recipe, RecipeSimilarity, RecipeSimilarityState, Change, Job
+
+REFRESH_TASK = 'recipe.tasks.refresh_similar_recipes'
+
+# Recipes per DELETE ... WHERE recipe_id IN (...)
+CHUNK_SIZE = 1000
+
+
+def vectors(user_id):
+    """{recipe id: {feature}} for every recipe of `user_id` with any tags or ingredients."""
+    features = defaultdict(set)
+    for recipe_id, tag_id in Recipe.tags.through.objects.filter(recipe__user_id=user_id).values_list(
+        'recipe_id', 'tag_id',
+    ):
+        features[recipe_id].add(('tag', tag_id))
+    for recipe_id, ingredient_id in Recipe.ingredients.through.objects.filter(recipe__user_id=user_id).values_list(
+        'recipe_id', 'ingredient_id',
+    ):
+        features[recipe_id].add(('ingredient', ingredient_id))
+    return features
+
+
+def postings(features):
+    """The inverted index of `features`: {feature: [recipe id]}."""
+    index = defaultdict(list)
+    for recipe_id, recipe_features in features.items():
+        for feature in recipe_features:
+            index[feature].append(recipe_id)
+    return index
+
+
+def neighbours(recipe_id, features, index, limit):
+    """The `limit` recipes most similar to `recipe_id` as [(score, id)], best first."""
+    overlap = Counter()
+    for feature in features[recipe_id]:
+        overlap.update(index[feature])
+    del overlap[recipe_id]
+    size = len(features[recipe_id])
+    scores = ((shared / (size + len(features[other]) - shared), other) for other, shared in overlap.items())
+    return heapq.nlargest(limit, scores)
+
+
+def _affected(user_id, since, features, index):
+    """The recipes whose lists may have changed with the recipe changes after `since`."""
+    changed = set(
+        Change.objects.filter(user_id=user_id, kind=Change.RECIPE, seq__gt=since).values_list('object_id', flat=True)
+    )
+    if not changed:
+        return changed
+    affected = set(changed)
+    affected.update(RecipeSimilarity.objects.filter(similar_id__in=changed).values_list('recipe_id', flat=True))
+    for recipe_id in changed & features.keys():
+        for feature in features[recipe_id]:
+            affected.update(index[feature])
+    return affected
+
+
+def refresh(user_id, full=False):
+    """Bring the similar recipe lists of `user_id` up to date; return how many lists were rebuilt."""
+    limit = settings.SIMILAR_RECIPES
+    with transaction.atomic():
+        state, _ = RecipeSimilarityState.objects.select_for_update().get_or_create(user_id=user_id)
+        upto = changes.generation(user_id)
+        if upto == state.change_id and not full:
+            return 0
+
+        features = vectors(user_id)
+        index = postings(features)
+        if full or not state.change_id:
+            RecipeSimilarity.objects.filter(recipe__user_id=user_id).delete()
+            affected = set(features)
+        else:
+            affected = _affected(user_id, state.change_id, features, index)
+            ids = sorted(affected)
+            for start in range(0, len(ids), CHUNK_SIZE):
+                RecipeSimilarity.objects.filter(recipe_id__in=ids[start:start + CHUNK_SIZE]).delete()
+
+        RecipeSimilarity.objects.bulk_create([
+            RecipeSimilarity(recipe_id=recipe_id, similar_id=other, score=score)
+            for recipe_id in affected & features.keys()
+            for score, other in neighbours(recipe_id, features, index, limit)
+        ], batch_size=CHUNK_SIZE)
+
+        state.change_id = upto
+        state.save(update_fields=['change_id'])
+    return len(affected)
+
+
+def is_stale(user_id):
+    state = RecipeSimilarityState.objects.filter(user_id=user_id).values_list('change_id', flat=True).first()
+    return state != changes.generation(user_id)
+
+
+def schedule_refresh(user_id):
+    """Queue a refresh of the lists of `user_id`, unless one is already waiting."""
+    queued = Job.objects.filter(name=REFRESH_TASK, status=Job.QUEUED, payload__user_id=user_id)
+    if not queued.exists():
+        jobs.enqueue(REFRESH_TASK, user_id=user_id)
@@ -0,0 +1,100 @@
+"""Aggregates over a user's recipes, computed in the database.
+
+The counts, averages, extremes and percentiles come from one aggregate query
+and the most used tags and ingredients from one `UNION ALL` of two grouped,
+ranked queries. Only PostgreSQL has `percentile_cont`; elsewhere the two
+columns are read sorted and interpolated the same way, costing a third query.
+"""
+from django.db import connections
+from django.db.models import Aggregate, Avg, Count, F, FloatField, Max, Min, Value, Window
+from django.db.models.functions import RowNumber
+
+from core.models import Recipe
+
+PERCENTILES = {'p50': 0.5, 'p90': 0.9}
+
+# Recipe columns summarised by average, extremes and percentiles
+COLUMNS = ('price', 'time_minutes')
+
+# Related rows ranked in each summary: {key: (through model, its foreign key to them)}
+TOP = {
+    'tags': (Recipe.tags.through, 'tag'),
+    'ingredients': (Recipe.ingredients.through, 'ingredient'),
+}
+
+
+class PercentileCont(Aggregate):
+    """PostgreSQL's continuous percentile of the non-null values."""
+    function = 'PERCENTILE_CONT'
+    template = '%(function)s(%(fraction)s) WITHIN GROUP (ORDER BY %(expressions)s)'
+    output_field = FloatField()
+
+    def __init__(self, expression, fraction, **extra):
+        super().__init__(expression, fraction=float(fraction), **extra)
+
+
+def _interpolate(values, fraction):
+    """Same as `percentile_cont` for `values` sorted ascending."""
+    if not values:
+        return None
+    position = (len(values) - 1) * fraction
+    lower = int(position)
+    upper = min(lower + 1, len(values) - 1)
+    return float(values[lower]) + (float(values[upper]) - float(values[lower])) * (position - lower)
+
+
+def _summary(recipes):
+    in_database = connections[recipes.db].vendor == 'postgresql'
+    aggregates = {'count': Count('id')}
+    for column in COLUMNS:
+        aggregates.update({
+            f'{column}__avg': Avg(column),
+            f'{column}__min': Min(column),
+            f'{column}__max': Max(column),
+        })
+        if in_database:
+            aggregates.update({
+                f'{column}__{name}': PercentileCont(column, fraction) for name, fraction in PERCENTILES.items()
+            })
+    row = recipes.aggregate(**aggregates)
+
+    if not in_database:
+        rows = list(recipes.values_list(*COLUMNS))
+        for index, column in enumerate(COLUMNS):
+            values = sorted(value[index] for value in rows if value[index] is not None)
+            for name, fraction in PERCENTILES.items():
+                row[f'{column}__{name}'] = _interpolate(values, fraction)
+
+    summary = {'count': row['count']}
+    for column in COLUMNS:
+        summary[column] = {
+            name: row[f'{column}__{name}'] for name in ('avg', 'min', 'max', *PERCENTILES)
+        }
+    return summary
+
+
+def _top(section, recipes, limit):
+    """The `limit` rows of `section` linked to most of `recipes`, ties broken by name."""
+    through, related = TOP[section]
+    return (
+        through.objects.filter(recipe__in=recipes.values('pk'))
+        .values(related, f'{related}__name')
+        .annotate(recipes=Count('*'))
+        .annotate(rank=Window(RowNumber(), order_by=[F('recipes').desc(), F(f'{related}__name').asc()]))
+        .filter(rank__lte=limit)
+        .annotate(section=Value(section))
+        .values_list('section', related, f'{related}__name', 'recipes')
+    )
+
+
+def compute(recipes, limit):
+    """Summarise `recipes` and list their `limit` most used tags and ingredients."""
+    stats = _summary(recipes)
+    first, *rest = [_top(section, recipes, limit) for section in TOP]
+    for section in TOP:
+        stats[section] = []
+    for section, pk, name, count in first.union(*rest, all=True):
+        stats[section].append({'id': pk, 'name': name, 'recipes': count})
+    for section in TOP:
+        stats[section].sort(key=lambda item: (-item['recipes'], item['name']))
+    return stats
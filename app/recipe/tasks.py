@@ -0,0 +1,54 @@
+from django.conf import settings
+from PIL import Image, ImageOps
+
+from core import changes
+from core.jobs import task
+from core.models import Recipe, Change
+from . import similarity
+
+
+@task
+def optimize_recipe_image(recipe_id):
+    """Downscale an uploaded recipe image in place and drop its metadata."""
+    recipe = Recipe.objects.filter(id=recipe_id).only('id', 'image').first()
+    if recipe is None or not recipe.image:
+        return
+
+    max_size = settings.RECIPE_IMAGE_MAX_SIZE
+    with Image.open(recipe.image.path) as img:
+        fmt = img.format
+        if max(img.size) <= max_size and not img.info.get('exif'):
+            return
+        img = ImageOps.exif_transpose(img)
+        img.thumbnail((max_size, max_size))
+        img.save(recipe.image.path, format=fmt)
+
+
+@task
+def copy_recipe_images(user_id, recipe_ids):
+    """Give cloned recipes their own copy of the image file they share with their source.
+
+    Recipes whose image changed (or that were deleted) in the meantime are
+    left alone.
+    """
+    field = Recipe._meta.get_field('image')
+    copied = []
+    for recipe_id, name in Recipe.objects.filter(id__in=recipe_ids).values_list('id', 'image'):
+        if not name:
+            continue
+        try:
+            with field.storage.open(name) as source:
+                copy = field.storage.save(field.generate_filename(None, name), source)
+        except FileNotFoundError:
+            continue
+        if Recipe.objects.filter(id=recipe_id, image=name).update(image=copy):
+            copied.append(recipe_id)
+        else:
+            field.storage.delete(copy)
+    changes.record(user_id, Change.RECIPE, copied)
+
+
+@task
+def refresh_similar_recipes(user_id):
+    """Rebuild the similar recipe lists touched by the user's changes since the last refresh."""
+    similarity.refresh(user_id)
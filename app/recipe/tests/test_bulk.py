@@ -0,0 +1,224 @@
+import os
+import tempfile
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.db import DatabaseError
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import changes, jobs
+from core.models import Recipe, Tag, Ingredient, Change, Job
+from core.tests.query_budget import QueryBudgetMixin
+from recipe import bulk
+
+BULK_CLONE_URL = reverse('recipe:recipe-bulk-clone')
+BULK_DELETE_URL = reverse('recipe:recipe-bulk-delete')
+BULK_TAGS_URL = reverse('recipe:recipe-bulk-tags')
+BULK_INGREDIENTS_URL = reverse('recipe:recipe-bulk-ingredients')
+MERGE_INGREDIENTS_URL = reverse('recipe:recipe-merge-ingredients')
+
+
+def clone_url(recipe_id):
+    return reverse('recipe:recipe-clone', args=[recipe_id])
+
+
+def create_recipe(user, title='Sample title', tags=(), ingredients=()):
+    recipe = Recipe.objects.create(
+        user=user, title=title, time_minutes=5, price=Decimal('5.50'), description='Description.',
+    )
+    for name in tags:
+        recipe.tags.add(Tag.objects.get_or_create(user=user, name=name)[0])
+    for name in ingredients:
+        recipe.ingredients.add(Ingredient.objects.get_or_create(user=user, name=name)[0])
+    return recipe
+
+
+class CloneTests(QueryBudgetMixin, TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(email='clone@example.com', password='pass12345')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_clone_copies_recipe_and_links(self):
+        recipe = create_recipe(self.user, 'Soup', tags=['Vegan', 'Dinner'], ingredients=['Salt'])
+
+        res = self.client.post(clone_url(recipe.id))
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        clone = Recipe.objects.get(id=res.data['id'])
+        self.assertNotEqual(clone.id, recipe.id)
+        self.assertEqual((clone.title, clone.price, clone.description), ('Soup', recipe.price, recipe.description))
+        self.assertEqual(set(clone.tags.all()), set(recipe.tags.all()))
+        self.assertEqual(set(clone.ingredients.all()), set(recipe.ingredients.all()))
+        self.assertEqual(sorted(t['name'] for t in res.data['tags']), ['Dinner', 'Vegan'])
+        self.assertTrue(Change.objects.filter(kind=Change.RECIPE, object_id=clone.id).exists())
+
+    def test_clone_copies_the_image_file_after_commit(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        with self.settings(MEDIA_ROOT=media_root.name):
+            recipe = create_recipe(self.user)
+            recipe.image.save('soup.jpg', ContentFile(b'jpeg bytes'))
+
+            res = self.client.post(clone_url(recipe.id))
+
+            clone = Recipe.objects.get(id=res.data['id'])
+            self.assertEqual(clone.image.name, recipe.image.name)
+            jobs.run_pending()
+
+            clone.refresh_from_db()
+            self.assertNotEqual(clone.image.name, recipe.image.name)
+            with clone.image.open() as copied:
+                self.assertEqual(copied.read(), b'jpeg bytes')
+
+    def test_clone_rolled_back_leaves_no_image_copy(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        with self.settings(MEDIA_ROOT=media_root.name):
+            recipe = create_recipe(self.user)
+            recipe.image.save('soup.jpg', ContentFile(b'jpeg bytes'))
+
+            with self.assertRaises(DatabaseError), changes.batch():
+                bulk.clone(self.user.id, [recipe.id])
+                raise DatabaseError
+
+            self.assertEqual(Recipe.objects.count(), 1)
+            self.assertFalse(Job.objects.exists())
+            self.assertEqual(os.listdir(os.path.dirname(recipe.image.path)), [os.path.basename(recipe.image.name)])
+
+    def test_clone_other_users_recipe_not_found(self):
+        other = get_user_model().objects.create_user(email='other@example.com', password='pass12345')
+        recipe = create_recipe(other)
+
+        res = self.client.post(clone_url(recipe.id))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(Recipe.objects.count(), 1)
+
+    def test_bulk_clone(self):
+        recipes = [create_recipe(self.user, f'Recipe {i}', tags=[f'Tag {i}'], ingredients=['Salt']) for i in range(3)]
+        ids = [recipes[2].id, recipes[0].id]
+
+        res = self.client.post(BULK_CLONE_URL, {'ids': ids}, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        clones = [Recipe.objects.get(id=pk) for pk in res.data['ids']]
+        self.assertEqual([c.title for c in clones], ['Recipe 2', 'Recipe 0'])
+        self.assertEqual([t.name for t in clones[0].tags.all()], ['Tag 2'])
+        self.assertEqual([i.name for i in clones[1].ingredients.all()], ['Salt'])
+        self.assertEqual(Recipe.objects.count(), 5)
+
+    def test_bulk_clone_rejects_unknown_ids(self):
+        recipe = create_recipe(self.user)
+        other = create_recipe(get_user_model().objects.create_user(email='o@example.com', password='pass12345'))
+
+        res = self.client.post(BULK_CLONE_URL, {'ids': [recipe.id, other.id]}, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn(str(other.id), res.data['ids'][0])
+        self.assertEqual(Recipe.objects.count(), 2)
+
+    def test_bulk_clone_many(self):
+        recipes = [create_recipe(self.user, f'Recipe {i}', tags=['Vegan'], ingredients=['Salt']) for i in range(300)]
+
+        res = self.client.post(BULK_CLONE_URL, {'ids': [r.id for r in recipes]}, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Recipe.tags.through.objects.count(), 600)
+        self.assertEqual(Recipe.ingredients.through.objects.count(), 600)
+
+
+class BulkEditTests(QueryBudgetMixin, TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(email='bulk@example.com', password='pass12345')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_bulk_delete_by_ids(self):
+        recipes = [create_recipe(self.user, tags=['Vegan'], ingredients=['Salt']) for _ in range(3)]
+
+        res = self.client.post(BULK_DELETE_URL, {'ids': [recipes[0].id, recipes[1].id]}, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, {'deleted': 2})
+        self.assertEqual(list(Recipe.objects.all()), [recipes[2]])
+        self.assertEqual(Recipe.tags.through.objects.count(), 1)
+        self.assertEqual(
+            set(Change.objects.filter(deleted=True).values_list('object_id', flat=True)),
+            {recipes[0].id, recipes[1].id},
+        )
+
+    def test_bulk_delete_by_tag_only_deletes_own_recipes(self):
+        vegan = create_recipe(self.user, tags=['Vegan'])
+        create_recipe(self.user, tags=['Meat'])
+        other = get_user_model().objects.create_user(email='other@example.com', password='pass12345')
+        create_recipe(other, tags=['Vegan'])
+
+        tag = Tag.objects.get(user=self.user, name='Vegan')
+        res = self.client.post(BULK_DELETE_URL, {'tags': [tag.id]}, format='json')
+
+        self.assertEqual(res.data, {'deleted': 1})
+        self.assertFalse(Recipe.objects.filter(id=vegan.id).exists())
+        self.assertEqual(Recipe.objects.count(), 2)
+
+    def test_bulk_delete_needs_a_selection(self):
+        create_recipe(self.user)
+
+        res = self.client.post(BULK_DELETE_URL, {}, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Recipe.objects.count(), 1)
+
+    def test_bulk_tags_add_and_remove(self):
+        recipes = [create_recipe(self.user, tags=['Old']) for _ in range(3)]
+        new = Tag.objects.create(user=self.user, name='New')
+        old = Tag.objects.get(name='Old')
+        recipes[0].tags.add(new)
+        Change.objects.all().delete()
+
+        res = self.client.post(
+            BULK_TAGS_URL, {'ids': [r.id for r in recipes], 'add': [new.id], 'remove': [old.id]}, format='json',
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, {'added': 2, 'removed': 3})
+        for recipe in recipes:
+            self.assertEqual(list(recipe.tags.all()), [new])
+        self.assertEqual(Change.objects.filter(kind=Change.RECIPE).count(), 3)
+
+    def test_bulk_ingredients_rejects_other_users_ingredient(self):
+        recipe = create_recipe(self.user)
+        other = get_user_model().objects.create_user(email='other@example.com', password='pass12345')
+        foreign = Ingredient.objects.create(user=other, name='Salt')
+
+        res = self.client.post(BULK_INGREDIENTS_URL, {'ids': [recipe.id], 'add': [foreign.id]}, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(recipe.ingredients.exists())
+
+    def test_merge_ingredients(self):
+        only_source = create_recipe(self.user, ingredients=['Chili'])
+        both = create_recipe(self.user, ingredients=['Chili', 'Chilli'])
+        only_target = create_recipe(self.user, ingredients=['Chilli'])
+        source = Ingredient.objects.get(name='Chili')
+        target = Ingredient.objects.get(name='Chilli')
+
+        res = self.client.post(MERGE_INGREDIENTS_URL, {'source': source.id, 'target': target.id}, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, {'recipes': 2})
+        self.assertFalse(Ingredient.objects.filter(id=source.id).exists())
+        for recipe in (only_source, both, only_target):
+            self.assertEqual(list(recipe.ingredients.all()), [target])
+
+    def test_merge_ingredient_into_itself(self):
+        create_recipe(self.user, ingredients=['Salt'])
+        salt = Ingredient.objects.get(name='Salt')
+
+        res = self.client.post(MERGE_INGREDIENTS_URL, {'source': salt.id, 'target': salt.id}, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
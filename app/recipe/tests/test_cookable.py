@@ -0,0 +1,99 @@
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag, Ingredient
+from core.tests.query_budget import QueryBudgetMixin
+
+COOKABLE_URL = reverse('recipe:recipe-cookable')
+
+
+class CookableTests(QueryBudgetMixin, TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(email='pantry@example.com', password='pass12345')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.ingredients = {
+            name: Ingredient.objects.create(user=self.user, name=name)
+            for name in ['Eggs', 'Flour', 'Milk', 'Sugar', 'Butter']
+        }
+
+    def create_recipe(self, title, ingredients, user=None, price='5.00'):
+        recipe = Recipe.objects.create(
+            user=user or self.user, title=title, time_minutes=10, price=Decimal(price), description='Description.',
+        )
+        recipe.ingredients.add(*[self.ingredients[name] for name in ingredients])
+        return recipe
+
+    def pantry(self, *names):
+        return ','.join(str(self.ingredients[name].id) for name in names)
+
+    def cookable(self, **params):
+        res = self.client.get(COOKABLE_URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return res.data
+
+    def test_only_fully_covered_recipes_by_default(self):
+        self.create_recipe('Pancakes', ['Eggs', 'Flour', 'Milk'])
+        self.create_recipe('Omelette', ['Eggs'])
+        self.create_recipe('Cake', ['Eggs', 'Flour', 'Sugar', 'Butter'])
+        self.create_recipe('Water', [])
+
+        data = self.cookable(pantry=self.pantry('Eggs', 'Flour', 'Milk'))
+
+        self.assertEqual([r['title'] for r in data], ['Omelette', 'Pancakes'])
+        self.assertEqual({(r['coverage'], r['missing']) for r in data}, {(1.0, 0)})
+
+    def test_ranked_by_coverage_with_missing_allowed(self):
+        self.create_recipe('Pancakes', ['Eggs', 'Flour', 'Milk'])
+        self.create_recipe('Cake', ['Eggs', 'Flour', 'Sugar', 'Butter'])
+        self.create_recipe('Custard', ['Eggs', 'Milk', 'Sugar'])
+        self.create_recipe('Shortbread', ['Flour', 'Sugar', 'Butter'])
+        self.create_recipe('Meringue', ['Sugar'])
+
+        data = self.cookable(pantry=self.pantry('Eggs', 'Milk', 'Flour'), missing=2)
+
+        self.assertEqual(
+            [(r['title'], r['missing']) for r in data],
+            [('Pancakes', 0), ('Custard', 1), ('Cake', 2), ('Shortbread', 2), ('Meringue', 1)],
+        )
+        self.assertAlmostEqual(data[1]['coverage'], 2 / 3)
+
+    def test_honours_list_filters_and_limit(self):
+        cheap = self.create_recipe('Omelette', ['Eggs'], price='2.00')
+        cheap.tags.add(Tag.objects.create(user=self.user, name='Breakfast'))
+        self.create_recipe('Fancy omelette', ['Eggs'], price='20.00')
+        self.create_recipe('Scrambled eggs', ['Eggs', 'Milk'], price='3.00')
+
+        data = self.cookable(pantry=self.pantry('Eggs', 'Milk'), price_max='10.00', limit=1)
+        self.assertEqual(len(data), 1)
+
+        tag = Tag.objects.get(name='Breakfast')
+        data = self.cookable(pantry=self.pantry('Eggs'), tags=f'{tag.id}')
+        self.assertEqual([r['title'] for r in data], ['Omelette'])
+
+    def test_other_users_recipes_are_excluded(self):
+        other = get_user_model().objects.create_user(email='other@example.com', password='pass12345')
+        self.create_recipe('Omelette', ['Eggs'], user=other)
+
+        self.assertEqual(self.cookable(pantry=self.pantry('Eggs')), [])
+
+    def test_sparse_fields(self):
+        self.create_recipe('Omelette', ['Eggs'])
+
+        data = self.cookable(pantry=self.pantry('Eggs'), fields='title,coverage')
+
+        self.assertEqual(data, [{'title': 'Omelette', 'coverage': 1.0}])
+
+    def test_invalid_parameters(self):
+        for params in (
+            {}, {'pantry': 'eggs'}, {'pantry': '1', 'missing': -1}, {'pantry': '1', 'limit': 0},
+            {'pantry': '1', 'tags': 'x'},
+        ):
+            res = self.client.get(COOKABLE_URL, params)
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST, params)
@@ -0,0 +1,177 @@
+import io
+import os
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import DatabaseError
+from django.db.models import QuerySet
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Job, IdempotencyKey
+from core.tests.query_budget import QueryBudgetMixin
+
+RECIPE_URL = reverse('recipe:recipe-list')
+PAYLOAD = {'title': 'Soup', 'time_minutes': 20, 'price': '4.50', 'description': 'Hot.', 'link': 'https://example.com/soup'}
+
+
+def image_upload_url(recipe_id):
+    return reverse('recipe:recipe-upload-image', args=[recipe_id])
+
+
+def jpeg():
+    image = io.BytesIO()
+    Image.new('RGB', (10, 10)).save(image, format='JPEG')
+    image.name = 'soup.jpg'
+    image.seek(0)
+    return image
+
+
+class IdempotencyKeyTests(QueryBudgetMixin, TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(email='retry@example.com', password='pass12345')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def post(self, key, payload=PAYLOAD, url=RECIPE_URL, **kwargs):
+        return self.client.post(url, payload, format=kwargs.pop('format', 'json'), HTTP_IDEMPOTENCY_KEY=key, **kwargs)
+
+    def test_retry_replays_the_response(self):
+        first = self.post('create-soup')
+        retry = self.post('create-soup')
+
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(retry.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(retry.data, first.data)
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertFalse(first.has_header('Idempotent-Replayed'))
+        self.assertEqual(Recipe.objects.count(), 1)
+
+    def test_requests_without_a_key_are_not_deduplicated(self):
+        self.client.post(RECIPE_URL, PAYLOAD, format='json')
+        self.client.post(RECIPE_URL, PAYLOAD, format='json')
+
+        self.assertEqual(Recipe.objects.count(), 2)
+
+    def test_reusing_a_key_for_another_request_is_rejected(self):
+        self.post('create-soup')
+        res = self.post('create-soup', dict(PAYLOAD, title='Stew'))
+
+        self.assertEqual(res.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+        self.assertEqual(Recipe.objects.count(), 1)
+
+    def test_retry_while_the_first_request_runs_conflicts(self):
+        self.post('create-soup')
+        IdempotencyKey.objects.update(status_code=None, response=None)
+
+        res = self.post('create-soup')
+
+        self.assertEqual(res.status_code, status.HTTP_409_CONFLICT)
+
+    def test_retry_takes_over_a_key_held_too_long(self):
+        self.post('create-soup')
+        IdempotencyKey.objects.update(
+            status_code=None, response=None,
+            locked_at=timezone.now() - timedelta(seconds=settings.IDEMPOTENCY_LOCK_TIMEOUT + 1),
+        )
+
+        res = self.post('create-soup')
+        retry = self.post('create-soup')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertNotIn('Idempotent-Replayed', res)
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(retry.data, res.data)
+        self.assertEqual(Recipe.objects.count(), 2)
+
+    def test_stale_key_is_not_taken_over_by_another_request(self):
+        self.post('create-soup')
+        IdempotencyKey.objects.update(status_code=None, response=None, locked_at=None)
+
+        res = self.post('create-soup', dict(PAYLOAD, title='Stew'))
+
+        self.assertEqual(res.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+
+    def test_keys_are_per_user(self):
+        other = get_user_model().objects.create_user(email='other@example.com', password='pass12345')
+        self.post('create-soup')
+        self.client.force_authenticate(other)
+
+        res = self.post('create-soup')
+
+        self.assertNotIn('Idempotent-Replayed', res)
+        self.assertEqual(Recipe.objects.filter(user=other).count(), 1)
+
+    def test_expired_keys_run_again_and_are_purged(self):
+        self.post('create-soup')
+        self.post('old-key', dict(PAYLOAD, title='Stew'))
+        IdempotencyKey.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+
+        res = self.post('create-soup')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Recipe.objects.count(), 3)
+        self.assertEqual(list(IdempotencyKey.objects.values_list('key', flat=True)), ['create-soup'])
+
+    def test_failed_requests_forget_their_key(self):
+        res = self.post('create-soup', {'title': 'Soup'})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(IdempotencyKey.objects.exists())
+
+        res = self.post('create-soup')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+    def test_writes_roll_back_when_the_response_cannot_be_stored(self):
+        update = QuerySet.update
+
+        def failing_update(queryset, **kwargs):
+            if queryset.model is IdempotencyKey and 'response' in kwargs:
+                raise DatabaseError('storing the response failed')
+            return update(queryset, **kwargs)
+
+        with mock.patch.object(QuerySet, 'update', failing_update), self.assertRaises(DatabaseError):
+            self.post('create-soup')
+
+        self.assertFalse(Recipe.objects.exists())
+        self.assertFalse(Job.objects.exists())
+        self.assertFalse(IdempotencyKey.objects.exists())
+
+    def test_patch_replay(self):
+        recipe = Recipe.objects.create(user=self.user, title='Soup', time_minutes=5, price=Decimal('5.50'))
+        url = reverse('recipe:recipe-detail', args=[recipe.id])
+        self.client.patch(url, {'title': 'Stew'}, format='json', HTTP_IDEMPOTENCY_KEY='rename')
+        Recipe.objects.filter(id=recipe.id).update(title='Renamed elsewhere')
+
+        res = self.client.patch(url, {'title': 'Stew'}, format='json', HTTP_IDEMPOTENCY_KEY='rename')
+
+        self.assertEqual(res.data['title'], 'Stew')
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.title, 'Renamed elsewhere')
+
+    def test_image_upload_replay_does_not_store_or_process_again(self):
+        recipe = Recipe.objects.create(user=self.user, title='Soup', time_minutes=5, price=Decimal('5.50'))
+        url = image_upload_url(recipe.id)
+        uploads = os.path.join(settings.MEDIA_ROOT, 'uploads', 'recipe')
+        before = set(os.listdir(uploads)) if os.path.isdir(uploads) else set()
+
+        first = self.post('upload', {'image': jpeg()}, url=url, format='multipart')
+        retry = self.post('upload', {'image': jpeg()}, url=url, format='multipart')
+        recipe.refresh_from_db()
+        self.addCleanup(recipe.image.delete)
+
+        self.assertEqual(retry.data, first.data)
+        self.assertEqual(Job.objects.filter(name='recipe.tasks.optimize_recipe_image').count(), 1)
+        self.assertEqual(set(os.listdir(uploads)) - before, {os.path.basename(recipe.image.name)})
+
+    def test_key_too_long(self):
+        res = self.post('k' * 256)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
@@ -9,6 +9,7 @@ from core.models import Ingredient, Recipe
 from decimal import Decimal
 
 from recipe.serializers import IngredientSerializer
+from core.tests.query_budget import QueryBudgetMixin
 
 
 INGREDIENTS_URL = reverse('recipe:ingredient-list')
@@ -18,7 +19,7 @@ def create_user(email='user@example.com', password='testddddd123'):
     return get_user_model().objects.create_user(email=email, password=password)
 
 
-class PublicIngredientsApiTests(TestCase):
+class PublicIngredientsApiTests(QueryBudgetMixin, TestCase):
     def setUp(self):
         self.client = APIClient()
 
@@ -28,7 +29,7 @@ class PublicIngredientsApiTests(TestCase):
         self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
 
 
-class PrivateIngredientsApiTests(TestCase):
+class PrivateIngredientsApiTests(QueryBudgetMixin, TestCase):
     def setUp(self):
         self.user = create_user()
         self.client = APIClient()
@@ -67,6 +68,18 @@ class PrivateIngredientsApiTests(TestCase):
         self.assertEqual(res.status_code, status.HTTP_200_OK)
         self.assertEqual(ing.name, 'Kale')
 
+    def test_ingredient_rename_to_existing_name(self):
+        Ingredient.objects.create(user=self.user, name='Kale')
+        ing = Ingredient.objects.create(user=self.user, name='Kal')
+
+        url = reverse('recipe:ingredient-detail', args=[ing.id])
+        res = self.client.patch(url, { 'name': 'Kale' })
+
+        ing.refresh_from_db()
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('name', res.data)
+        self.assertEqual(ing.name, 'Kal')
+
     def test_ingredient_delete(self):
         ing = Ingredient.objects.create(user=self.user, name='Kal')
 
@@ -1,12 +1,20 @@
+import base64
+import json
+
 from django.test import TestCase
 from rest_framework import status
 from django.urls import reverse
 from rest_framework.test import APIClient
 from django.contrib.auth import get_user_model
 
-from core.models import Recipe, Tag, Ingredient
-from recipe.serializers import RecipeSerializer, RecipeDetailSerializer
+from core import jobs
+from core.models import Recipe, Tag, Ingredient, Job
+from recipe.serializers import RecipeSerializer, RecipeDetailSerializer, RecipeFilterSerializer
+from core.tests.query_budget import QueryBudgetMixin
 from decimal import Decimal
+from urllib.parse import urlsplit
+
+from django.http import QueryDict
 
 import tempfile, os
 from PIL import Image
@@ -24,7 +32,7 @@ def create_recipe(user, title='Sample title'):
                                  description = 'New description.',)
  
 
-class RecipeTests(TestCase):
+class RecipeTests(QueryBudgetMixin, TestCase):
     def setUp(self):
         self.user = get_user_model().objects.create_user(email='test@email.com', password='pass123', name='Test Name')
         self.recipe = Recipe.objects.create(user = self.user,
@@ -40,7 +48,7 @@ class RecipeTests(TestCase):
         self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
 
 
-class PrivateRecipeTests(TestCase):
+class PrivateRecipeTests(QueryBudgetMixin, TestCase):
     def setUp(self):
         self.user = get_user_model().objects.create_user(email='test2@email.com', password='pass123', name='Test Name')
         self.recipe = Recipe.objects.create(user = self.user,
@@ -294,7 +302,128 @@ class PrivateRecipeTests(TestCase):
         self.assertIn(s2.data, res.data)
         self.assertNotIn(s3.data, res.data)
 
-class ImageUploadTests(TestCase):
+class SparseFieldsetTests(QueryBudgetMixin, TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(email='sparse@email.com', password='pass123')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.recipe = create_recipe(user=self.user)
+        self.recipe.tags.add(Tag.objects.create(user=self.user, name='Vegan'))
+
+    def test_list_only_returns_requested_fields(self):
+        res = self.client.get(RECIPE_URL, {'fields': 'id,title'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, [{'id': self.recipe.id, 'title': self.recipe.title}])
+
+    def test_detail_excludes_fields(self):
+        url = reverse('recipe:recipe-detail', args=[self.recipe.id])
+        res = self.client.get(url, {'exclude': 'description,ingredients'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotIn('description', res.data)
+        self.assertNotIn('ingredients', res.data)
+        self.assertEqual(res.data['tags'], [{'name': 'Vegan'}])
+
+    def test_omitted_relations_are_not_fetched(self):
+        with self.assertNumQueries(1):
+            res = self.client.get(RECIPE_URL, {'fields': 'id,title'})
+
+        self.assertEqual(len(res.data), 1)
+
+    def test_head_is_trimmed_like_get(self):
+        with self.assertNumQueries(1):
+            res = self.client.head(RECIPE_URL, {'fields': 'id,title'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_unknown_fields_are_ignored(self):
+        res = self.client.get(RECIPE_URL, {'fields': 'title,secret'})
+
+        self.assertEqual(res.data, [{'title': self.recipe.title}])
+
+    def test_writes_ignore_fields_parameter(self):
+        url = reverse('recipe:recipe-detail', args=[self.recipe.id])
+        res = self.client.patch(f'{url}?fields=id', {'title': 'Renamed'}, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['title'], 'Renamed')
+        self.assertIn('price', res.data)
+
+
+class RangeFilterAndOrderingTests(QueryBudgetMixin, TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(email='range@email.com', password='pass123')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.recipes = {
+            title: Recipe.objects.create(user=self.user, title=title, time_minutes=time_minutes, price=Decimal(price))
+            for title, time_minutes, price in [
+                ('Toast', 5, '1.50'), ('Salad', 15, '6.00'), ('Stew', 90, '12.00'),
+                ('Curry', 30, '9.50'), ('Soup', None, '4.00'),
+            ]
+        }
+
+    def titles(self, params):
+        res = self.client.get(RECIPE_URL, {'fields': 'title', **params})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        data = res.data['results'] if isinstance(res.data, dict) else res.data
+        return [recipe['title'] for recipe in data]
+
+    def test_filter_by_price_and_time(self):
+        self.assertEqual(self.titles({'price_min': '4.00', 'price_max': '9.50'}), ['Soup', 'Curry', 'Salad'])
+        self.assertEqual(self.titles({'time_max': 30, 'price_max': '9.00'}), ['Salad', 'Toast'])
+
+    def test_ordering(self):
+        self.assertEqual(self.titles({'ordering': 'price'}), ['Toast', 'Soup', 'Salad', 'Curry', 'Stew'])
+        self.assertEqual(self.titles({'ordering': '-time_minutes'}), ['Soup', 'Stew', 'Curry', 'Salad', 'Toast'])
+        self.assertEqual(self.titles({'ordering': 'time_minutes'}), ['Toast', 'Salad', 'Curry', 'Stew', 'Soup'])
+
+    def test_invalid_parameters(self):
+        for params in (
+            {'ordering': 'description'}, {'price_min': 'cheap'}, {'time_max': -1}, {'cursor': '!!!'},
+            {'tags': 'x'}, {'ingredients': '1,,2'},
+        ):
+            res = self.client.get(RECIPE_URL, params)
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST, params)
+
+    def test_forged_cursor_for_numeric_ordering(self):
+        cursor = base64.urlsafe_b64encode(json.dumps(['abc', 1]).encode()).decode()
+        for ordering in ('price', '-price', 'time_minutes', '-time_minutes', 'id'):
+            res = self.client.get(RECIPE_URL, {'ordering': ordering, 'cursor': cursor})
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST, ordering)
+            self.assertIn('cursor', res.data)
+
+    def test_list_is_not_paginated_by_default(self):
+        res = self.client.get(RECIPE_URL)
+
+        self.assertEqual(len(res.data), 5)
+
+    def test_keyset_pages_follow_the_ordering(self):
+        for ordering in RecipeFilterSerializer.ORDERINGS:
+            expected = self.titles({'ordering': ordering})
+            seen, params = [], {'ordering': ordering, 'limit': 2}
+            while True:
+                res = self.client.get(RECIPE_URL, {'fields': 'title', **params})
+                seen += [recipe['title'] for recipe in res.data['results']]
+                if res.data['next'] is None:
+                    break
+                params = QueryDict(urlsplit(res.data['next']).query)
+
+            self.assertEqual(seen, expected, ordering)
+
+    def test_pages_keep_filters(self):
+        first = self.client.get(RECIPE_URL, {'price_max': '10.00', 'ordering': '-price', 'limit': 2})
+        second = self.client.get(first.data['next'])
+
+        self.assertEqual([r['title'] for r in first.data['results']], ['Curry', 'Salad'])
+        self.assertEqual([r['title'] for r in second.data['results']], ['Soup', 'Toast'])
+        self.assertIsNone(second.data['next'])
+
+
+class ImageUploadTests(QueryBudgetMixin, TestCase):
  
     def setUp(self):
         self.client = APIClient()
@@ -326,6 +455,20 @@ class ImageUploadTests(TestCase):
         self.assertIn('image', res.data)
         self.assertTrue(os.path.exists(self.recipe.image.path))
 
+    def test_uploaded_image_is_downscaled_in_background(self):
+        url = image_upload_url(self.recipe.id)
+        with tempfile.NamedTemporaryFile(suffix='.jpg') as image_file:
+            Image.new('RGB', (300, 200)).save(image_file, format='JPEG')
+            image_file.seek(0)
+            with self.settings(RECIPE_IMAGE_MAX_SIZE=100):
+                self.client.post(url, {'image': image_file}, format='multipart')
+                self.assertEqual(Job.objects.filter(name='recipe.tasks.optimize_recipe_image').count(), 1)
+                jobs.run_pending()
+
+        self.recipe.refresh_from_db()
+        with Image.open(self.recipe.image.path) as img:
+            self.assertEqual(img.size, (100, 67))
+
     def test_upload_image_bad_request(self):
         url = image_upload_url(self.recipe.id)
         payload = {'image': 'notanimage'}
@@ -0,0 +1,136 @@
+from decimal import Decimal
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import jobs
+from core.models import Recipe, Tag, Ingredient, Job, RecipeSimilarity
+from core.tests.query_budget import QueryBudgetMixin
+from recipe import similarity
+
+
+def similar_url(recipe_id):
+    return reverse('recipe:recipe-similar', args=[recipe_id])
+
+
+class SimilarRecipeTests(QueryBudgetMixin, TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(email='similar@example.com', password='pass12345')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def create_recipe(self, title, tags=(), ingredients=(), user=None):
+        user = user or self.user
+        recipe = Recipe.objects.create(
+            user=user, title=title, time_minutes=10, price=Decimal('5.00'), description='Description.',
+        )
+        for name in tags:
+            recipe.tags.add(Tag.objects.get_or_create(user=user, name=name)[0])
+        for name in ingredients:
+            recipe.ingredients.add(Ingredient.objects.get_or_create(user=user, name=name)[0])
+        return recipe
+
+    def similar(self, recipe):
+        return [(r.similar.title, round(r.score, 2)) for r in recipe.similarities.order_by('-score', 'similar_id')]
+
+    def test_lists_are_ranked_by_jaccard_index(self):
+        pasta = self.create_recipe('Pasta', tags=['Dinner'], ingredients=['Tomato', 'Basil', 'Pasta'])
+        self.create_recipe('Pizza', tags=['Dinner'], ingredients=['Tomato', 'Basil', 'Dough'])
+        self.create_recipe('Salad', tags=['Lunch'], ingredients=['Tomato'])
+        self.create_recipe('Cake', tags=['Dessert'], ingredients=['Flour'])
+
+        similarity.refresh(self.user.id)
+
+        self.assertEqual(self.similar(pasta), [('Pizza', 0.6), ('Salad', 0.2)])
+
+    @override_settings(SIMILAR_RECIPES=1)
+    def test_lists_are_cut_to_the_configured_length(self):
+        pasta = self.create_recipe('Pasta', ingredients=['Tomato', 'Basil'])
+        self.create_recipe('Pizza', ingredients=['Tomato', 'Basil'])
+        self.create_recipe('Salad', ingredients=['Tomato'])
+
+        similarity.refresh(self.user.id)
+
+        self.assertEqual(self.similar(pasta), [('Pizza', 1.0)])
+
+    def test_refresh_only_rebuilds_affected_lists(self):
+        pasta = self.create_recipe('Pasta', ingredients=['Tomato', 'Basil'])
+        self.create_recipe('Salad', ingredients=['Tomato'])
+        cake = self.create_recipe('Cake', ingredients=['Flour'])
+        self.create_recipe('Muffin', ingredients=['Flour', 'Sugar'])
+        similarity.refresh(self.user.id)
+
+        soup = self.create_recipe('Soup', ingredients=['Tomato', 'Basil'])
+
+        self.assertEqual(similarity.refresh(self.user.id), 3)
+        self.assertEqual(self.similar(pasta), [('Soup', 1.0), ('Salad', 0.5)])
+        self.assertEqual(self.similar(soup), [('Pasta', 1.0), ('Salad', 0.5)])
+        self.assertEqual(self.similar(cake), [('Muffin', 0.5)])
+        self.assertEqual(similarity.refresh(self.user.id), 0)
+
+    def test_changed_and_deleted_recipes_leave_lists(self):
+        pasta = self.create_recipe('Pasta', ingredients=['Tomato', 'Basil'])
+        salad = self.create_recipe('Salad', ingredients=['Tomato'])
+        pizza = self.create_recipe('Pizza', ingredients=['Basil'])
+        similarity.refresh(self.user.id)
+
+        salad.ingredients.set([Ingredient.objects.create(user=self.user, name='Lettuce')])
+        pizza.delete()
+        similarity.refresh(self.user.id)
+
+        self.assertEqual(self.similar(pasta), [])
+        self.assertEqual(self.similar(salad), [])
+        self.assertFalse(RecipeSimilarity.objects.exists())
+
+    def test_other_users_recipes_are_never_similar(self):
+        other = get_user_model().objects.create_user(email='other@example.com', password='pass12345')
+        pasta = self.create_recipe('Pasta', ingredients=['Tomato'])
+        self.create_recipe('Pasta', ingredients=['Tomato'], user=other)
+
+        similarity.refresh(self.user.id)
+        similarity.refresh(other.id)
+
+        self.assertEqual(self.similar(pasta), [])
+
+    def test_action_serves_lists_and_schedules_one_refresh(self):
+        pasta = self.create_recipe('Pasta', ingredients=['Tomato', 'Basil'])
+        self.create_recipe('Pizza', ingredients=['Tomato', 'Basil', 'Dough'])
+
+        res = self.client.get(similar_url(pasta.id))
+        self.client.get(similar_url(pasta.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, [])
+        self.assertEqual(Job.objects.filter(name=similarity.REFRESH_TASK).count(), 1)
+
+        jobs.run_pending()
+        res = self.client.get(similar_url(pasta.id), {'fields': 'title,score'})
+
+        self.assertEqual(res.data, [{'title': 'Pizza', 'score': 2 / 3}])
+        self.assertFalse(Job.objects.exists())
+
+    def test_action_requires_own_recipe(self):
+        other = get_user_model().objects.create_user(email='other@example.com', password='pass12345')
+        recipe = self.create_recipe('Pasta', user=other)
+
+        res = self.client.get(similar_url(recipe.id))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_command(self):
+        pasta = self.create_recipe('Pasta', ingredients=['Tomato'])
+        self.create_recipe('Salad', ingredients=['Tomato'])
+        out = StringIO()
+
+        call_command('build_similar_recipes', stdout=out)
+        call_command('build_similar_recipes', '--user', str(self.user.id), '--full', stdout=out)
+
+        self.assertEqual(out.getvalue().splitlines(), [
+            f'User {self.user.id}: rebuilt 2 lists', f'User {self.user.id}: rebuilt 2 lists',
+        ])
+        self.assertEqual(self.similar(pasta), [('Salad', 1.0)])
@@ -0,0 +1,113 @@
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag, Ingredient
+from core.tests.query_budget import QueryBudgetMixin
+from recipe.stats import _interpolate
+
+STATS_URL = reverse('recipe:recipe-stats')
+
+
+def create_recipe(user, price, time_minutes, tags=(), ingredients=()):
+    recipe = Recipe.objects.create(
+        user=user, title='Sample title', time_minutes=time_minutes, price=Decimal(price), description='Description.',
+    )
+    for name in tags:
+        recipe.tags.add(Tag.objects.get_or_create(user=user, name=name)[0])
+    for name in ingredients:
+        recipe.ingredients.add(Ingredient.objects.get_or_create(user=user, name=name)[0])
+    return recipe
+
+
+class InterpolateTests(TestCase):
+    def test_matches_percentile_cont(self):
+        self.assertEqual(_interpolate([1, 2, 3, 4], 0.5), 2.5)
+        self.assertAlmostEqual(_interpolate([10, 20, 30, 40, 50], 0.9), 46.0)
+        self.assertEqual(_interpolate([7], 0.9), 7.0)
+        self.assertIsNone(_interpolate([], 0.5))
+
+
+class RecipeStatsTests(QueryBudgetMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(email='stats@example.com', password='pass12345')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def stats(self, **params):
+        res = self.client.get(STATS_URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return res.data
+
+    def test_summarises_price_and_time(self):
+        create_recipe(self.user, '2.00', 10)
+        create_recipe(self.user, '4.00', 20)
+        create_recipe(self.user, '9.00', None)
+
+        data = self.stats()
+
+        self.assertEqual(data['count'], 3)
+        self.assertEqual(data['price'], {'avg': '5.00', 'min': '2.00', 'max': '9.00', 'p50': '4.00', 'p90': '8.00'})
+        self.assertEqual(data['time_minutes'], {'avg': 15.0, 'min': 10, 'max': 20, 'p50': 15.0, 'p90': 19.0})
+
+    def test_no_recipes(self):
+        data = self.stats()
+
+        self.assertEqual(data['count'], 0)
+        self.assertIsNone(data['price']['avg'])
+        self.assertIsNone(data['time_minutes']['p50'])
+        self.assertEqual(data['tags'], [])
+
+    def test_top_tags_and_ingredients(self):
+        create_recipe(self.user, '1.00', 5, tags=['Dinner', 'Vegan'], ingredients=['Salt'])
+        create_recipe(self.user, '1.00', 5, tags=['Dinner'], ingredients=['Salt', 'Kale'])
+        create_recipe(self.user, '1.00', 5, tags=['Lunch'])
+
+        data = self.stats(top=2)
+
+        self.assertEqual([(t['name'], t['recipes']) for t in data['tags']], [('Dinner', 2), ('Lunch', 1)])
+        self.assertEqual([(i['name'], i['recipes']) for i in data['ingredients']], [('Salt', 2), ('Kale', 1)])
+
+    def test_honours_list_filters(self):
+        vegan = create_recipe(self.user, '3.00', 5, tags=['Vegan', 'Dinner'], ingredients=['Kale'])
+        create_recipe(self.user, '7.00', 5, tags=['Dinner'])
+        dinner = Tag.objects.get(name='Dinner')
+
+        data = self.stats(tags=f'{vegan.tags.get(name="Vegan").id},{dinner.id}')
+        self.assertEqual(data['count'], 2)
+        self.assertEqual(data['price']['avg'], '5.00')
+
+        data = self.stats(ingredients=str(Ingredient.objects.get(name='Kale').id))
+        self.assertEqual(data['count'], 1)
+        self.assertEqual([t['name'] for t in data['tags']], ['Dinner', 'Vegan'])
+
+    def test_other_users_recipes_are_excluded(self):
+        other = get_user_model().objects.create_user(email='other@example.com', password='pass12345')
+        create_recipe(other, '1.00', 5, tags=['Vegan'])
+
+        data = self.stats()
+
+        self.assertEqual(data['count'], 0)
+        self.assertEqual(data['tags'], [])
+
+    def test_cached_until_next_change(self):
+        recipe = create_recipe(self.user, '2.00', 10)
+        self.stats()
+
+        with self.assertNumQueries(1):
+            self.assertEqual(self.stats()['count'], 1)
+
+        self.client.patch(reverse('recipe:recipe-detail', args=[recipe.id]), {'price': '6.00'})
+        self.assertEqual(self.stats()['price']['max'], '6.00')
+
+    def test_invalid_parameters(self):
+        for params in ({'top': 'many'}, {'tags': 'x'}, {'ingredients': 'salt'}):
+            res = self.client.get(STATS_URL, params)
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST, params)
@@ -0,0 +1,156 @@
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag, Ingredient, Change
+from core.tests.query_budget import QueryBudgetMixin
+
+SYNC_URL = reverse('recipe:sync')
+RECIPE_URL = reverse('recipe:recipe-list')
+
+
+def create_recipe(user, title='Sample title'):
+    return Recipe.objects.create(user=user, title=title, time_minutes=5, price=Decimal('5.50'))
+
+
+class PublicSyncTests(QueryBudgetMixin, TestCase):
+    def test_auth_required(self):
+        res = APIClient().get(SYNC_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class PrivateSyncTests(QueryBudgetMixin, TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(email='sync@example.com', password='pass12345')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def sync(self, cursor=None, **params):
+        if cursor:
+            params['cursor'] = cursor
+        res = self.client.get(SYNC_URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return res.data
+
+    def test_initial_sync_returns_everything(self):
+        recipe = create_recipe(self.user)
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        recipe.tags.add(tag)
+
+        data = self.sync()
+
+        self.assertEqual([r['id'] for r in data['recipes']['upserts']], [recipe.id])
+        self.assertEqual(data['recipes']['upserts'][0]['tags'], [{'name': 'Vegan'}])
+        self.assertEqual(data['tags']['upserts'], [{'id': tag.id, 'name': 'Vegan'}])
+        self.assertFalse(data['has_more'])
+
+    def test_sync_only_returns_changes_since_cursor(self):
+        create_recipe(self.user, 'Old')
+        cursor = self.sync()['cursor']
+
+        new = create_recipe(self.user, 'New')
+        data = self.sync(cursor)
+
+        self.assertEqual([r['title'] for r in data['recipes']['upserts']], ['New'])
+        self.assertEqual(data['recipes']['upserts'][0]['id'], new.id)
+        self.assertEqual(self.sync(data['cursor'])['recipes'], {'upserts': [], 'deletes': []})
+
+    def test_deletes_are_returned_as_tombstones(self):
+        recipe = create_recipe(self.user)
+        ingredient = Ingredient.objects.create(user=self.user, name='Salt')
+        cursor = self.sync()['cursor']
+
+        self.client.delete(reverse('recipe:recipe-detail', args=[recipe.id]))
+        self.client.delete(reverse('recipe:ingredient-detail', args=[ingredient.id]))
+        data = self.sync(cursor)
+
+        self.assertEqual(data['recipes'], {'upserts': [], 'deletes': [recipe.id]})
+        self.assertEqual(data['ingredients'], {'upserts': [], 'deletes': [ingredient.id]})
+
+    def test_retagging_a_recipe_is_a_change(self):
+        recipe = create_recipe(self.user)
+        cursor = self.sync()['cursor']
+
+        url = reverse('recipe:recipe-detail', args=[recipe.id])
+        self.client.patch(url, {'tags': [{'name': 'Dinner'}]}, format='json')
+        data = self.sync(cursor)
+
+        self.assertEqual(data['recipes']['upserts'][0]['tags'], [{'name': 'Dinner'}])
+        self.assertEqual([t['name'] for t in data['tags']['upserts']], ['Dinner'])
+
+    def test_deleting_a_tag_changes_its_recipes(self):
+        recipe = create_recipe(self.user)
+        other = create_recipe(self.user, 'Untagged')
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        recipe.tags.add(tag)
+        cursor = self.sync()['cursor']
+
+        self.client.delete(reverse('recipe:tag-detail', args=[tag.id]))
+        data = self.sync(cursor)
+
+        self.assertEqual([r['id'] for r in data['recipes']['upserts']], [recipe.id])
+        self.assertEqual(data['recipes']['upserts'][0]['tags'], [])
+        self.assertNotIn(other.id, [r['id'] for r in data['recipes']['upserts']])
+        self.assertEqual(data['tags'], {'upserts': [], 'deletes': [tag.id]})
+
+    def test_renaming_an_ingredient_changes_its_recipes(self):
+        recipe = create_recipe(self.user)
+        ingredient = Ingredient.objects.create(user=self.user, name='Salt')
+        recipe.ingredients.add(ingredient)
+        cursor = self.sync()['cursor']
+
+        self.client.patch(reverse('recipe:ingredient-detail', args=[ingredient.id]), {'name': 'Sea salt'})
+        data = self.sync(cursor)
+
+        self.assertEqual([r['id'] for r in data['recipes']['upserts']], [recipe.id])
+        self.assertEqual([i['name'] for i in data['recipes']['upserts'][0]['ingredients']], ['Sea salt'])
+
+    def test_changes_are_paginated(self):
+        for i in range(3):
+            create_recipe(self.user, f'r{i}')
+
+        first = self.sync(limit=2)
+        second = self.sync(first['cursor'], limit=2)
+
+        self.assertTrue(first['has_more'])
+        self.assertEqual(len(first['recipes']['upserts']), 2)
+        self.assertFalse(second['has_more'])
+        self.assertEqual(len(second['recipes']['upserts']), 1)
+
+    def test_other_users_changes_are_hidden(self):
+        other = get_user_model().objects.create_user(email='other@example.com', password='pass12345')
+        create_recipe(other)
+
+        self.assertEqual(self.sync()['recipes']['upserts'], [])
+
+    def test_invalid_limit(self):
+        create_recipe(self.user)
+        for limit in (0, -5, 5001, 'all'):
+            res = self.client.get(SYNC_URL, {'limit': limit})
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST, limit)
+            self.assertIn('limit', res.data)
+
+    def test_invalid_cursor(self):
+        res = self.client.get(SYNC_URL, {'cursor': '!!!'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_deleting_user_removes_change_log(self):
+        create_recipe(self.user).tags.add(Tag.objects.create(user=self.user, name='Vegan'))
+
+        self.user.delete()
+
+        self.assertFalse(Change.objects.exists())
+
+    def test_deleting_users_in_bulk_removes_change_log(self):
+        create_recipe(self.user).tags.add(Tag.objects.create(user=self.user, name='Vegan'))
+
+        get_user_model().objects.filter(pk=self.user.pk).delete()
+
+        self.assertFalse(Change.objects.exists())
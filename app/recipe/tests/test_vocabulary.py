@@ -0,0 +1,165 @@
+import threading
+from decimal import Decimal
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import IntegrityError, connection, connections, transaction
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag, Ingredient
+from recipe import vocabulary
+from recipe.vocabulary import VocabularyCache
+
+
+class VocabularyTests(TestCase):
+    def setUp(self):
+        vocabulary.cache.clear()
+        self.user = get_user_model().objects.create_user(email='vocab@example.com', password='pass12345')
+        self.recipe = Recipe.objects.create(user=self.user, title='Soup', price=Decimal('1.00'))
+
+    def test_link_creates_missing_names(self):
+        vocabulary.link(self.recipe, Tag, ['Vegan', 'Dinner', 'Vegan'])
+
+        self.assertEqual(sorted(t.name for t in self.recipe.tags.all()), ['Dinner', 'Vegan'])
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 2)
+
+    def test_known_names_are_linked_with_a_single_query(self):
+        Ingredient.objects.create(user=self.user, name='Salt')
+        Ingredient.objects.create(user=self.user, name='Pepper')
+        vocabulary.cache.get(Ingredient, self.user.id)
+
+        with self.assertNumQueries(1):
+            vocabulary.link(self.recipe, Ingredient, ['Salt', 'Pepper'])
+
+        self.assertEqual(self.recipe.ingredients.count(), 2)
+
+    def test_stale_rename_from_another_worker_is_detected(self):
+        tag = Tag.objects.create(user=self.user, name='Lunch')
+        vocabulary.cache.get(Tag, self.user.id)
+        # A queryset update sends no signals, like a write made by another process.
+        Tag.objects.filter(id=tag.id).update(name='Brunch')
+
+        vocabulary.link(self.recipe, Tag, ['Lunch'])
+
+        linked = list(self.recipe.tags.all())
+        self.assertEqual([t.name for t in linked], ['Lunch'])
+        self.assertNotEqual(linked[0].id, tag.id)
+
+    def test_names_created_by_another_worker_are_not_duplicated(self):
+        vocabulary.cache.get(Tag, self.user.id)
+        Tag.objects.bulk_create([Tag(user=self.user, name='Thai')])
+
+        vocabulary.link(self.recipe, Tag, ['Thai'])
+
+        self.assertEqual(Tag.objects.filter(user=self.user, name='Thai').count(), 1)
+        self.assertEqual(self.recipe.tags.get().name, 'Thai')
+
+    def test_names_are_unique_per_user(self):
+        Tag.objects.create(user=self.user, name='Thai')
+        other = get_user_model().objects.create_user(email='other@example.com', password='pass12345')
+        Tag.objects.create(user=other, name='Thai')
+
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Tag.objects.create(user=self.user, name='Thai')
+
+    def test_saves_and_deletes_invalidate_map(self):
+        tag = Tag.objects.create(user=self.user, name='Old')
+        self.assertEqual(vocabulary.cache.get(Tag, self.user.id), {'Old': tag.id})
+
+        tag.name = 'New'
+        tag.save()
+        self.assertEqual(vocabulary.cache.get(Tag, self.user.id), {'New': tag.id})
+
+        tag.delete()
+        self.assertEqual(vocabulary.cache.get(Tag, self.user.id), {})
+
+    def test_cache_is_bounded_by_users(self):
+        cache = VocabularyCache(max_users=2)
+        for user_id in (1, 2, 3):
+            cache.get(Tag, user_id)
+
+        self.assertEqual(list(cache._maps), [2, 3])
+
+
+class MergeDuplicateNamesCommandTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(email='merge@example.com', password='pass12345')
+
+    def test_merges_names_differing_in_case_into_the_oldest(self):
+        vegan = Tag.objects.create(user=self.user, name='Vegan')
+        lower = Tag.objects.create(user=self.user, name='vegan')
+        upper = Tag.objects.create(user=self.user, name='VEGAN')
+        soup = Recipe.objects.create(user=self.user, title='Soup', price=Decimal('1.00'))
+        soup.tags.add(vegan, lower)
+        stew = Recipe.objects.create(user=self.user, title='Stew', price=Decimal('1.00'))
+        stew.tags.add(upper)
+
+        call_command('merge_duplicate_names', stdout=StringIO())
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 3)
+
+        call_command('merge_duplicate_names', '--ignore-case', stdout=StringIO())
+        self.assertEqual(list(Tag.objects.filter(user=self.user)), [vegan])
+        self.assertEqual(list(soup.tags.all()), [vegan])
+        self.assertEqual(list(stew.tags.all()), [vegan])
+
+    def test_dry_run(self):
+        Ingredient.objects.create(user=self.user, name='Salt')
+        Ingredient.objects.create(user=self.user, name='salt')
+        out = StringIO()
+
+        call_command('merge_duplicate_names', '--ignore-case', '--dry-run', stdout=out)
+
+        self.assertIn("merged 1 ingredients named 'salt'", out.getvalue())
+        self.assertEqual(Ingredient.objects.filter(user=self.user).count(), 2)
+
+
+class ConcurrentCreationTests(TransactionTestCase):
+    """Parallel recipe writes naming the same new tags create each tag once and never deadlock."""
+    threads = 16
+
+    def setUp(self):
+        if connection.vendor != 'postgresql':
+            self.skipTest('Needs concurrent transactions, only checked on PostgreSQL')
+        vocabulary.cache.clear()
+        self.user = get_user_model().objects.create_user(email='race@example.com', password='pass12345')
+
+    def test_parallel_creates(self):
+        start = threading.Barrier(self.threads)
+        errors = []
+
+        def create(i):
+            client = APIClient()
+            client.force_authenticate(self.user)
+            # Each thread orders the names differently to provoke lock waits in both directions.
+            names = [f'tag-{n}' for n in range(5)]
+            payload = {
+                'title': f'Recipe {i}', 'price': '1.00', 'description': 'Racing.', 'link': 'https://example.com',
+                'tags': [{'name': name} for name in (names if i % 2 else names[::-1])],
+                'ingredients': [{'name': 'salt'}, {'name': f'ingredient-{i % 3}'}],
+            }
+            try:
+                start.wait()
+                res = client.post(reverse('recipe:recipe-list'), payload, format='json')
+                if res.status_code != 201:
+                    errors.append(res.status_code)
+            except Exception as exc:
+                errors.append(exc)
+            finally:
+                connections.close_all()
+
+        workers = [threading.Thread(target=create, args=(i,)) for i in range(self.threads)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join(timeout=60)
+
+        self.assertEqual(errors, [])
+        self.assertEqual(Recipe.objects.filter(user=self.user).count(), self.threads)
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 5)
+        self.assertEqual(Ingredient.objects.filter(user=self.user).count(), 4)
+        for recipe in Recipe.objects.filter(user=self.user):
+            self.assertEqual(recipe.tags.count(), 5)
+            self.assertEqual(recipe.ingredients.count(), 2)
@@ -10,5 +10,6 @@ router.register('tags', views.TagViewSet)
 router.register('ingredient', views.IngredientViewSet)
 
 urlpatterns = [
+    path('sync/', views.SyncView.as_view(), name='sync'),
     path('', include(router.urls))
 ]
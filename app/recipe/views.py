@@ -1,69 +1,339 @@
+import base64
+import binascii
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError
+from django.db.models import Count, F, FloatField, Q
+from django.db.models.functions import Cast
 from rest_framework import viewsets, mixins, status
+from rest_framework.exceptions import ValidationError
+from rest_framework.views import APIView
 from rest_framework.authentication import TokenAuthentication
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from drf_spectacular.utils import extend_schema_view, extend_schema, OpenApiParameter, OpenApiTypes
 
-from core.models import Recipe, Tag, Ingredient
-from .serializers import RecipeSerializer, RecipeDetailSerializer, TagSerializer, IngredientSerializer, RecipeImageSerializer
+from core import changes, jobs
+from core.idempotency import idempotent
+from core.models import Recipe, Tag, Ingredient, Change
+from .serializers import (
+    RecipeSerializer, RecipeDetailSerializer, TagSerializer, IngredientSerializer, RecipeImageSerializer,
+    SyncTagSerializer, RecipeIdsSerializer, RecipeBulkDeleteSerializer, RecipeRelinkSerializer, MergeSerializer,
+    RecipeStatsSerializer, RecipeFilterSerializer, CookableRecipeSerializer, CookableQuerySerializer,
+    SimilarRecipeSerializer, SyncQuerySerializer, requested_fields,
+)
+from .pagination import KeysetPagination, keyset_order
+from . import bulk, similarity, stats
+
+class ChangeLogMixin:
+    """Write each request's changes atomically and log every touched object once.
+
+    Created objects belong to the requesting user.
+    """
+
+    def perform_create(self, serializer):
+        with changes.batch():
+            serializer.save(user=self.request.user)
+
+    def perform_update(self, serializer):
+        with changes.batch():
+            super().perform_update(serializer)
+
+    def perform_destroy(self, instance):
+        with changes.batch():
+            super().perform_destroy(instance)
+
+
+SPARSE_FIELDSET_PARAMETERS = [
+    OpenApiParameter(
+        'fields',
+        OpenApiTypes.STR,
+        description='Comma separated list of fields to return',
+    ),
+    OpenApiParameter(
+        'exclude',
+        OpenApiTypes.STR,
+        description='Comma separated list of fields to leave out',
+    ),
+]
+
+RECIPE_FILTER_PARAMETERS = [
+    OpenApiParameter(
+        'tags',
+        OpenApiTypes.STR,
+        description='Comma separated list of tag IDs to filter',
+    ),
+    OpenApiParameter(
+        'ingredients',
+        OpenApiTypes.STR,
+        description='Comma separated list of ingredient IDs to filter',
+    ),
+    OpenApiParameter('price_min', OpenApiTypes.DECIMAL, description='Lowest price to include'),
+    OpenApiParameter('price_max', OpenApiTypes.DECIMAL, description='Highest price to include'),
+    OpenApiParameter('time_max', OpenApiTypes.INT, description='Longest time in minutes to include'),
+]
 
 @extend_schema_view(
     list=extend_schema(
         parameters=[
-            OpenApiParameter(
-                'tags',
-                OpenApiTypes.STR,
-                description='Comma separated list of tag IDs to filter',
-            ),
-            OpenApiParameter(
-                'ingredients',
-                OpenApiTypes.STR,
-                description='Comma separated list of ingredient IDs to filter',
-            ),
+            *RECIPE_FILTER_PARAMETERS,
+            OpenApiParameter('ordering', OpenApiTypes.STR, enum=RecipeFilterSerializer.ORDERINGS),
+            *SPARSE_FIELDSET_PARAMETERS,
         ]
-    )
+    ),
+    retrieve=extend_schema(parameters=SPARSE_FIELDSET_PARAMETERS),
 )
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(ChangeLogMixin, viewsets.ModelViewSet):
     serializer_class = RecipeDetailSerializer
     queryset = Recipe.objects.all()
     authentication_classes = [TokenAuthentication]
     permission_classes = [IsAuthenticated]
+    throttle_scope = None
+    pagination_class = KeysetPagination
+    default_stats_top = 10
+    max_stats_top = 50
+
+    def _project(self, queryset):
+        """Load only the columns and relations the serializer is going to render."""
+        names = requested_fields(self.request, self.get_serializer_class().Meta.fields)
+        relations = [name for name in ('tags', 'ingredients') if name in names]
+        columns = [name for name in names if name in RecipeDetailSerializer.Meta.fields and name not in relations]
+        # The next page's cursor is read from the ordering column.
+        return queryset.only('id', self.get_ordering().lstrip('-'), *columns).prefetch_related(*relations)
+
+    def _filters(self):
+        if not hasattr(self, '_validated_filters'):
+            serializer = RecipeFilterSerializer(data=self.request.query_params)
+            serializer.is_valid(raise_exception=True)
+            self._validated_filters = serializer.validated_data
+        return self._validated_filters
 
-    def _params_to_ints(self, qs):
-        return [int(str_id) for str_id in qs.split(',')]
+    def get_ordering(self):
+        return self._filters()['ordering']
 
     def get_queryset(self):
-        tags = self.request.query_params.get('tags')
-        ingredients = self.request.query_params.get('ingredients')
+        filters = self._filters()
         queryset = self.queryset
-        if tags:
-            tag_ids = self._params_to_ints(tags)
-            queryset = queryset.filter(tags__id__in=tag_ids)
-        if ingredients:
-            ing_ids = self._params_to_ints(ingredients)
-            queryset = queryset.filter(ingredients__id__in=ing_ids)
-
-        return queryset.filter(user=self.request.user).order_by('-id')
+        if filters.get('tags'):
+            queryset = queryset.filter(tags__id__in=filters['tags'])
+        if filters.get('ingredients'):
+            queryset = queryset.filter(ingredients__id__in=filters['ingredients'])
+        if 'price_min' in filters:
+            queryset = queryset.filter(price__gte=filters['price_min'])
+        if 'price_max' in filters:
+            queryset = queryset.filter(price__lte=filters['price_max'])
+        if 'time_max' in filters:
+            queryset = queryset.filter(time_minutes__lte=filters['time_max'])
+
+        queryset = queryset.filter(user=self.request.user).order_by(*keyset_order(filters['ordering']))
+        if self.action in ('list', 'retrieve'):
+            queryset = self._project(queryset)
+
+        return queryset
+
+    def _distinct_recipes(self):
+        """The filtered recipes, unordered and each only once."""
+        recipes = self.get_queryset().order_by()
+        filters = self._filters()
+        if filters.get('tags') or filters.get('ingredients'):
+            # The filters join the links, which repeats recipes matching several of them.
+            recipes = Recipe.objects.filter(pk__in=recipes.values('pk'))
+        return recipes
     
     def get_serializer_class(self):
         if self.action == 'list':
             return RecipeSerializer
+        elif self.action == 'cookable':
+            return CookableRecipeSerializer
+        elif self.action == 'similar':
+            return SimilarRecipeSerializer
         elif self.action == 'upload_image':
             return RecipeImageSerializer
 
         return RecipeDetailSerializer
     
-    def perform_create(self, serializer):
-        serializer.save(user=self.request.user)
+    @idempotent
+    def create(self, request, *args, **kwargs):
+        return super().create(request, *args, **kwargs)
+
+    @idempotent
+    def update(self, request, *args, **kwargs):
+        return super().update(request, *args, **kwargs)
+
+    @extend_schema(request=None, responses={201: RecipeDetailSerializer})
+    @action(methods=['POST'], detail=True)
+    @idempotent
+    def clone(self, request, pk=None):
+        recipe = self.get_object()
+        with changes.batch():
+            clones = bulk.clone(request.user.id, [recipe.id])
+        clone = Recipe.objects.prefetch_related('tags', 'ingredients').get(pk=clones[recipe.id])
+        return Response(RecipeDetailSerializer(clone).data, status=status.HTTP_201_CREATED)
+
+    @extend_schema(request=RecipeIdsSerializer, responses={201: RecipeIdsSerializer})
+    @action(methods=['POST'], detail=False, url_path='bulk-clone')
+    @idempotent
+    def bulk_clone(self, request):
+        """Clone the recipes `ids`; returns the new ids in the same order."""
+        serializer = RecipeIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ids = serializer.validated_data['ids']
+
+        self._check_owned(Recipe, 'ids', ids)
+
+        with changes.batch():
+            clones = bulk.clone(request.user.id, ids)
+
+        return Response({'ids': [clones[pk] for pk in dict.fromkeys(ids)]}, status=status.HTTP_201_CREATED)
+
+    def _check_owned(self, model, field, ids):
+        unknown = bulk.unknown_ids(model, self.request.user.id, ids)
+        if unknown:
+            raise ValidationError({field: [f"Unknown {model._meta.verbose_name} ids: {', '.join(map(str, unknown))}."]})
+
+    @extend_schema(request=RecipeBulkDeleteSerializer, responses=OpenApiTypes.OBJECT)
+    @action(methods=['POST'], detail=False, url_path='bulk-delete')
+    def bulk_delete(self, request):
+        """Delete the selected recipes; returns how many were deleted."""
+        serializer = RecipeBulkDeleteSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        selection = serializer.validated_data
+
+        queryset = Recipe.objects.filter(user=request.user)
+        if selection.get('ids'):
+            queryset = queryset.filter(id__in=selection['ids'])
+        if selection.get('tags'):
+            queryset = queryset.filter(tags__id__in=selection['tags'])
+        if selection.get('ingredients'):
+            queryset = queryset.filter(ingredients__id__in=selection['ingredients'])
+
+        with changes.batch():
+            _, deleted = queryset.delete()
+        return Response({'deleted': deleted.get(Recipe._meta.label, 0)})
 
-    @action(methods=['POST'], detail=True, url_path='upload-image')
+    def _relink(self, request, model):
+        serializer = RecipeRelinkSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        self._check_owned(Recipe, 'ids', data['ids'])
+        self._check_owned(model, 'add', data['add'])
+
+        with changes.batch():
+            added, removed = bulk.relink(request.user.id, data['ids'], model, data['add'], data['remove'])
+        return Response({'added': added, 'removed': removed})
+
+    @extend_schema(request=RecipeRelinkSerializer, responses=OpenApiTypes.OBJECT)
+    @action(methods=['POST'], detail=False, url_path='bulk-tags')
+    def bulk_tags(self, request):
+        """Add the tag ids `add` to and remove `remove` from the recipes `ids`."""
+        return self._relink(request, Tag)
+
+    @extend_schema(request=RecipeRelinkSerializer, responses=OpenApiTypes.OBJECT)
+    @action(methods=['POST'], detail=False, url_path='bulk-ingredients')
+    def bulk_ingredients(self, request):
+        """Add the ingredient ids `add` to and remove `remove` from the recipes `ids`."""
+        return self._relink(request, Ingredient)
+
+    @extend_schema(request=MergeSerializer, responses=OpenApiTypes.OBJECT)
+    @action(methods=['POST'], detail=False, url_path='merge-ingredients')
+    def merge_ingredients(self, request):
+        """Replace the ingredient `source` with `target` in every recipe and delete `source`."""
+        serializer = MergeSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        source, target = serializer.validated_data['source'], serializer.validated_data['target']
+        self._check_owned(Ingredient, 'source', [source])
+        self._check_owned(Ingredient, 'target', [target])
+
+        with changes.batch():
+            moved = bulk.merge(request.user.id, Ingredient, source, target)
+        return Response({'recipes': moved})
+
+    @extend_schema(
+        parameters=[
+            *RECIPE_FILTER_PARAMETERS,
+            OpenApiParameter('top', OpenApiTypes.INT, description='Number of most used tags and ingredients to list'),
+        ],
+        responses=RecipeStatsSerializer,
+    )
+    @action(methods=['GET'], detail=False)
+    def stats(self, request):
+        """Count, average, extremes and percentiles of price and time, and the most used tags and ingredients."""
+        try:
+            top = min(max(int(request.query_params.get('top', self.default_stats_top)), 0), self.max_stats_top)
+        except ValueError:
+            raise ValidationError({'top': 'A valid integer is required.'})
+
+        # Everything a user can change is in the change log, so its newest id tells cached stats are current.
+        filters = self._filters()
+        key = ':'.join(map(str, [
+            'recipe-stats', request.user.id, changes.generation(request.user.id),
+            *(','.join(map(str, filters.get(name, []))) for name in ('tags', 'ingredients')),
+            *(filters.get(name, '') for name in ('price_min', 'price_max', 'time_max')), top,
+        ]))
+        data = cache.get(key)
+        if data is None:
+            data = RecipeStatsSerializer(stats.compute(self._distinct_recipes(), top)).data
+            cache.set(key, data, settings.RECIPE_STATS_CACHE_SECONDS)
+        return Response(data)
+
+    @extend_schema(
+        parameters=[
+            CookableQuerySerializer,
+            *RECIPE_FILTER_PARAMETERS,
+            *SPARSE_FIELDSET_PARAMETERS,
+        ],
+        responses=CookableRecipeSerializer(many=True),
+    )
+    @action(methods=['GET'], detail=False, pagination_class=None)
+    def cookable(self, request):
+        """Recipes missing at most `missing` of their ingredients from `pantry`, best covered first."""
+        query = CookableQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        pantry, missing = query.validated_data['pantry'], query.validated_data['missing']
+
+        # One grouped pass over the recipe-ingredient links counts each recipe's ingredients and those at hand.
+        queryset = (
+            self._distinct_recipes()
+            .annotate(total=Count('ingredients'), have=Count('ingredients', filter=Q(ingredients__in=pantry)))
+            .filter(total__gt=0)
+            .annotate(missing=F('total') - F('have'), coverage=Cast('have', FloatField()) / F('total'))
+            .filter(missing__lte=missing)
+            .order_by('-coverage', 'missing', '-id')
+        )
+        queryset = self._project(queryset)[:query.validated_data['limit']]
+        return Response(self.get_serializer(queryset, many=True).data)
+
+    @extend_schema(parameters=SPARSE_FIELDSET_PARAMETERS, responses=SimilarRecipeSerializer(many=True))
+    @action(methods=['GET'], detail=True, pagination_class=None)
+    def similar(self, request, pk=None):
+        """The recipes sharing the most tags and ingredients with this one, most similar first.
+
+        The lists are precomputed; after a change they are refreshed in the background and
+        served as they were until then.
+        """
+        recipe = self.get_object()
+        if similarity.is_stale(request.user.id):
+            similarity.schedule_refresh(request.user.id)
+
+        queryset = (
+            Recipe.objects.filter(similar_to__recipe=recipe)
+            .annotate(score=F('similar_to__score'))
+            .order_by('-score', '-id')
+        )
+        return Response(self.get_serializer(self._project(queryset), many=True).data)
+
+    @action(methods=['POST'], detail=True, url_path='upload-image', throttle_scope='upload')
+    @idempotent
     def upload_image(self, request, pk=None):
         recipe = self.get_object()
         serializer = self.get_serializer(recipe, data=request.data)
 
         if serializer.is_valid():
-            serializer.save()
+            with changes.batch():
+                serializer.save()
+                jobs.enqueue('recipe.tasks.optimize_recipe_image', recipe_id=recipe.id)
             return Response(serializer.data, status=status.HTTP_200_OK)
         
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -80,7 +350,7 @@ class RecipeViewSet(viewsets.ModelViewSet):
         ]
     )
 )
-class BaseAttrViewSet(mixins.DestroyModelMixin, mixins.UpdateModelMixin, mixins.ListModelMixin, viewsets.GenericViewSet):
+class BaseAttrViewSet(ChangeLogMixin, mixins.DestroyModelMixin, mixins.UpdateModelMixin, mixins.ListModelMixin, viewsets.GenericViewSet):
     authentication_classes = [TokenAuthentication]
     permission_classes = [IsAuthenticated]
 
@@ -92,6 +362,12 @@ class BaseAttrViewSet(mixins.DestroyModelMixin, mixins.UpdateModelMixin, mixins.
 
         return queryset.filter(user=self.request.user).order_by('-name').distinct()
 
+    def perform_update(self, serializer):
+        try:
+            super().perform_update(serializer)
+        except IntegrityError:
+            raise ValidationError({'name': [f'You already have a {self.queryset.model._meta.verbose_name} with this name.']})
+
 
 class TagViewSet(BaseAttrViewSet):
     serializer_class = TagSerializer
@@ -101,3 +377,61 @@ class IngredientViewSet(BaseAttrViewSet):
     serializer_class = IngredientSerializer
     queryset = Ingredient.objects.all()
 
+
+@extend_schema(
+    parameters=[
+        OpenApiParameter('cursor', OpenApiTypes.STR, description='Cursor returned by the previous sync'),
+        SyncQuerySerializer,
+    ],
+    responses=OpenApiTypes.OBJECT,
+)
+class SyncView(APIView):
+    """Recipes, tags and ingredients changed since `cursor`, as upserts and deleted ids."""
+    authentication_classes = [TokenAuthentication]
+    permission_classes = [IsAuthenticated]
+    sections = (
+        (Change.RECIPE, 'recipes', Recipe, RecipeDetailSerializer),
+        (Change.TAG, 'tags', Tag, SyncTagSerializer),
+        (Change.INGREDIENT, 'ingredients', Ingredient, IngredientSerializer),
+    )
+
+    def _decode_cursor(self, cursor):
+        if not cursor:
+            return 0
+        try:
+            return int(base64.urlsafe_b64decode(cursor.encode()).decode())
+        except (ValueError, binascii.Error, UnicodeDecodeError):
+            raise ValidationError({'cursor': 'Invalid cursor.'})
+
+    def _encode_cursor(self, seq):
+        return base64.urlsafe_b64encode(str(seq).encode()).decode()
+
+    def get(self, request):
+        after = self._decode_cursor(request.query_params.get('cursor'))
+        query = SyncQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        limit = query.validated_data['limit']
+
+        changes = list(
+            Change.objects.filter(user=request.user, seq__gt=after)
+            .order_by('seq')
+            .values_list('seq', 'kind', 'object_id', 'deleted')[:limit + 1]
+        )
+        has_more = len(changes) > limit
+        changes = changes[:limit]
+
+        data = {'cursor': self._encode_cursor(changes[-1][0] if changes else after), 'has_more': has_more}
+        for kind, name, model, serializer_class in self.sections:
+            upserts = [object_id for _, k, object_id, deleted in changes if k == kind and not deleted]
+            deletes = [object_id for _, k, object_id, deleted in changes if k == kind and deleted]
+            objects = []
+            if upserts:
+                queryset = model.objects.filter(user=request.user, id__in=upserts).order_by('id')
+                if model is Recipe:
+                    queryset = queryset.prefetch_related('tags', 'ingredients')
+                objects = serializer_class(queryset, many=True).data
+                # Deleted after the change was read; report it as gone rather than missing.
+                deletes += sorted(set(upserts) - {obj['id'] for obj in objects})
+            data[name] = {'upserts': objects, 'deletes': deletes}
+
+        return Response(data)
@@ -0,0 +1,145 @@
+"""Per-user tag/ingredient name -> id maps for recipe writes.
+
+Every user has a small and stable vocabulary, so the maps are cached in
+process, keeping at most `VOCABULARY_CACHE_USERS` users (least recently used
+first out). Saves and deletes of tags and ingredients in this process update
+or drop the affected map. Changes made by other workers are caught when linking:
+links are inserted with `INSERT ... SELECT` that only matches rows whose id and
+name still agree with the map. Any shortfall drops the map and resolves the
+names again from the database. Names missing from the map are looked up before
+they are created, so a stale map never creates duplicates; concurrent requests
+creating the same name meet on the `(user, name)` unique constraint.
+"""
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from core import changes
+from core.models import Recipe, Tag, Ingredient, Change
+
+RELATIONS = {
+    Tag: (Recipe.tags.through, 'tag_id', Change.TAG),
+    Ingredient: (Recipe.ingredients.through, 'ingredient_id', Change.INGREDIENT),
+}
+
+
+class VocabularyCache:
+    def __init__(self, max_users):
+        self.max_users = max_users
+        self._maps = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, model, user_id):
+        """Return a copy of the name -> id map of `model` for `user_id`, loading it on a miss."""
+        with self._lock:
+            user_maps = self._maps.get(user_id)
+            if user_maps is not None and model in user_maps:
+                self._maps.move_to_end(user_id)
+                return dict(user_maps[model])
+
+        mapping = dict(model.objects.filter(user_id=user_id).values_list('name', 'id'))
+        with self._lock:
+            self._maps.setdefault(user_id, {})[model] = mapping
+            self._maps.move_to_end(user_id)
+            while len(self._maps) > self.max_users:
+                self._maps.popitem(last=False)
+        return dict(mapping)
+
+    def remember(self, model, user_id, names_to_ids):
+        with self._lock:
+            mapping = self._maps.get(user_id, {}).get(model)
+            if mapping is not None:
+                mapping.update(names_to_ids)
+
+    def forget(self, model, user_id):
+        with self._lock:
+            self._maps.get(user_id, {}).pop(model, None)
+
+    def clear(self):
+        with self._lock:
+            self._maps.clear()
+
+
+cache = VocabularyCache(settings.VOCABULARY_CACHE_USERS)
+
+
+def _insert_links(recipe_id, model, user_id, names_to_ids):
+    """Link `recipe_id` to the ids whose name still matches; return how many links were added."""
+    through, column, _ = RELATIONS[model]
+    match = Q()
+    for name, pk in names_to_ids.items():
+        match |= Q(id=pk, name=name)
+    select_sql, params = model.objects.filter(match, user_id=user_id).values('id').query.sql_with_params()
+    qn = connection.ops.quote_name
+    # SQLite needs the WHERE to parse ON CONFLICT after INSERT ... SELECT.
+    sql = (
+        f'INSERT INTO {qn(through._meta.db_table)} ({qn("recipe_id")}, {qn(column)}) '
+        f'SELECT %s, matched.id FROM ({select_sql}) matched WHERE true ON CONFLICT DO NOTHING'
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [recipe_id, *params])
+        return cursor.rowcount
+
+
+def _resolve_missing(model, user_id, names):
+    """Look up names absent from the map (another worker may have created them) and create the rest."""
+    found = dict(model.objects.filter(user_id=user_id, name__in=names).values_list('name', 'id'))
+    missing = [name for name in names if name not in found]
+    if missing:
+        # INSERT ... ON CONFLICT DO NOTHING: a request creating the same names concurrently waits for
+        # this one (or this one for it) on the unique constraint instead of adding duplicates. Names
+        # are inserted sorted, so such requests take those index locks in the same order: they
+        # still wait on each other, but can never deadlock.
+        model.objects.bulk_create(
+            [model(user_id=user_id, name=name) for name in sorted(missing)], ignore_conflicts=True,
+        )
+        created = dict(model.objects.filter(user_id=user_id, name__in=missing).values_list('name', 'id'))
+        changes.record(user_id, RELATIONS[model][2], created.values())
+        found.update(created)
+    transaction.on_commit(lambda: cache.remember(model, user_id, found))
+    return found
+
+
+def link(recipe, model, names):
+    """Attach the `model` rows called `names` to `recipe`, creating the missing ones."""
+    names = list(dict.fromkeys(names))
+    if not names:
+        return
+    user_id = recipe.user_id
+    mapping = cache.get(model, user_id)
+    missing = [name for name in names if name not in mapping]
+    if missing:
+        mapping.update(_resolve_missing(model, user_id, missing))
+
+    wanted = {name: mapping[name] for name in names}
+    if _insert_links(recipe.pk, model, user_id, wanted) == len(wanted):
+        return
+
+    # Another worker renamed or deleted some of them; resolve from the database this time.
+    cache.forget(model, user_id)
+    mapping = cache.get(model, user_id)
+    missing = [name for name in names if name not in mapping]
+    if missing:
+        mapping.update(_resolve_missing(model, user_id, missing))
+    _insert_links(recipe.pk, model, user_id, {name: mapping[name] for name in names})
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+def update_vocabulary(sender, instance, created, **kwargs):
+    if created:
+        names_to_ids = {instance.name: instance.pk}
+        transaction.on_commit(lambda: cache.remember(sender, instance.user_id, names_to_ids))
+    else:
+        cache.forget(sender, instance.user_id)
+
+
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def drop_vocabulary(sender, instance, **kwargs):
+    cache.forget(sender, instance.user_id)
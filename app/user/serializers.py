@@ -1,5 +1,10 @@
-from rest_framework import serializers
+import hashlib
+import time
+
+from rest_framework import serializers, exceptions
+from django.conf import settings
 from django.contrib.auth import get_user_model, authenticate
+from django.core.cache import cache
 from django.utils.translation import gettext as _
 
 class UserSerializer(serializers.ModelSerializer):
@@ -28,6 +33,39 @@ class UserSerializer(serializers.ModelSerializer):
         
         return user
         
+def _window_key(email):
+    return 'login-attempts:' + hashlib.sha256(email.lower().encode()).hexdigest()
+
+
+def _attempts_key(email, window_start):
+    return f'{_window_key(email)}:{window_start}'
+
+
+def failed_logins(email):
+    window_start = cache.get(_window_key(email))
+    if window_start is None:
+        return 0
+    return cache.get(_attempts_key(email, window_start), 0)
+
+
+def count_failed_login(email):
+    """Count a failed login for `email` in the cache, which `CACHE_DIR` shares between workers.
+
+    Failures are counted for `LOGIN_ATTEMPTS_WINDOW` seconds from the first one. The
+    window start is only ever written with `add`, so it expires on time even though
+    some backends (FileBasedCache) reset the counter's timeout on every `incr`.
+    """
+    window_key = _window_key(email)
+    now = time.time()
+    cache.add(window_key, now, settings.LOGIN_ATTEMPTS_WINDOW)
+    attempts_key = _attempts_key(email, cache.get(window_key, now))
+    if not cache.add(attempts_key, 1, settings.LOGIN_ATTEMPTS_WINDOW):
+        try:
+            cache.incr(attempts_key)
+        except ValueError:
+            cache.set(attempts_key, 1, settings.LOGIN_ATTEMPTS_WINDOW)
+
+
 class AuthTokenSerializer(serializers.Serializer):
     email = serializers.EmailField()
     password = serializers.CharField()
@@ -37,12 +75,18 @@ class AuthTokenSerializer(serializers.Serializer):
         email = attrs.get('email')
         password = attrs.get('password')
 
+        # Refuse before hashing anything, so brute forcing one email cannot burn CPU.
+        if failed_logins(email) >= settings.LOGIN_ATTEMPTS_PER_EMAIL:
+            raise exceptions.Throttled(wait=settings.LOGIN_ATTEMPTS_WINDOW)
+
         user = authenticate(request=self.context.get('request'),
                             email=email,
                             password=password)
 
         if not user:
+            count_failed_login(email)
             raise serializers.ValidationError('Invalid password.', code='authorization')
 
+        cache.delete(_window_key(email))
         attrs['user'] = user
         return attrs
\ No newline at end of file
@@ -1,14 +1,22 @@
-from django.test import TestCase
+import multiprocessing
+import tempfile
+from unittest.mock import patch
+
+from django.conf import settings
+from django.core.cache import cache
+from django.test import TestCase, override_settings
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APIClient
 from django.contrib.auth import get_user_model
+from core.tests.query_budget import QueryBudgetMixin
+from user.serializers import count_failed_login, failed_logins
 
 CREATE_USER_URL = reverse('user:create')
 TOKEN_URL = reverse('user:token')
 PROFILE_URL = reverse('user:me')
 
-class UserTests(TestCase):
+class UserTests(QueryBudgetMixin, TestCase):
     def setUp(self):
         self.client = APIClient()
 
@@ -77,7 +85,7 @@ class UserTests(TestCase):
         self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
         self.assertNotIn('token', res.data)
 
-class PrivateUserTests(TestCase):
+class PrivateUserTests(QueryBudgetMixin, TestCase):
     def setUp(self):
         self.user = get_user_model().objects.create_user(email='test@email.com', password='password1234567', name='Test Name')
 
@@ -95,3 +103,58 @@ class PrivateUserTests(TestCase):
 
         self.user.refresh_from_db()
         self.assertEqual(self.user.name, user_data['name'])
+
+
+@override_settings(LOGIN_ATTEMPTS_PER_EMAIL=2)
+class LoginRateLimitTests(QueryBudgetMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        get_user_model().objects.create_user(email='limit@email.com', password='password1234567')
+
+    def test_login_is_throttled_after_failed_attempts(self):
+        for _ in range(2):
+            res = self.client.post(TOKEN_URL, {'email': 'limit@email.com', 'password': 'wrong'})
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        with patch('user.serializers.authenticate') as patched_authenticate:
+            res = self.client.post(TOKEN_URL, {'email': 'LIMIT@email.com', 'password': 'password1234567'})
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        patched_authenticate.assert_not_called()
+
+    def test_failed_attempts_are_shared_by_workers(self):
+        with tempfile.TemporaryDirectory() as cache_dir, override_settings(CACHES={
+            'default': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': cache_dir},
+        }), multiprocessing.get_context('fork').Pool(1) as other_worker:
+            other_worker.map(count_failed_login, ['limit@email.com'] * 2)
+
+            with patch('user.serializers.authenticate') as patched_authenticate:
+                res = self.client.post(TOKEN_URL, {'email': 'limit@email.com', 'password': 'password1234567'})
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        patched_authenticate.assert_not_called()
+
+    def test_failed_attempts_window_is_not_extended(self):
+        window = settings.LOGIN_ATTEMPTS_WINDOW
+        with tempfile.TemporaryDirectory() as cache_dir, override_settings(CACHES={
+            'default': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': cache_dir},
+        }), patch('time.time') as clock:
+            clock.return_value = 1000.0
+            count_failed_login('limit@email.com')
+            clock.return_value += window - 1
+            count_failed_login('limit@email.com')
+            self.assertEqual(failed_logins('limit@email.com'), 2)
+
+            clock.return_value += 2
+            self.assertEqual(failed_logins('limit@email.com'), 0)
+
+    def test_successful_login_resets_attempts(self):
+        self.client.post(TOKEN_URL, {'email': 'limit@email.com', 'password': 'wrong'})
+        res = self.client.post(TOKEN_URL, {'email': 'limit@email.com', 'password': 'password1234567'})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        self.client.post(TOKEN_URL, {'email': 'limit@email.com', 'password': 'wrong'})
+        res = self.client.post(TOKEN_URL, {'email': 'limit@email.com', 'password': 'password1234567'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
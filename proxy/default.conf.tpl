@@ -1,13 +1,77 @@
+# Short lived cache of public responses (the API schema), see PROXY_MICROCACHE
+uwsgi_cache_path /tmp/nginx-cache levels=1:2 keys_zone=microcache:10m max_size=100m inactive=10m use_temp_path=off;
+
+# The uwsgi protocol has no persistent connections, so there is no upstream keepalive;
+# it is still cheaper to parse than proxying HTTP to uWSGI.
+upstream app {
+    server ${APP_HOST}:${APP_PORT};
+}
+
 server {
      listen ${LISTEN_PORT};
- 
+
+     # JSON and schema responses shrink about tenfold; images are already compressed.
+     gzip                    on;
+     gzip_comp_level         5;
+     gzip_min_length         1024;
+     gzip_proxied            any;
+     gzip_vary               on;
+     gzip_types              application/json application/vnd.oai.openapi application/vnd.oai.openapi+json
+                             text/css application/javascript image/svg+xml text/plain;
+
+     # Keep whole responses of a recipe list in memory so workers are freed right away
+     uwsgi_buffer_size       16k;
+     uwsgi_buffers           64 16k;
+     uwsgi_busy_buffers_size 64k;
+
+     # Uploads (up to 10M) are read by nginx before a worker is involved
+     client_max_body_size    10M;
+     client_body_buffer_size 1m;
+     client_body_timeout     30s;
+
      location /static {
          alias /vol/static;
+         open_file_cache          max=1000 inactive=60s;
+         open_file_cache_valid    30s;
+         expires                  ${PROXY_STATIC_MAX_AGE};
      }
- 
+
+     location = /healthz {
+         uwsgi_pass              app;
+         include                 /etc/nginx/uwsgi_params;
+         access_log              off;
+     }
+
+     # Only for the orchestrator's probes, from loopback and private networks
+     location = /readyz {
+         allow                   127.0.0.1;
+         allow                   ::1;
+         allow                   10.0.0.0/8;
+         allow                   172.16.0.0/12;
+         allow                   192.168.0.0/16;
+         allow                   fc00::/7;
+         deny                    all;
+         uwsgi_pass              app;
+         include                 /etc/nginx/uwsgi_params;
+         uwsgi_read_timeout      5s;
+         access_log              off;
+     }
+
+     location = /api/schema/ {
+         uwsgi_pass              app;
+         include                 /etc/nginx/uwsgi_params;
+         uwsgi_cache             ${PROXY_MICROCACHE};
+         uwsgi_cache_key         $request_method$request_uri$http_accept;
+         uwsgi_cache_valid       200 ${PROXY_MICROCACHE_SECONDS}s;
+         # Cache for PROXY_MICROCACHE_SECONDS, not the max-age the app sends to clients
+         uwsgi_ignore_headers    Cache-Control Expires;
+         uwsgi_cache_lock        on;
+         uwsgi_cache_use_stale   updating error timeout;
+         add_header              X-Cache-Status $upstream_cache_status;
+     }
+
      location / {
-         uwsgi_pass              ${APP_HOST}:${APP_PORT};
+         uwsgi_pass              app;
          include                 /etc/nginx/uwsgi_params;
-         client_max_body_size    10M;
      }
- }
\ No newline at end of file
+ }
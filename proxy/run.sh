@@ -1,4 +1,6 @@
 #!/bin/sh
 set -e
-envsubst < /etc/nginx/default.conf.tpl > /etc/nginx/conf.d/default.conf
+# Only our variables: nginx's own ($request_uri, ...) must survive
+envsubst '${LISTEN_PORT} ${APP_HOST} ${APP_PORT} ${PROXY_MICROCACHE} ${PROXY_MICROCACHE_SECONDS} ${PROXY_STATIC_MAX_AGE}' \
+    < /etc/nginx/default.conf.tpl > /etc/nginx/conf.d/default.conf
 nginx -g 'daemon off;'
\ No newline at end of file
@@ -1,6 +1,51 @@
 #!/bin/sh
 set -e
-python manage.py wait_for_db
+python manage.py wait_for_db --check database --check media
 python manage.py collectstatic --noinput
+python manage.py build_schema
 python manage.py migrate
-uwsgi --socket :9000 --workers 4 --master --enable-threads --module app.wsgi
\ No newline at end of file
+
+# Throttle buckets shared by all uWSGI workers; start every boot with empty buckets.
+export THROTTLE_SHM_PATH="${THROTTLE_SHM_PATH:-/dev/shm/recipe-api-throttle}"
+rm -f "$THROTTLE_SHM_PATH"
+
+# Cache shared by all uWSGI workers (replica pins, failed login counters, recipe stats)
+export CACHE_DIR="${CACHE_DIR:-/dev/shm/recipe-api-cache}"
+rm -rf "$CACHE_DIR"
+
+# UWSGI_WORKERS workers (two per CPU by default), recycled after UWSGI_MAX_REQUESTS
+# requests or once they use UWSGI_RELOAD_ON_RSS MB of memory. With UWSGI_ELASTIC=1 the
+# pool starts at UWSGI_WORKERS and grows up to UWSGI_MAX_WORKERS while workers are busy
+# or requests queue up, shrinking again after a while idle.
+CPUS="$(nproc)"
+UWSGI_WORKERS="${UWSGI_WORKERS:-$((CPUS * 2))}"
+set -- \
+    --listen "${UWSGI_LISTEN:-128}" \
+    --max-requests "${UWSGI_MAX_REQUESTS:-5000}" \
+    --max-requests-delta 100 \
+    --reload-on-rss "${UWSGI_RELOAD_ON_RSS:-256}" \
+    --worker-reload-mercy 30
+if [ "${UWSGI_ELASTIC:-0}" = 1 ]; then
+    UWSGI_MAX_WORKERS="${UWSGI_MAX_WORKERS:-$((CPUS * 4))}"
+    if [ "$UWSGI_MAX_WORKERS" -le "$UWSGI_WORKERS" ]; then
+        UWSGI_MAX_WORKERS=$((UWSGI_WORKERS + 1))
+    fi
+    set -- "$@" \
+        --workers "$UWSGI_MAX_WORKERS" \
+        --cheaper-algo busyness \
+        --cheaper "$UWSGI_WORKERS" \
+        --cheaper-initial "$UWSGI_WORKERS" \
+        --cheaper-step "${UWSGI_SPAWN_STEP:-2}" \
+        --cheaper-overload 1 \
+        --cheaper-busyness-min 20 \
+        --cheaper-busyness-max 60 \
+        --cheaper-busyness-multiplier 30 \
+        --cheaper-busyness-backlog-alert 4 \
+        --cheaper-busyness-backlog-step 2
+else
+    set -- "$@" --workers "$UWSGI_WORKERS"
+fi
+
+# The master loads and warms up the app (app/wsgi.py) and forks the workers from it,
+# so they share it copy-on-write; do not add --lazy-apps.
+exec uwsgi --socket :9000 --master --enable-threads --need-app --module app.wsgi "$@"